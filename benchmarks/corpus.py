@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Generador de corpus sintéticos de conversaciones en español
+Rellena una base de datos de memoria con millones de filas de forma reproducible
+"""
+
+import json
+import logging
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from nova.memory.database import MemoryDatabase
+from nova.memory.text_analyzer import DEFAULT_SENTIMENT_WORDS, DEFAULT_TOPIC_KEYWORDS
+
+logger = logging.getLogger('benchmarks.corpus')
+
+NAMES = ["Ana", "Lucía", "Carlos", "Marta", "Javier", "Elena", "Pablo", "Sofía", "Diego", "Laura"]
+
+OPENERS = ["Hoy", "Ayer", "Esta mañana", "Esta semana", "El otro día", "Anoche", "Últimamente"]
+
+TOPIC_SENTENCES = [
+    "estuve pensando en {word} y en todo lo que implica",
+    "hablé con alguien sobre {word} durante un buen rato",
+    "tuve un problema con {word} que no esperaba",
+    "me acordé de {word} mientras volvía a casa",
+    "quiero contarte algo sobre {word}",
+    "no dejo de darle vueltas a {word}",
+]
+
+SENTIMENT_SENTENCES = {
+    "positivo": ["y me siento {word}", "la verdad es que fue {word}", "estoy {word} con cómo salió"],
+    "negativo": ["y me siento {word}", "la verdad es que fue {word}", "sigo {word} por eso"],
+    "neutral": ["no sé muy bien qué pensar", "ya veremos qué pasa", "te lo cuento por si acaso"],
+}
+
+RESPONSES = [
+    "Me encanta que me lo cuentes, {name}. ¿Cómo te sentiste después?",
+    "Vaya, entiendo perfectamente. Estoy aquí para lo que necesites.",
+    "¡Qué interesante! Cuéntame más sobre eso, por favor.",
+    "Gracias por compartirlo conmigo. ¿Quieres que hablemos de ello?",
+    "Eso suena importante para ti. Me alegra que confíes en mí.",
+]
+
+FACTS = [
+    ("nombre", "personal", lambda rng: rng.choice(NAMES)),
+    ("edad", "personal", lambda rng: str(rng.randint(18, 70))),
+    ("trabajo", "personal", lambda rng: rng.choice(["ingeniera", "profesor", "médico", "diseñadora"])),
+    ("comida", "preferencias", lambda rng: rng.choice(["paella", "tortilla", "sushi", "pasta"])),
+    ("música", "preferencias", lambda rng: rng.choice(["rock", "jazz", "flamenco", "pop"])),
+    ("color", "preferencias", lambda rng: rng.choice(["azul", "verde", "rojo", "morado"])),
+    ("estado_ánimo", "emocional", lambda rng: rng.choice(["tranquila", "cansado", "ilusionada"])),
+]
+
+class CorpusGenerator:
+    """Generador reproducible de conversaciones sintéticas"""
+    
+    def __init__(self, seed: int = 42):
+        """
+        Inicializa el generador
+        
+        Args:
+            seed: Semilla del generador aleatorio (mismo corpus para la misma semilla)
+        """
+        self.rng = random.Random(seed)
+        self.topic_words: List[Tuple[str, str]] = [
+            (topic, word) for topic, words in DEFAULT_TOPIC_KEYWORDS.items() for word in words
+        ]
+        # Palabras de una sola palabra para que encajen en las plantillas
+        self.sentiment_words: Dict[str, List[str]] = {
+            label: [word for word in words if " " not in word]
+            for label, words in DEFAULT_SENTIMENT_WORDS.items()
+        }
+    
+    def message(self) -> Tuple[str, str, Optional[str], List[str]]:
+        """
+        Genera un mensaje del usuario y la respuesta de Nova
+        
+        Returns:
+            Tuple[str, str, Optional[str], List[str]]: Mensaje, respuesta,
+                sentimiento y temas
+        """
+        rng = self.rng
+        topics = []
+        parts = [rng.choice(OPENERS)]
+        for _ in range(rng.choice((1, 1, 2))):
+            topic, word = rng.choice(self.topic_words)
+            if topic not in topics:
+                topics.append(topic)
+            parts.append(rng.choice(TOPIC_SENTENCES).format(word=word))
+        
+        sentiment = rng.choice(("positivo", "negativo", "neutral", "neutral"))
+        template = rng.choice(SENTIMENT_SENTENCES[sentiment])
+        if sentiment != "neutral":
+            template = template.format(word=rng.choice(self.sentiment_words[sentiment]))
+        parts.append(template)
+        
+        user_message = ", ".join(parts) + "."
+        nova_response = rng.choice(RESPONSES).format(name=rng.choice(NAMES))
+        return user_message, nova_response, sentiment, topics
+    
+    def conversations(self, count: int, start: datetime,
+                      interval: timedelta) -> Iterator[Tuple[str, str, str, Optional[str], List[str]]]:
+        """
+        Genera conversaciones con marcas de tiempo crecientes
+        
+        Args:
+            count: Número de conversaciones
+            start: Fecha de la primera conversación
+            interval: Tiempo medio entre conversaciones
+            
+        Yields:
+            Tuple: (timestamp, mensaje, respuesta, sentimiento, temas)
+        """
+        step = interval.total_seconds()
+        for i in range(count):
+            timestamp = start + timedelta(seconds=i * step)
+            user_message, nova_response, sentiment, topics = self.message()
+            yield timestamp.isoformat(), user_message, nova_response, sentiment, topics
+    
+    def facts(self) -> List[Tuple[str, str, str]]:
+        """
+        Genera un perfil de usuario sintético
+        
+        Returns:
+            List[Tuple[str, str, str]]: (clave, valor, categoría)
+        """
+        return [(key, make_value(self.rng), category) for key, category, make_value in FACTS]
+
+def count_conversations(db: MemoryDatabase) -> int:
+    """
+    Cuenta las conversaciones de una base de datos
+    
+    Args:
+        db: Base de datos de memoria
+        
+    Returns:
+        int: Número de conversaciones
+    """
+    with db.pool.reader() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM conversations")
+        return cursor.fetchone()[0]
+
+def generate_corpus(db_path: str, rows: int, seed: int = 42, batch_size: int = 50000,
+                    days: int = 365, progress: bool = True) -> int:
+    """
+    Rellena una base de datos de memoria hasta tener `rows` conversaciones
+    
+    Las filas se insertan directamente con executemany en lotes de
+    `batch_size` por transacción (los triggers mantienen FTS5 y el índice de
+    temas), mucho más rápido que llamar a save_conversation fila a fila. Si
+    la base de datos ya tiene conversaciones, solo se añaden las que faltan.
+    
+    Args:
+        db_path: Ruta de la base de datos (se crea si no existe)
+        rows: Número total de conversaciones deseado
+        seed: Semilla del generador
+        batch_size: Conversaciones por transacción
+        days: Días que abarcan las conversaciones (hasta hoy)
+        progress: Si es True, muestra el progreso con tqdm
+        
+    Returns:
+        int: Número de conversaciones añadidas
+    """
+    db = MemoryDatabase(db_path)
+    try:
+        existing = count_conversations(db)
+        missing = rows - existing
+        if missing <= 0:
+            logger.info(f"{db_path} ya tiene {existing} conversaciones")
+            return 0
+        
+        generator = CorpusGenerator(seed + existing)
+        interval = timedelta(days=days) / rows
+        start = datetime.now() - timedelta(days=days) + interval * existing
+        
+        if existing == 0:
+            for key, value, category in generator.facts():
+                db.save_user_info(key, value, category)
+        
+        added = 0
+        conversations = generator.conversations(missing, start, interval)
+        with tqdm(total=missing, desc="corpus", unit=" filas", disable=not progress) as bar:
+            while added < missing:
+                batch = [next(conversations) for _ in range(min(batch_size, missing - added))]
+                with db.pool.writer() as cursor:
+                    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM conversations")
+                    first_id = cursor.fetchone()[0] + 1
+                    cursor.executemany('''
+                        INSERT INTO conversations (id, timestamp, user_message, nova_response, sentiment, topics)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', [(first_id + i, timestamp, user_message, nova_response, sentiment,
+                           json.dumps(topics) if topics else None)
+                          for i, (timestamp, user_message, nova_response, sentiment, topics)
+                          in enumerate(batch)])
+                    cursor.executemany('''
+                        INSERT OR IGNORE INTO conversation_topics (topic, conversation_id)
+                        VALUES (?, ?)
+                    ''', [(topic, first_id + i) for i, row in enumerate(batch) for topic in row[4]])
+                added += len(batch)
+                bar.update(len(batch))
+        
+        # Estadísticas del planificador actualizadas para el nuevo tamaño
+        with db.pool.maintenance() as cursor:
+            cursor.execute("ANALYZE")
+        logger.info(f"Corpus de {rows} conversaciones generado en {db_path}")
+        return added
+    except sqlite3.Error as e:
+        logger.error(f"Error al generar el corpus: {str(e)}")
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Servidor falso de Ollama para pruebas de carga sin GPU
+Imita /api/tags, /api/ps y /api/chat (streaming NDJSON y respuesta única) con
+latencia, velocidad de generación y tasa de errores configurables
+
+Uso:
+    python -m benchmarks.fake_ollama --port 11435 --first-token-ms 300 --tokens-per-sec 40
+    OLLAMA_API_URLS=http://127.0.0.1:11435/api/chat python main.py
+"""
+
+import argparse
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger('benchmarks.fake_ollama')
+
+WORDS = ("hola", "claro", "me", "alegra", "mucho", "que", "me", "lo", "cuentes", "y",
+         "creo", "que", "es", "una", "idea", "estupenda", "para", "hoy", "seguro",
+         "que", "todo", "sale", "bien", "si", "quieres", "hablamos", "más", "tarde")
+
+def parse_keep_alive(value, default: float) -> float:
+    """
+    Convierte un keep_alive de Ollama en segundos
+    
+    Args:
+        value: Número de segundos o duración como "30s", "5m" o "1h"
+            (negativo = para siempre)
+        default: Segundos si no se indica
+        
+    Returns:
+        float: Segundos que el modelo sigue cargado tras la petición
+    """
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        match = re.fullmatch(r"\s*(-?\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*", str(value))
+        if not match:
+            return default
+        unit = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[match.group(2) or "s"]
+        seconds = float(match.group(1)) * unit
+    return float("inf") if seconds < 0 else seconds
+
+def estimate_prompt_tokens(text: str) -> int:
+    """Estima los tokens de un texto (unos 4 caracteres por token)"""
+    return (len(text) + 3) // 4
+
+class FakeOllamaServer:
+    """Servidor HTTP que responde como Ollama con tiempos simulados"""
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 models: Sequence[str] = ("openchat",), first_token_latency: float = 0.2,
+                 tokens_per_sec: float = 30.0, prompt_tokens_per_sec: float = 2000.0,
+                 response_tokens: int = 40, load_time: float = 1.0,
+                 keep_alive: float = 300.0, error_rate: float = 0.0,
+                 jitter: float = 0.1, seed: Optional[int] = None):
+        """
+        Inicializa el servidor (sin arrancarlo)
+        
+        La latencia hasta el primer token es `first_token_latency` más la carga
+        del modelo (`load_time`, solo si no está en memoria) más la evaluación
+        de los tokens del prompt que no coinciden con la petición anterior:
+        como Ollama, se reutiliza la caché del prefijo común.
+        
+        Args:
+            host: Dirección en la que escuchar
+            port: Puerto (0 = uno libre)
+            models: Modelos que se anuncian en /api/tags
+            first_token_latency: Segundos fijos antes del primer token
+            tokens_per_sec: Velocidad de generación
+            prompt_tokens_per_sec: Velocidad de evaluación del prompt
+            response_tokens: Tokens de cada respuesta
+            load_time: Segundos que tarda en cargarse un modelo no cargado
+            keep_alive: Segundos que un modelo sigue cargado si la petición
+                no indica keep_alive
+            error_rate: Probabilidad de responder con un error 500
+            jitter: Variación relativa aleatoria de las latencias (0.1 = ±10 %)
+            seed: Semilla de los errores y la variación (opcional)
+        """
+        self.models = list(models)
+        self.first_token_latency = first_token_latency
+        self.tokens_per_sec = tokens_per_sec
+        self.prompt_tokens_per_sec = prompt_tokens_per_sec
+        self.response_tokens = response_tokens
+        self.load_time = load_time
+        self.keep_alive = keep_alive
+        self.error_rate = error_rate
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # Modelo -> instante (monotonic) en que se descarga
+        self._loaded: Dict[str, float] = {}
+        # Modelo -> último prompt evaluado, para simular la caché del prefijo
+        self._last_prompt: Dict[str, str] = {}
+        self.requests = 0
+        self.errors = 0
+        self.cancelled = 0
+        
+        self._httpd = ThreadingHTTPServer((host, port), _FakeOllamaRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def url(self) -> str:
+        """URL base del servidor"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    @property
+    def chat_url(self) -> str:
+        """URL de /api/chat, la que usan OllamaHandler y OllamaPool"""
+        return f"{self.url}/api/chat"
+    
+    def start(self) -> "FakeOllamaServer":
+        """Arranca el servidor en un hilo en segundo plano"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name="fake-ollama", daemon=True)
+        self._thread.start()
+        logger.info(f"Ollama falso escuchando en {self.url}")
+        return self
+    
+    def serve_forever(self) -> None:
+        """Atiende peticiones en el hilo actual hasta que se interrumpe"""
+        logger.info(f"Ollama falso escuchando en {self.url}")
+        self._httpd.serve_forever()
+    
+    def stop(self) -> None:
+        """Detiene el servidor"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+    
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+    
+    def __exit__(self, *exc) -> None:
+        self.stop()
+    
+    def stats(self) -> Dict[str, int]:
+        """Contadores de peticiones, errores simulados y respuestas abandonadas"""
+        # Todo se lee en una sola toma del bloqueo (no es reentrante)
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors,
+                    "cancelled": self.cancelled, "loaded_models": len(self._loaded_now())}
+    
+    def loaded_models(self) -> List[str]:
+        """Modelos cargados en este momento"""
+        with self._lock:
+            return self._loaded_now()
+    
+    def _loaded_now(self) -> List[str]:
+        """Modelos cargados en este momento (con el bloqueo ya tomado)"""
+        now = time.monotonic()
+        return [model for model, expires in self._loaded.items() if expires > now]
+    
+    def _vary(self, seconds: float) -> float:
+        """Aplica la variación aleatoria a una latencia"""
+        with self._lock:
+            factor = 1 + self.rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, seconds * factor)
+    
+    def should_fail(self) -> bool:
+        """Decide si la petición actual falla"""
+        with self._lock:
+            self.requests += 1
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.errors += 1
+                return True
+            return False
+    
+    def prepare(self, model: str, prompt: str, keep_alive) -> Dict[str, float]:
+        """
+        Carga el modelo si hace falta y calcula los tiempos del prompt
+        
+        Args:
+            model: Modelo de la petición
+            prompt: Mensajes de la petición serializados
+            keep_alive: keep_alive de la petición (o None)
+            
+        Returns:
+            Dict[str, float]: Segundos de carga y de evaluación del prompt, y
+                tokens de prompt evaluados
+        """
+        now = time.monotonic()
+        with self._lock:
+            load = 0.0 if self._loaded.get(model, 0.0) > now else self.load_time
+            previous = self._last_prompt.get(model, "") if not load else ""
+            common = 0
+            for a, b in zip(previous, prompt):
+                if a != b:
+                    break
+                common += 1
+            if prompt:
+                self._last_prompt[model] = prompt
+            self._loaded[model] = now + load + parse_keep_alive(keep_alive, self.keep_alive)
+        evaluated = estimate_prompt_tokens(prompt[common:]) if prompt else 0
+        return {
+            "load": self._vary(load),
+            "prompt_eval": self._vary(evaluated / self.prompt_tokens_per_sec),
+            "prompt_eval_count": evaluated,
+        }
+    
+    def unload(self, model: str) -> None:
+        """Descarga un modelo (keep_alive: 0)"""
+        with self._lock:
+            self._loaded.pop(model, None)
+            self._last_prompt.pop(model, None)
+    
+    def response_words(self, limit: Optional[int] = None) -> List[str]:
+        """Palabras de una respuesta (como mucho `limit`, si se indica num_predict)"""
+        with self._lock:
+            start = self.rng.randrange(len(WORDS))
+        count = self.response_tokens if limit is None or limit < 0 else min(limit, self.response_tokens)
+        return [WORDS[(start + i) % len(WORDS)] for i in range(count)]
+    
+    def count_cancelled(self) -> None:
+        """Cuenta una respuesta abandonada por el cliente"""
+        with self._lock:
+            self.cancelled += 1
+
+class _FakeOllamaRequestHandler(BaseHTTPRequestHandler):
+    """Atiende las peticiones HTTP del servidor falso"""
+    
+    protocol_version = "HTTP/1.1"
+    
+    @property
+    def fake(self) -> FakeOllamaServer:
+        return self.server.fake
+    
+    def log_message(self, format, *args) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+    
+    def _send_json(self, status: int, body: Dict) -> None:
+        """Envía una respuesta JSON completa"""
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _send_chunk(self, body: Dict) -> None:
+        """Envía una línea NDJSON como fragmento HTTP"""
+        data = (json.dumps(body) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+    
+    def do_GET(self) -> None:
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": f"{model}:latest", "model": f"{model}:latest"}
+                                             for model in self.fake.models]})
+        elif self.path == "/api/ps":
+            self._send_json(200, {"models": [{"name": f"{model}:latest", "model": f"{model}:latest"}
+                                             for model in self.fake.loaded_models()]})
+        elif self.path == "/":
+            self._send_json(200, {"status": "Ollama is running"})
+        else:
+            self._send_json(404, {"error": "not found"})
+    
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+        if self.path != "/api/chat":
+            self._send_json(404, {"error": "not found"})
+            return
+        
+        model = str(payload.get("model", "")).split(":")[0]
+        if model not in self.fake.models:
+            self._send_json(404, {"error": f"model '{model}' not found"})
+            return
+        if self.fake.should_fail():
+            self._send_json(500, {"error": "fallo simulado del servidor falso"})
+            return
+        
+        started = time.perf_counter()
+        created_at = datetime.now(timezone.utc).isoformat()
+        messages = payload.get("messages") or []
+        keep_alive = payload.get("keep_alive")
+        if not messages:
+            # Sin mensajes, Ollama solo carga (o descarga) el modelo
+            if parse_keep_alive(keep_alive, self.fake.keep_alive) == 0:
+                self.fake.unload(model)
+                done_reason = "unload"
+            else:
+                time.sleep(self.fake.prepare(model, "", keep_alive)["load"])
+                done_reason = "load"
+            self._send_json(200, {"model": payload.get("model"), "created_at": created_at,
+                                  "message": {"role": "assistant", "content": ""},
+                                  "done_reason": done_reason, "done": True})
+            return
+        
+        prompt = json.dumps(messages, ensure_ascii=False, separators=(",", ":"))
+        timing = self.fake.prepare(model, prompt, keep_alive)
+        time.sleep(timing["load"] + timing["prompt_eval"]
+                   + self.fake._vary(self.fake.first_token_latency))
+        words = self.fake.response_words((payload.get("options") or {}).get("num_predict"))
+        token_delay = 1.0 / self.fake.tokens_per_sec if self.fake.tokens_per_sec > 0 else 0.0
+        eval_start = time.perf_counter()
+        
+        def summary() -> Dict:
+            eval_duration = time.perf_counter() - eval_start
+            return {
+                "model": payload.get("model"),
+                "created_at": created_at,
+                "done_reason": "stop",
+                "done": True,
+                "total_duration": int((time.perf_counter() - started) * 1e9),
+                "load_duration": int(timing["load"] * 1e9),
+                "prompt_eval_count": timing["prompt_eval_count"],
+                "prompt_eval_duration": int(timing["prompt_eval"] * 1e9),
+                "eval_count": len(words),
+                "eval_duration": int(eval_duration * 1e9),
+            }
+        
+        if payload.get("stream", True) is False:
+            time.sleep(self.fake._vary(token_delay * len(words)))
+            body = summary()
+            body["message"] = {"role": "assistant", "content": " ".join(words)}
+            self._send_json(200, body)
+            return
+        
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(self.fake._vary(token_delay))
+                self._send_chunk({"model": payload.get("model"), "created_at": created_at,
+                                  "message": {"role": "assistant",
+                                              "content": word if not i else " " + word},
+                                  "done": False})
+            body = summary()
+            body["message"] = {"role": "assistant", "content": ""}
+            self._send_chunk(body)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente cerró la conexión: Ollama deja de generar
+            self.fake.count_cancelled()
+            self.close_connection = True
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Punto de entrada de la línea de comandos
+    
+    Args:
+        argv: Argumentos (por defecto, los de sys.argv)
+        
+    Returns:
+        int: Código de salida
+    """
+    parser = argparse.ArgumentParser(description="Servidor falso de Ollama para pruebas de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--models", nargs="+", default=["openchat"])
+    parser.add_argument("--first-token-ms", type=float, default=200,
+                        help="Latencia fija hasta el primer token")
+    parser.add_argument("--tokens-per-sec", type=float, default=30)
+    parser.add_argument("--prompt-tokens-per-sec", type=float, default=2000)
+    parser.add_argument("--response-tokens", type=int, default=40)
+    parser.add_argument("--load-ms", type=float, default=1000,
+                        help="Tiempo de carga de un modelo no cargado")
+    parser.add_argument("--keep-alive", default="5m",
+                        help="Tiempo que un modelo sigue cargado (como keep_alive de Ollama)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Probabilidad de responder con un error 500")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
+    server = FakeOllamaServer(
+        host=args.host, port=args.port, models=args.models,
+        first_token_latency=args.first_token_ms / 1000, tokens_per_sec=args.tokens_per_sec,
+        prompt_tokens_per_sec=args.prompt_tokens_per_sec,
+        response_tokens=args.response_tokens, load_time=args.load_ms / 1000,
+        keep_alive=parse_keep_alive(args.keep_alive, 300.0), error_rate=args.error_rate,
+        jitter=args.jitter, seed=args.seed
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info(f"Ollama falso detenido: {server.stats()}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Generador de carga para el camino de conversación de Nova
+Lanza N clientes concurrentes contra la aplicación (HTTP o Socket.IO) o
+directamente contra un servidor de Ollama, y mide rendimiento, tiempo hasta
+el primer token (TTFT) y latencia extremo a extremo
+
+Uso:
+    python -m benchmarks.fake_ollama --port 11435 &
+    VERCEL=1 OLLAMA_API_URLS=http://127.0.0.1:11435/api/chat python main.py &
+    python -m benchmarks.llm_load --mode socketio --url http://127.0.0.1:8000 --clients 8
+    python -m benchmarks.llm_load --mode ollama --url http://127.0.0.1:11435/api/chat
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from benchmarks.memory_bench import PERCENTILES, git_revision, percentile
+
+logger = logging.getLogger('benchmarks.llm_load')
+
+MESSAGES = [
+    "Hola Nova, ¿qué tal estás hoy?",
+    "Hoy he tenido un día muy largo en el trabajo",
+    "¿Me recomiendas algún libro para el fin de semana?",
+    "Estoy pensando en aprender a tocar la guitarra",
+    "Mañana tengo una entrevista y estoy algo nervioso",
+    "Cuéntame algo curioso sobre el espacio",
+]
+
+class RequestResult:
+    """Resultado de una petición del generador de carga"""
+    
+    __slots__ = ("ok", "ttft", "latency", "chunks", "error")
+    
+    def __init__(self, ok: bool, latency: float, ttft: Optional[float] = None,
+                 chunks: int = 0, error: Optional[str] = None):
+        self.ok = ok
+        self.latency = latency
+        self.ttft = ttft
+        self.chunks = chunks
+        self.error = error
+
+def open_session(url: str, timeout: float) -> requests.Session:
+    """
+    Abre una sesión de usuario nueva cargando la página principal
+    
+    La aplicación identifica al usuario (y su memoria) por la cookie de
+    sesión que fija `index()`, así que cada cliente simulado es un usuario.
+    
+    Args:
+        url: URL base de la aplicación
+        timeout: Segundos máximos de la petición
+        
+    Returns:
+        requests.Session: Sesión con la cookie del usuario
+    """
+    session = requests.Session()
+    response = session.get(f"{url}/", timeout=timeout)
+    response.raise_for_status()
+    return session
+
+def http_client(url: str, timeout: float) -> Callable[[str], RequestResult]:
+    """
+    Crea un cliente que usa POST /api/send_message (sin streaming: no hay TTFT)
+    
+    Args:
+        url: URL base de la aplicación
+        timeout: Segundos máximos por petición
+        
+    Returns:
+        Callable[[str], RequestResult]: Función que envía un mensaje
+    """
+    session = open_session(url, timeout)
+    
+    def send(message: str) -> RequestResult:
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{url}/api/send_message", json={"message": message},
+                                    timeout=timeout)
+            response.raise_for_status()
+            response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            return RequestResult(False, time.perf_counter() - start, error=str(e))
+        return RequestResult(True, time.perf_counter() - start)
+    return send
+
+def socketio_client(url: str, timeout: float) -> Callable[[str], RequestResult]:
+    """
+    Crea un cliente Socket.IO que envía `send_message` con streaming
+    
+    El TTFT es el tiempo hasta el primer `nova_token`, y la latencia total
+    hasta `nova_response`.
+    
+    Args:
+        url: URL base de la aplicación
+        timeout: Segundos máximos por petición
+        
+    Returns:
+        Callable[[str], RequestResult]: Función que envía un mensaje
+    """
+    import socketio
+    
+    cookies = open_session(url, timeout).cookies
+    client = socketio.Client(reconnection=False)
+    state: Dict = {}
+    done = threading.Event()
+    
+    @client.on('nova_token')
+    def on_token(data):
+        if state.get("ttft") is None:
+            state["ttft"] = time.perf_counter() - state["start"]
+        state["chunks"] += 1
+    
+    @client.on('nova_response')
+    def on_response(data):
+        state["end"] = time.perf_counter()
+        done.set()
+    
+    @client.on('error')
+    def on_error(data):
+        state["error"] = str(data)
+        state["end"] = time.perf_counter()
+        done.set()
+    
+    client.connect(url, wait_timeout=timeout, headers={
+        "Cookie": "; ".join(f"{name}={value}" for name, value in cookies.items())
+    })
+    
+    def send(message: str) -> RequestResult:
+        done.clear()
+        state.clear()
+        state.update(start=time.perf_counter(), ttft=None, chunks=0)
+        client.emit('send_message', {"message": message})
+        if not done.wait(timeout):
+            return RequestResult(False, time.perf_counter() - state["start"], error="timeout")
+        latency = state["end"] - state["start"]
+        if "error" in state:
+            return RequestResult(False, latency, error=state["error"])
+        return RequestResult(True, latency, ttft=state["ttft"], chunks=state["chunks"])
+    send.close = client.disconnect
+    return send
+
+def ollama_client(url: str, timeout: float, model: str) -> Callable[[str], RequestResult]:
+    """
+    Crea un cliente que usa OllamaHandler en streaming contra Ollama (o el falso)
+    
+    Args:
+        url: URL de /api/chat
+        timeout: Segundos máximos por generación
+        model: Modelo a utilizar
+        
+    Returns:
+        Callable[[str], RequestResult]: Función que envía un mensaje
+    """
+    from nova.backend.ai_handler import OllamaHandler, build_chat_payload
+    
+    handler = OllamaHandler(url, model, check_connection=False, total_timeout=timeout)
+    
+    def send(message: str) -> RequestResult:
+        start = time.perf_counter()
+        ttft = None
+        chunks = 0
+        try:
+            for chunk in handler._iter_chat(build_chat_payload(model, message, stream=True)):
+                if chunk.get("message", {}).get("content"):
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    chunks += 1
+        except requests.exceptions.RequestException as e:
+            return RequestResult(False, time.perf_counter() - start, error=str(e))
+        return RequestResult(True, time.perf_counter() - start, ttft=ttft, chunks=chunks)
+    return send
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    Calcula la media y los percentiles de una lista de latencias
+    
+    Args:
+        samples: Latencias en segundos
+        
+    Returns:
+        Dict[str, float]: Estadísticas en milisegundos
+    """
+    if not samples:
+        return {}
+    ordered = sorted(sample * 1000 for sample in samples)
+    result = {"mean_ms": sum(ordered) / len(ordered), "max_ms": ordered[-1]}
+    for pct in PERCENTILES:
+        result[f"p{pct}_ms"] = percentile(ordered, pct)
+    return result
+
+def run_load(make_client: Callable[[], Callable[[str], RequestResult]], clients: int,
+             requests_per_client: int, warmup: int) -> Dict:
+    """
+    Ejecuta la prueba de carga con `clients` clientes concurrentes
+    
+    Args:
+        make_client: Función que crea un cliente (una conexión por cliente)
+        clients: Número de clientes concurrentes
+        requests_per_client: Peticiones medidas por cliente
+        warmup: Peticiones previas por cliente que no se miden
+        
+    Returns:
+        Dict: Rendimiento, TTFT, latencia total y errores
+    """
+    results: List[RequestResult] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+    ready = threading.Barrier(clients + 1)
+    
+    def worker(index: int) -> None:
+        send = None
+        try:
+            send = make_client()
+            for i in range(warmup):
+                send(MESSAGES[(index + i) % len(MESSAGES)])
+        except Exception as e:
+            with lock:
+                errors.append(f"cliente {index}: {str(e)}")
+        ready.wait()
+        if send is None:
+            return
+        local = [send(MESSAGES[(index + warmup + i) % len(MESSAGES)])
+                 for i in range(requests_per_client)]
+        with lock:
+            results.extend(local)
+        if hasattr(send, "close"):
+            send.close()
+    
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    ok = [result for result in results if result.ok]
+    failed = [result for result in results if not result.ok]
+    chunks = sum(result.chunks for result in ok)
+    report = {
+        "clients": clients,
+        "requests": len(results),
+        "errors": len(failed) + len(errors),
+        "seconds": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "chunks_per_sec": chunks / elapsed if elapsed else 0.0,
+        "latency": summarize([result.latency for result in ok]),
+        "ttft": summarize([result.ttft for result in ok if result.ttft is not None]),
+    }
+    samples = errors + [result.error for result in failed[:5]]
+    if samples:
+        report["error_samples"] = samples[:5]
+    return report
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Punto de entrada de la línea de comandos
+    
+    Args:
+        argv: Argumentos (por defecto, los de sys.argv)
+        
+    Returns:
+        int: 0 si todas las peticiones terminaron bien (y se alcanzó
+            --min-speedup), 1 si no
+    """
+    parser = argparse.ArgumentParser(description="Prueba de carga de la conversación con Nova")
+    parser.add_argument("--mode", choices=["http", "socketio", "ollama"], default="socketio",
+                        help="http y socketio atacan la aplicación; ollama, el servidor de Ollama")
+    parser.add_argument("--url", default="http://127.0.0.1:8000",
+                        help="URL base de la aplicación, o de /api/chat con --mode ollama")
+    parser.add_argument("--model", default="openchat", help="Modelo (solo con --mode ollama)")
+    parser.add_argument("--clients", type=int, nargs="+", default=[4],
+                        help="Clientes concurrentes (varios valores = varias rondas)")
+    parser.add_argument("--requests", type=int, default=10, help="Peticiones medidas por cliente")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Archivo JSON de resultados (opcional)")
+    parser.add_argument("--min-speedup", type=float, default=0.0,
+                        help="Falla si el rendimiento con más clientes no multiplica al de la "
+                             "primera ronda por este factor (0 = no comprobar)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger('nova').setLevel(logging.WARNING)
+    
+    url = args.url.rstrip("/")
+    if args.mode == "http":
+        make_client = lambda: http_client(url, args.timeout)
+    elif args.mode == "socketio":
+        make_client = lambda: socketio_client(url, args.timeout)
+    else:
+        make_client = lambda: ollama_client(url, args.timeout, args.model)
+    
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "mode": args.mode,
+            "url": url,
+            "requests_per_client": args.requests,
+        },
+        "results": {}
+    }
+    failed = False
+    for clients in args.clients:
+        result = run_load(make_client, clients, args.requests, args.warmup)
+        report["results"][str(clients)] = result
+        failed = failed or result["errors"] > 0
+        ttft = result["ttft"]
+        logger.info(f"[{clients} clientes] {result['throughput_rps']:.2f} pet/s, "
+                    f"{result['chunks_per_sec']:.1f} fragmentos/s, "
+                    f"errores={result['errors']}")
+        logger.info(f"    total: p50={result['latency'].get('p50_ms', 0):.0f} ms "
+                    f"p95={result['latency'].get('p95_ms', 0):.0f} ms "
+                    f"p99={result['latency'].get('p99_ms', 0):.0f} ms")
+        if ttft:
+            logger.info(f"    TTFT:  p50={ttft['p50_ms']:.0f} ms p95={ttft['p95_ms']:.0f} ms "
+                        f"p99={ttft['p99_ms']:.0f} ms")
+        for sample in result.get("error_samples", []):
+            logger.warning(f"    error: {sample}")
+    
+    if args.min_speedup > 0 and len(args.clients) > 1:
+        # Un servidor que atiende los turnos de uno en uno no mejora al
+        # añadir clientes: eso debe hacer fallar la prueba, no quedar anotado
+        rounds = report["results"]
+        base = rounds[str(args.clients[0])]["throughput_rps"]
+        best = rounds[str(max(args.clients))]["throughput_rps"]
+        speedup = best / base if base else 0.0
+        report["speedup"] = speedup
+        if speedup < args.min_speedup:
+            logger.error(f"Rendimiento con {max(args.clients)} clientes: x{speedup:.2f} respecto a "
+                         f"{args.clients[0]} (mínimo x{args.min_speedup:.2f})")
+            failed = True
+        else:
+            logger.info(f"Aceleración con {max(args.clients)} clientes: x{speedup:.2f}")
+    
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logger.info(f"Resultados guardados en {args.output}")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
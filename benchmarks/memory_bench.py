@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks del subsistema de memoria de Nova
+Mide la latencia de las operaciones principales sobre corpus de distintos tamaños
+
+Uso:
+    python -m benchmarks.memory_bench --rows 10000 100000
+    python -m benchmarks.memory_bench --rows 1000000 --compare benchmarks/results/base.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.corpus import CorpusGenerator, generate_corpus
+from nova.memory.memory_manager import MemoryManager
+
+logger = logging.getLogger('benchmarks.memory_bench')
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PERCENTILES = (50, 90, 95, 99)
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Calcula un percentil por interpolación lineal
+    
+    Args:
+        sorted_values: Valores ordenados de menor a mayor
+        pct: Percentil (0-100)
+        
+    Returns:
+        float: Valor del percentil
+    """
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def measure(operation: Callable[[int], object], iterations: int, warmup: int) -> Dict[str, float]:
+    """
+    Mide la latencia de una operación
+    
+    Args:
+        operation: Función que recibe el número de iteración
+        iterations: Número de mediciones
+        warmup: Iteraciones previas que no se miden
+        
+    Returns:
+        Dict[str, float]: Estadísticas en milisegundos y operaciones por segundo
+    """
+    for i in range(warmup):
+        operation(i)
+    
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        operation(warmup + i)
+        samples.append((time.perf_counter() - start) * 1000)
+    
+    samples.sort()
+    total = sum(samples)
+    result = {
+        "iterations": iterations,
+        "mean_ms": total / iterations,
+        "stdev_ms": statistics.stdev(samples) if iterations > 1 else 0.0,
+        "min_ms": samples[0],
+        "max_ms": samples[-1],
+        "ops_per_sec": iterations / (total / 1000) if total else 0.0,
+    }
+    for pct in PERCENTILES:
+        result[f"p{pct}_ms"] = percentile(samples, pct)
+    return result
+
+def git_revision() -> Optional[str]:
+    """
+    Obtiene el commit actual del repositorio, si está disponible
+    
+    Returns:
+        Optional[str]: Hash corto del commit (con "+" si hay cambios sin confirmar)
+    """
+    try:
+        revision = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                           cwd=BENCH_DIR, stderr=subprocess.DEVNULL,
+                                           text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"], cwd=BENCH_DIR,
+                                stderr=subprocess.DEVNULL) != 0
+        return revision + ("+" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_size(db_path: str, rows: int, iterations: int, warmup: int, seed: int,
+             semantic_memory: bool, write_behind: bool) -> Dict[str, Dict[str, float]]:
+    """
+    Ejecuta todos los benchmarks sobre un corpus de `rows` conversaciones
+    
+    Args:
+        db_path: Base de datos del corpus
+        rows: Número de conversaciones del corpus
+        iterations: Mediciones por operación
+        warmup: Iteraciones de calentamiento por operación
+        seed: Semilla del corpus
+        semantic_memory: Si es True, se activa la memoria semántica
+        write_behind: Si es True, save_conversation usa escritura diferida
+        
+    Returns:
+        Dict[str, Dict[str, float]]: Estadísticas por operación
+    """
+    generate_corpus(db_path, rows, seed=seed)
+    
+    start = time.perf_counter()
+    manager = MemoryManager(db_path=db_path, semantic_memory=semantic_memory,
+                            write_behind=write_behind)
+    results: Dict[str, Dict[str, float]] = {
+        "open": {"seconds": time.perf_counter() - start}
+    }
+    
+    # Consultas de otra semilla: parecidas al corpus pero no idénticas
+    generator = CorpusGenerator(seed + 1)
+    queries = [generator.message() for _ in range(iterations + warmup)]
+    search_terms = [generator.rng.choice(generator.topic_words)[1] for _ in queries]
+    
+    try:
+        operations = [
+            ("get_recent_conversations", lambda i: manager.get_recent_conversations(10)),
+            ("search_conversations", lambda i: manager.db.search_conversations(search_terms[i])),
+            ("get_user_info_summary", lambda i: manager.get_user_info_summary()),
+            ("get_memory_for_context", lambda i: manager.get_memory_for_context(queries[i][0])),
+            # Las escrituras al final para no alterar el corpus de las lecturas
+            ("save_conversation", lambda i: manager.save_conversation(queries[i][0], queries[i][1])),
+        ]
+        for name, operation in operations:
+            results[name] = measure(operation, iterations, warmup)
+            logger.info(f"[{rows} filas] {name}: p50={results[name]['p50_ms']:.3f} ms "
+                        f"p99={results[name]['p99_ms']:.3f} ms")
+        manager.flush()
+    finally:
+        manager.close()
+    
+    # Las conversaciones guardadas durante la medición se eliminan para que
+    # el corpus siga teniendo exactamente `rows` filas en la siguiente ejecución
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute("DELETE FROM conversations WHERE id > ?", (rows,))
+            if semantic_memory:
+                conn.execute("DELETE FROM conversation_embeddings WHERE conversation_id > ?",
+                             (rows,))
+    finally:
+        conn.close()
+    
+    return results
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Compara dos resultados y devuelve las regresiones de p50 y p95
+    
+    Args:
+        current: Resultados actuales
+        baseline: Resultados de referencia
+        threshold: Aumento relativo tolerado (0.2 = 20 %)
+        
+    Returns:
+        List[str]: Descripción de cada regresión encontrada
+    """
+    regressions = []
+    for rows, operations in current["results"].items():
+        for name, stats in operations.items():
+            reference = baseline.get("results", {}).get(rows, {}).get(name)
+            if not reference:
+                continue
+            for metric in ("p50_ms", "p95_ms"):
+                if metric not in stats or not reference.get(metric):
+                    continue
+                ratio = stats[metric] / reference[metric]
+                if ratio > 1 + threshold:
+                    regressions.append(f"{rows} filas, {name} {metric}: "
+                                       f"{reference[metric]:.3f} -> {stats[metric]:.3f} ms "
+                                       f"(x{ratio:.2f})")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Punto de entrada de la línea de comandos
+    
+    Args:
+        argv: Argumentos (por defecto, los de sys.argv)
+        
+    Returns:
+        int: 0 si no hay regresiones, 1 si las hay
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks de la memoria de Nova")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000],
+                        help="Tamaños del corpus (por ejemplo 10000 100000 1000000)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=os.path.join(BENCH_DIR, "data"),
+                        help="Directorio de los corpus (se reutilizan entre ejecuciones)")
+    parser.add_argument("--output", help="Archivo JSON de resultados "
+                                         "(por defecto benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Resultados de referencia para detectar regresiones")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Aumento relativo de latencia tolerado al comparar")
+    parser.add_argument("--no-semantic", action="store_true",
+                        help="Desactiva la memoria semántica (índice de vectores)")
+    parser.add_argument("--write-behind", action="store_true",
+                        help="Mide save_conversation con escritura diferida")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger('nova').setLevel(logging.WARNING)
+    
+    revision = git_revision()
+    report = {
+        "meta": {
+            "revision": revision,
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "semantic_memory": not args.no_semantic,
+            "write_behind": args.write_behind,
+        },
+        "results": {}
+    }
+    
+    os.makedirs(args.data_dir, exist_ok=True)
+    for rows in args.rows:
+        db_path = os.path.join(args.data_dir, f"memory_{rows}.db")
+        report["results"][str(rows)] = run_size(
+            db_path, rows, args.iterations, args.warmup, args.seed,
+            semantic_memory=not args.no_semantic, write_behind=args.write_behind
+        )
+    
+    output = args.output or os.path.join(BENCH_DIR, "results",
+                                         f"{(revision or 'local').rstrip('+')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    logger.info(f"Resultados guardados en {output}")
+    
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            logger.warning("Regresiones detectadas:")
+            for regression in regressions:
+                logger.warning(f"  {regression}")
+            return 1
+        logger.info(f"Sin regresiones respecto a {args.compare}")
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
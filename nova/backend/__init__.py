@@ -7,4 +7,5 @@ Este paquete contiene los módulos relacionados con la comunicación
 con el modelo de IA (Ollama) y la gestión de la personalidad de Nova.
 """
 
-__all__ = ['ai_handler', 'personality']
\ No newline at end of file
+__all__ = ['ai_handler', 'async_ai_handler', 'conversation_window', 'ollama_pool',
+           'personality', 'resilience', 'response_cache', 'telemetry', 'warmup']
\ No newline at end of file
@@ -8,28 +8,106 @@ Gestiona el envío y recepción de mensajes con el modelo de IA
 
 import json
 import logging
+import time
 import requests
-from typing import Dict, List, Optional, Union
+from contextlib import nullcontext
+from typing import Dict, Iterator, List, Optional, Union
+
+from urllib3.exceptions import ReadTimeoutError
+
+from nova.backend.resilience import (CancellableAdapter, CircuitBreaker, CircuitOpenError,
+                                     DeadlineExceeded, LatencyTracker, Metrics, StreamCancel)
+from nova.backend.response_cache import ResponseCache
+from nova.backend.telemetry import GenerationTelemetry
 
 logger = logging.getLogger('nova.ai_handler')
 
+def build_chat_payload(model_name: str, message: str,
+                       conversation_history: Optional[List[Dict]] = None,
+                       system_prompt: Optional[str] = None, stream: bool = False,
+                       keep_alive: Optional[Union[str, float]] = None) -> Dict:
+    """Prepara el cuerpo de una petición a /api/chat
+    
+    Para aprovechar la caché del prefijo de Ollama, el prompt de sistema y el
+    historial deben llegar idénticos entre turnos: lo que cambia en cada
+    turno debe ir al final del historial.
+    
+    Args:
+        model_name: Nombre del modelo a utilizar
+        message: Mensaje a enviar al modelo
+        conversation_history: Historial de conversación previo (opcional)
+        system_prompt: Prompt de sistema para definir el comportamiento (opcional)
+        stream: Si es True, Ollama devuelve la respuesta en fragmentos
+        keep_alive: Tiempo que Ollama mantiene el modelo (y su caché) en
+            memoria tras la petición, como "30m" o segundos (opcional)
+        
+    Returns:
+        Dict: Payload para la API de Ollama
+    """
+    messages = list(conversation_history or []) + [{"role": "user", "content": message}]
+    
+    # Agregar el prompt de sistema si se proporciona
+    if system_prompt:
+        messages.insert(0, {"role": "system", "content": system_prompt})
+    
+    payload = {
+        "model": model_name,
+        "messages": messages,
+        "stream": stream
+    }
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    return payload
+
 class OllamaHandler:
     """Clase para manejar la comunicación con la API de Ollama"""
     
-    def __init__(self, api_url: str, model_name: str):
+    def __init__(self, api_url: str, model_name: str, cache: Optional[ResponseCache] = None,
+                 check_connection: bool = True, connect_timeout: float = 5.0,
+                 first_token_timeout: float = 60.0, total_timeout: float = 300.0,
+                 breaker: Optional[CircuitBreaker] = None,
+                 telemetry: Optional[GenerationTelemetry] = None,
+                 keep_alive: Optional[Union[str, float]] = None):
         """Inicializa el manejador de Ollama
         
         Args:
             api_url: URL de la API de Ollama (ej: http://localhost:11434/api/chat)
             model_name: Nombre del modelo a utilizar (ej: nous-hermes:7b)
+            cache: Caché de respuestas para peticiones idénticas (opcional)
+            check_connection: Si es True, se verifica la conexión al iniciar
+            connect_timeout: Segundos máximos para conectar con Ollama
+            first_token_timeout: Segundos máximos hasta el primer fragmento en
+                streaming (también entre fragmentos: Ollama no se detiene a
+                mitad de una respuesta)
+            total_timeout: Segundos máximos de una generación completa
+            breaker: Cortocircuito del servidor (por defecto, uno propio)
+            telemetry: Telemetría de las generaciones (por defecto, una propia)
+            keep_alive: keep_alive que se envía en cada petición para que
+                Ollama no descargue el modelo (por defecto, el de Ollama)
         """
         self.api_url = api_url
         self.model_name = model_name
+        self.cache = cache
         self.session = requests.Session()
+        # Permite cortar una respuesta en streaming desde otro hilo (StreamCancel)
+        self.session.mount("http://", CancellableAdapter())
+        self.session.mount("https://", CancellableAdapter())
+        self.connect_timeout = connect_timeout
+        self.first_token_timeout = first_token_timeout
+        self.total_timeout = total_timeout
+        self.keep_alive = keep_alive
+        self.breaker = breaker or CircuitBreaker(name=api_url.split('/api/')[0])
+        # Contadores y latencias recientes (primer fragmento y respuesta completa)
+        self.metrics = Metrics()
+        self.first_token_latency = LatencyTracker()
+        self.response_latency = LatencyTracker()
+        # Tiempos que Ollama envía con cada respuesta, por modelo
+        self.telemetry = telemetry or GenerationTelemetry()
         logger.info(f"Inicializado OllamaHandler con modelo {model_name}")
         
         # Verificar conexión con Ollama
-        self._check_connection()
+        if check_connection:
+            self._check_connection()
     
     def _check_connection(self) -> bool:
         """Verifica la conexión con Ollama
@@ -43,7 +121,7 @@ class OllamaHandler:
             
         # Si falla, intentar con la IP alternativa
         if 'localhost' in self.api_url:
-            alt_api_url = self.api_url.replace('localhost', 'localhost')
+            alt_api_url = self.api_url.replace('localhost', '127.0.0.1')
             logger.info(f"Intentando conexión alternativa con: {alt_api_url}")
             
             # Guardar la URL original
@@ -71,7 +149,8 @@ class OllamaHandler:
         try:
             # Extraer la URL base sin el endpoint específico
             base_url = self.api_url.split('/api/')[0]
-            response = self.session.get(f"{base_url}/api/tags")
+            response = self.session.get(f"{base_url}/api/tags",
+                                        timeout=(self.connect_timeout, self.first_token_timeout))
             response.raise_for_status()
             
             # Verificar si el modelo está disponible
@@ -89,6 +168,204 @@ class OllamaHandler:
             logger.error(f"Error al conectar con Ollama: {str(e)}")
             return False
     
+    def _guard(self) -> None:
+        """Rechaza la petición de inmediato si el cortocircuito está abierto
+        
+        Raises:
+            CircuitOpenError: Si el servidor se considera caído
+        """
+        if not self.breaker.allow():
+            self.metrics.incr("circuit_rejections")
+            raise CircuitOpenError(f"Cortocircuito abierto para {self.api_url}")
+        self.metrics.incr("requests")
+    
+    def _record_error(self, error: requests.exceptions.RequestException, phase: str) -> None:
+        """Registra un fallo en el cortocircuito y en las métricas
+        
+        Args:
+            error: Excepción de la petición
+            phase: Fase en la que falló ("first_token", "stream" o "response")
+        """
+        response = getattr(error, 'response', None)
+        if isinstance(error, requests.exceptions.HTTPError) and response is not None \
+                and response.status_code < 500:
+            # Error de la petición (modelo inexistente...): el servidor está sano
+            self.breaker.record_success()
+            self.metrics.incr("client_errors")
+            return
+        
+        self.breaker.record_failure()
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            self.metrics.incr("connect_timeouts")
+        elif isinstance(error, DeadlineExceeded):
+            self.metrics.incr("total_timeouts")
+        elif isinstance(error, requests.exceptions.ReadTimeout) or \
+                (error.args and isinstance(error.args[0], ReadTimeoutError)):
+            self.metrics.incr("total_timeouts" if phase == "response" else f"{phase}_timeouts")
+        else:
+            self.metrics.incr("errors")
+    
+    def _post_chat(self, payload: Dict) -> Dict:
+        """Envía una petición no streaming a /api/chat
+        
+        Args:
+            payload: Payload de la petición
+            
+        Returns:
+            Dict: Respuesta JSON de Ollama
+            
+        Raises:
+            requests.exceptions.RequestException: Si la petición falla, supera
+                sus plazos o el cortocircuito está abierto
+        """
+        self._guard()
+        start = time.perf_counter()
+        try:
+            # Sin streaming no hay primer fragmento: el plazo de lectura es el total
+            response = self.session.post(self.api_url, json=payload,
+                                         timeout=(self.connect_timeout, self.total_timeout))
+            response.raise_for_status()
+            result = response.json()
+        except requests.exceptions.RequestException as e:
+            self._record_error(e, "response")
+            raise
+        except Exception:
+            # Cualquier otro fallo también cierra la prueba del semiabierto
+            self.breaker.record_failure()
+            self.metrics.incr("errors")
+            raise
+        self.breaker.record_success()
+        self.response_latency.add(time.perf_counter() - start)
+        return result
+    
+    def _iter_chat(self, payload: Dict, cancel: Optional[StreamCancel] = None) -> Iterator[Dict]:
+        """Envía una petición streaming a /api/chat
+        
+        Args:
+            payload: Payload de la petición
+            cancel: Permite cerrar la respuesta desde otro hilo (opcional); si
+                se cancela, la iteración termina sin error
+            
+        Yields:
+            Dict: Cada objeto JSON enviado por Ollama
+            
+        Raises:
+            requests.exceptions.RequestException: Si la petición falla, supera
+                sus plazos o el cortocircuito está abierto
+        """
+        self._guard()
+        start = time.perf_counter()
+        received = False
+        try:
+            with cancel.bind() if cancel is not None else nullcontext():
+                response = self.session.post(self.api_url, json=payload, stream=True,
+                                             timeout=(self.connect_timeout, self.first_token_timeout))
+            if cancel is not None:
+                cancel.attach(response)
+            with response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if time.perf_counter() - start > self.total_timeout:
+                        raise DeadlineExceeded(f"La generación superó {self.total_timeout}s")
+                    if line:
+                        try:
+                            chunk = json.loads(line)
+                        except json.JSONDecodeError:
+                            logger.warning(f"Error al decodificar respuesta de streaming: {line}")
+                            continue
+                        if not received:
+                            received = True
+                            self.first_token_latency.add(time.perf_counter() - start)
+                        yield chunk
+        except GeneratorExit:
+            # El cliente abandonó la respuesta: el servidor sí respondía
+            self.breaker.record_success()
+            raise
+        except Exception as e:
+            if cancel is not None and cancel.is_set():
+                # Conexión cerrada a propósito desde otro hilo: no es un fallo
+                self.breaker.record_success()
+                return
+            if isinstance(e, requests.exceptions.RequestException):
+                self._record_error(e, "stream" if received else "first_token")
+            else:
+                # Cualquier otro fallo también cierra la prueba del semiabierto
+                self.breaker.record_failure()
+                self.metrics.incr("errors")
+            raise
+        self.breaker.record_success()
+    
+    def post_internal(self, payload: Dict) -> Dict:
+        """Envía una petición interna de Nova (no streaming) a /api/chat
+        
+        Es para el trabajo de fondo de la propia aplicación, como resumir el
+        historial: no pasa por el cortocircuito, las métricas, la telemetría
+        ni la caché, que solo reflejan las peticiones de los usuarios.
+        
+        Args:
+            payload: Payload de la petición
+            
+        Returns:
+            Dict: Respuesta JSON de Ollama
+            
+        Raises:
+            requests.exceptions.RequestException: Si la petición falla o
+                supera sus plazos
+        """
+        response = self.session.post(self.api_url, json=payload,
+                                     timeout=(self.connect_timeout, self.total_timeout))
+        response.raise_for_status()
+        return response.json()
+    
+    def preload(self, system_prompt: Optional[str] = None,
+                keep_alive: Optional[Union[str, float]] = None) -> Dict:
+        """Carga el modelo en Ollama sin contar como petición de un usuario
+        
+        Sin `system_prompt`, se envía una petición sin mensajes, que en Ollama
+        solo carga el modelo. Con él, se genera un único token a partir del
+        prompt de sistema, de modo que Ollama deja ese prefijo evaluado en su
+        caché. Como `post_internal`, no pasa por el cortocircuito ni las
+        métricas: una precarga fallida no aparta el servidor.
+        
+        Args:
+            system_prompt: Prompt de sistema que se deja evaluado (opcional)
+            keep_alive: Tiempo que el modelo sigue cargado (por defecto, el
+                del manejador)
+                
+        Returns:
+            Dict: Respuesta JSON de Ollama (con load_duration)
+            
+        Raises:
+            requests.exceptions.RequestException: Si la petición falla o
+                supera sus plazos
+        """
+        if keep_alive is None:
+            keep_alive = self.keep_alive
+        if not system_prompt:
+            payload = {"model": self.model_name, "messages": [], "stream": False}
+            if keep_alive is not None:
+                payload["keep_alive"] = keep_alive
+        else:
+            payload = build_chat_payload(self.model_name, "Hola", system_prompt=system_prompt,
+                                         stream=False, keep_alive=keep_alive)
+            payload["options"] = {"num_predict": 1}
+        return self.post_internal(payload)
+    
+    def get_metrics(self) -> Dict:
+        """Obtiene las métricas de las peticiones a Ollama
+        
+        Returns:
+            Dict: Contadores, estado del cortocircuito y percentiles de latencia (ms)
+        """
+        metrics = self.metrics.snapshot()
+        metrics["circuit"] = self.breaker.state
+        for name, tracker in (("first_token", self.first_token_latency),
+                              ("response", self.response_latency)):
+            for pct in (50, 95):
+                value = tracker.percentile(pct, min_samples=1)
+                metrics[f"{name}_p{pct}_ms"] = round(value * 1000, 1) if value is not None else None
+        return metrics
+    
     def send_message(self, message: str, conversation_history: Optional[List[Dict]] = None, 
                     system_prompt: Optional[str] = None) -> Dict:
         """Envía un mensaje al modelo y obtiene su respuesta
@@ -101,35 +378,35 @@ class OllamaHandler:
         Returns:
             Dict: Respuesta del modelo con el texto generado
         """
-        if conversation_history is None:
-            conversation_history = []
-        
         # Preparar el payload para la API
-        payload = {
-            "model": self.model_name,
-            "messages": conversation_history + [{"role": "user", "content": message}],
-            "stream": False
-        }
+        payload = build_chat_payload(self.model_name, message, conversation_history,
+                                     system_prompt, stream=False,
+                                     keep_alive=self.keep_alive)
         
-        # Agregar el prompt de sistema si se proporciona
-        if system_prompt:
-            payload["messages"].insert(0, {"role": "system", "content": system_prompt})
+        # Las peticiones idénticas se responden desde la caché
+        cache_key = self.cache.make_key(payload) if self.cache is not None else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"Respuesta servida desde la caché: {cached[:50]}...")
+                return {"response": cached, "model": self.model_name, "cached": True}
         
         logger.debug(f"Enviando mensaje a Ollama: {message[:50]}...")
         
         try:
-            response = self.session.post(self.api_url, json=payload)
-            response.raise_for_status()
-            result = response.json()
+            result = self._post_chat(payload)
             
             # Extraer la respuesta del modelo
             assistant_message = result.get('message', {}).get('content', '')
             logger.debug(f"Respuesta recibida de Ollama: {assistant_message[:50]}...")
+            if cache_key is not None and assistant_message:
+                self.cache.put(cache_key, assistant_message)
             
             return {
                 "response": assistant_message,
                 "model": self.model_name,
-                "raw_response": result
+                "raw_response": result,
+                "stats": self.telemetry.record(result.get('model') or self.model_name, result)
             }
             
         except requests.exceptions.RequestException as e:
@@ -149,37 +426,43 @@ class OllamaHandler:
         Yields:
             str: Fragmentos de texto de la respuesta del modelo
         """
-        if conversation_history is None:
-            conversation_history = []
-        
         # Preparar el payload para la API
-        payload = {
-            "model": self.model_name,
-            "messages": conversation_history + [{"role": "user", "content": message}],
-            "stream": True
-        }
+        payload = build_chat_payload(self.model_name, message, conversation_history,
+                                     system_prompt, stream=True,
+                                     keep_alive=self.keep_alive)
         
-        # Agregar el prompt de sistema si se proporciona
-        if system_prompt:
-            payload["messages"].insert(0, {"role": "system", "content": system_prompt})
+        # Las peticiones idénticas se responden desde la caché, de una vez
+        cache_key = self.cache.make_key(payload) if self.cache is not None else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"Respuesta servida desde la caché: {cached[:50]}...")
+                yield cached
+                return
         
         logger.debug(f"Iniciando streaming de mensaje a Ollama: {message[:50]}...")
         
         try:
-            response = self.session.post(self.api_url, json=payload, stream=True)
-            response.raise_for_status()
-            
             # Procesar la respuesta en streaming
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        chunk = json.loads(line)
-                        content = chunk.get('message', {}).get('content', '')
-                        if content:
-                            yield content
-                    except json.JSONDecodeError:
-                        logger.warning(f"Error al decodificar respuesta de streaming: {line}")
-                        continue
+            parts = []
+            completed = False
+            start = time.perf_counter()
+            ttft = None
+            for chunk in self._iter_chat(payload):
+                content = chunk.get('message', {}).get('content', '')
+                if content:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    parts.append(content)
+                    yield content
+                if chunk.get('done', False):
+                    # El último fragmento no trae texto, pero sí los tiempos
+                    completed = True
+                    self.telemetry.record(chunk.get('model') or self.model_name, chunk, ttft)
+            
+            # Solo se guardan las respuestas que Ollama dio por terminadas
+            if cache_key is not None and completed and parts:
+                self.cache.put(cache_key, "".join(parts))
             
         except requests.exceptions.RequestException as e:
             error_msg = f"Error en streaming con Ollama: {str(e)}"
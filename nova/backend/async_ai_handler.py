@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo con el cliente asíncrono (asyncio) de la API de Ollama
+Reutiliza conexiones keep-alive y limita las generaciones simultáneas por servidor
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+import aiohttp
+
+from nova.backend.ai_handler import build_chat_payload
+from nova.backend.response_cache import ResponseCache
+from nova.backend.telemetry import GenerationTelemetry
+
+logger = logging.getLogger('nova.async_ai_handler')
+
+class AsyncOllamaHandler:
+    """Variante asíncrona de OllamaHandler basada en aiohttp"""
+    
+    def __init__(self, api_url: str, model_name: str, max_connections: int = 8,
+                 max_concurrent: int = 4, connect_timeout: float = 5.0,
+                 read_timeout: float = 120.0, keepalive_timeout: float = 60.0,
+                 cache: Optional[ResponseCache] = None,
+                 telemetry: Optional[GenerationTelemetry] = None,
+                 keep_alive: Optional[Union[str, float]] = None):
+        """Inicializa el manejador asíncrono de Ollama
+        
+        La sesión HTTP y el semáforo se crean con el primer uso, dentro del
+        bucle de eventos que los va a utilizar.
+        
+        Args:
+            api_url: URL de la API de Ollama (ej: http://localhost:11434/api/chat)
+            model_name: Nombre del modelo a utilizar (ej: nous-hermes:7b)
+            max_connections: Tamaño máximo del pool de conexiones keep-alive
+            max_concurrent: Generaciones simultáneas permitidas en este servidor;
+                el resto espera turno sin abrir más conexiones
+            connect_timeout: Segundos máximos para establecer la conexión
+            read_timeout: Segundos máximos sin recibir datos de Ollama (entre
+                fragmentos en streaming, o hasta la respuesta completa)
+            keepalive_timeout: Segundos que una conexión libre sigue abierta
+            cache: Caché de respuestas para peticiones idénticas (opcional)
+            telemetry: Telemetría de las generaciones (por defecto, una propia)
+            keep_alive: keep_alive que se envía en cada petición para que
+                Ollama no descargue el modelo (por defecto, el de Ollama)
+        """
+        self.api_url = api_url
+        self.base_url = api_url.split('/api/')[0]
+        self.model_name = model_name
+        self.max_connections = max_connections
+        self.max_concurrent = max_concurrent
+        self.keepalive_timeout = keepalive_timeout
+        self.cache = cache
+        self.keep_alive = keep_alive
+        self.telemetry = telemetry or GenerationTelemetry()
+        self.timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout,
+                                             sock_read=read_timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        logger.info(f"Inicializado AsyncOllamaHandler con modelo {model_name} "
+                    f"({max_concurrent} generaciones simultáneas)")
+    
+    @property
+    def in_flight(self) -> int:
+        """Número de generaciones en curso en este servidor"""
+        return self._in_flight
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Obtiene la sesión HTTP, creándola en el bucle de eventos actual
+        
+        Returns:
+            aiohttp.ClientSession: Sesión con el pool de conexiones
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections,
+                                             keepalive_timeout=self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._session
+    
+    async def check_connection(self) -> bool:
+        """Verifica la conexión con Ollama y la disponibilidad del modelo
+        
+        Returns:
+            bool: True si la conexión es exitosa, False en caso contrario
+        """
+        try:
+            async with self._get_session().get(f"{self.base_url}/api/tags") as response:
+                response.raise_for_status()
+                models = (await response.json(content_type=None)).get('models', [])
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.error(f"Error al conectar con Ollama: {str(e)}")
+            return False
+        
+        if not any(self.model_name in model.get('name', '') for model in models):
+            logger.warning(f"El modelo {self.model_name} no está disponible en Ollama. "
+                           f"Puede que necesites descargarlo con 'ollama pull {self.model_name}'")
+        else:
+            logger.info(f"Conexión exitosa con Ollama. Modelo {self.model_name} disponible.")
+        return True
+    
+    async def send_message(self, message: str, conversation_history: Optional[List[Dict]] = None,
+                           system_prompt: Optional[str] = None) -> Dict:
+        """Envía un mensaje al modelo y obtiene su respuesta
+        
+        Si la tarea se cancela (por ejemplo, porque el cliente se ha
+        desconectado), la conexión se cierra y Ollama deja de generar.
+        
+        Args:
+            message: Mensaje a enviar al modelo
+            conversation_history: Historial de conversación previo (opcional)
+            system_prompt: Prompt de sistema para definir el comportamiento (opcional)
+            
+        Returns:
+            Dict: Respuesta del modelo con el texto generado
+        """
+        payload = build_chat_payload(self.model_name, message, conversation_history,
+                                     system_prompt, stream=False,
+                                     keep_alive=self.keep_alive)
+        
+        # Las peticiones idénticas se responden desde la caché
+        cache_key = self.cache.make_key(payload) if self.cache is not None else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return {"response": cached, "model": self.model_name, "cached": True}
+        
+        logger.debug(f"Enviando mensaje a Ollama: {message[:50]}...")
+        
+        session = self._get_session()
+        try:
+            async with self._semaphore:
+                self._in_flight += 1
+                try:
+                    async with session.post(self.api_url, json=payload) as response:
+                        response.raise_for_status()
+                        result = await response.json(content_type=None)
+                finally:
+                    self._in_flight -= 1
+        except asyncio.CancelledError:
+            logger.info("Generación cancelada antes de completarse")
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            error_msg = f"Error al comunicarse con Ollama: {str(e) or type(e).__name__}"
+            logger.error(error_msg)
+            return {"error": error_msg, "response": "Lo siento, no puedo responder en este momento."}
+        
+        # Extraer la respuesta del modelo
+        assistant_message = result.get('message', {}).get('content', '')
+        logger.debug(f"Respuesta recibida de Ollama: {assistant_message[:50]}...")
+        if cache_key is not None and assistant_message:
+            self.cache.put(cache_key, assistant_message)
+        
+        return {
+            "response": assistant_message,
+            "model": self.model_name,
+            "raw_response": result,
+            "stats": self.telemetry.record(result.get('model') or self.model_name, result)
+        }
+    
+    async def stream_message(self, message: str, conversation_history: Optional[List[Dict]] = None,
+                             system_prompt: Optional[str] = None) -> AsyncIterator[str]:
+        """Envía un mensaje al modelo y obtiene su respuesta en streaming
+        
+        Para abandonar una generación basta con cerrar el generador
+        (`aclose()`) o cancelar la tarea que lo recorre: la conexión se cierra
+        y el hueco del semáforo queda libre para otra petición.
+        
+        Args:
+            message: Mensaje a enviar al modelo
+            conversation_history: Historial de conversación previo (opcional)
+            system_prompt: Prompt de sistema para definir el comportamiento (opcional)
+            
+        Yields:
+            str: Fragmentos de texto de la respuesta del modelo
+        """
+        payload = build_chat_payload(self.model_name, message, conversation_history,
+                                     system_prompt, stream=True,
+                                     keep_alive=self.keep_alive)
+        
+        # Las peticiones idénticas se responden desde la caché, de una vez
+        cache_key = self.cache.make_key(payload) if self.cache is not None else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        logger.debug(f"Iniciando streaming de mensaje a Ollama: {message[:50]}...")
+        
+        session = self._get_session()
+        start = time.perf_counter()
+        ttft = None
+        try:
+            async with self._semaphore:
+                self._in_flight += 1
+                try:
+                    async with session.post(self.api_url, json=payload) as response:
+                        response.raise_for_status()
+                        parts = []
+                        
+                        # Ollama envía un objeto JSON por línea
+                        async for line in response.content:
+                            line = line.strip()
+                            if not line:
+                                continue
+                            try:
+                                chunk = json.loads(line)
+                            except json.JSONDecodeError:
+                                logger.warning(f"Error al decodificar respuesta de streaming: {line}")
+                                continue
+                            content = chunk.get('message', {}).get('content', '')
+                            if content:
+                                if ttft is None:
+                                    ttft = time.perf_counter() - start
+                                parts.append(content)
+                                yield content
+                            if chunk.get('done'):
+                                self.telemetry.record(chunk.get('model') or self.model_name,
+                                                      chunk, ttft)
+                                # Solo se guardan las respuestas terminadas
+                                if cache_key is not None and parts:
+                                    self.cache.put(cache_key, "".join(parts))
+                                break
+                finally:
+                    self._in_flight -= 1
+        except (asyncio.CancelledError, GeneratorExit):
+            logger.info("Streaming cancelado antes de completarse")
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Error en streaming con Ollama: {str(e) or type(e).__name__}")
+            yield "Lo siento, no puedo responder en este momento."
+    
+    async def close(self) -> None:
+        """Cierra la sesión HTTP y sus conexiones"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        logger.info("AsyncOllamaHandler cerrado")
+    
+    async def __aenter__(self) -> 'AsyncOllamaHandler':
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
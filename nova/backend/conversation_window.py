@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo para acotar el historial de conversación que se envía al modelo
+Mantiene los últimos turnos literales y resume los anteriores en segundo plano
+"""
+
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional
+
+import requests
+
+from nova.backend.ai_handler import build_chat_payload
+from nova.memory.relevance import estimate_tokens
+
+logger = logging.getLogger('nova.conversation_window')
+
+# Función que recibe el resumen anterior y los turnos a incorporar y
+# devuelve el resumen nuevo
+Summarizer = Callable[[str, List[Dict[str, str]]], str]
+
+SUMMARY_PROMPT = (
+    "Resume en español, en pocas frases y en tercera persona, la conversación "
+    "entre el usuario y Nova. Conserva nombres, datos personales, planes y el "
+    "estado de ánimo del usuario; omite saludos y frases de cortesía."
+)
+
+def _turn_tokens(turn: Dict[str, str]) -> int:
+    """
+    Estima los tokens de un turno (mensaje del usuario y respuesta)
+    
+    Args:
+        turn: Turno con las claves "user" y "nova"
+        
+    Returns:
+        int: Tokens aproximados, incluida la envoltura de los dos mensajes
+    """
+    return estimate_tokens(turn["user"]) + estimate_tokens(turn["nova"]) + 8
+
+def _truncate_turn(turn: Dict[str, str], max_tokens: int) -> Dict[str, str]:
+    """
+    Recorta un turno para que quepa en `max_tokens`
+    
+    El mensaje del usuario conserva al menos la mitad del espacio (o todo el
+    que necesite, si es corto) y la respuesta se queda con el resto.
+    
+    Args:
+        turn: Turno con las claves "user" y "nova"
+        max_tokens: Tokens aproximados disponibles para el turno
+        
+    Returns:
+        Dict[str, str]: Turno recortado
+    """
+    # Margen para la envoltura y el redondeo de estimate_tokens
+    chars = max(max_tokens - 10, 0) * 4
+    user, nova = turn["user"], turn["nova"]
+    user_chars = min(len(user), max(chars // 2, chars - len(nova)))
+    return {"user": user[:user_chars], "nova": nova[:chars - user_chars]}
+
+def extractive_summarizer(max_tokens: int = 300) -> Summarizer:
+    """
+    Crea un resumidor local que no usa el modelo
+    
+    Añade una línea recortada por turno y descarta las más antiguas cuando
+    el resumen supera `max_tokens`.
+    
+    Args:
+        max_tokens: Tamaño máximo aproximado del resumen
+        
+    Returns:
+        Summarizer: Función de resumen
+    """
+    def summarize(previous: str, turns: List[Dict[str, str]]) -> str:
+        lines = previous.splitlines() if previous else []
+        for turn in turns:
+            user = " ".join(turn["user"].split())
+            lines.append(f"- El usuario dijo: {user[:160]}")
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > max_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+    return summarize
+
+def llm_summarizer(handler, max_tokens: int = 300) -> Summarizer:
+    """
+    Crea un resumidor que pide el resumen al modelo
+    
+    Si el modelo falla, se recurre al resumidor extractivo para no perder
+    los turnos.
+    
+    Args:
+        handler: Manejador de Ollama; el resumen se pide con `post_internal`,
+            que no cuenta en sus métricas, caché, telemetría ni cortocircuito
+        max_tokens: Tamaño máximo aproximado del resumen
+        
+    Returns:
+        Summarizer: Función de resumen
+    """
+    fallback = extractive_summarizer(max_tokens)
+    
+    def summarize(previous: str, turns: List[Dict[str, str]]) -> str:
+        transcript = "\n".join(f"Usuario: {turn['user']}\nNova: {turn['nova']}" for turn in turns)
+        message = (f"Resumen anterior:\n{previous or '(vacío)'}\n\n"
+                   f"Conversación nueva:\n{transcript}\n\n"
+                   f"Escribe el resumen actualizado (máximo {max_tokens * 3} caracteres).")
+        payload = build_chat_payload(handler.model_name, message, system_prompt=SUMMARY_PROMPT,
+                                     keep_alive=handler.keep_alive)
+        try:
+            result = handler.post_internal(payload)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(f"No se pudo resumir el historial con el modelo: {str(e)}")
+            return fallback(previous, turns)
+        summary = result.get("message", {}).get("content", "").strip()
+        if not summary:
+            return fallback(previous, turns)
+        # El modelo no siempre respeta el límite: recortar por si acaso
+        return summary[:max_tokens * 4]
+    return summarize
+
+class ConversationWindow:
+    """Ventana del historial con presupuesto de tokens y resumen continuo"""
+    
+    def __init__(self, max_turns: int = 6, token_budget: int = 1500,
+                 summarizer: Optional[Summarizer] = None,
+                 spawn: Optional[Callable[[Callable[[], None]], object]] = None,
+                 history_limit: int = 200):
+        """
+        Inicializa la ventana
+        
+        Args:
+            max_turns: Número máximo de turnos que se envían literalmente
+            token_budget: Tokens aproximados para los turnos literales
+            summarizer: Función que incorpora turnos al resumen (por defecto,
+                el resumidor extractivo local)
+            spawn: Función que ejecuta una tarea en segundo plano (por defecto,
+                un hilo daemon)
+            history_limit: Turnos completos de la sesión que se conservan
+                para mostrarlos (no se envían al modelo)
+        """
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summarizer = summarizer or extractive_summarizer()
+        self.spawn = spawn or self._spawn_thread
+        self._lock = threading.Lock()
+        self._recent: List[Dict[str, str]] = []
+        self._recent_tokens = 0
+        self._pending: List[Dict[str, str]] = []
+        self._summary = ""
+        self._summarizing = False
+        self._history: Deque[Dict[str, str]] = deque(maxlen=history_limit)
+        # Cada clear() abre una generación nueva: los resúmenes en curso de la
+        # anterior se descartan al terminar
+        self._generation = 0
+    
+    @staticmethod
+    def _spawn_thread(task: Callable[[], None]) -> threading.Thread:
+        """Ejecuta una tarea en un hilo daemon"""
+        thread = threading.Thread(target=task, name="nova-history-summary", daemon=True)
+        thread.start()
+        return thread
+    
+    @property
+    def summary(self) -> str:
+        """Resumen de los turnos que ya no se envían literalmente"""
+        with self._lock:
+            return self._summary
+    
+    def add_turn(self, user_message: str, nova_response: str) -> None:
+        """
+        Añade un turno terminado a la ventana
+        
+        Los turnos que quedan fuera (por número o por tokens) se incorporan
+        al resumen en segundo plano. El último turno siempre se conserva,
+        recortado si por sí solo supera `token_budget`.
+        
+        Args:
+            user_message: Mensaje del usuario
+            nova_response: Respuesta de Nova
+        """
+        turn = {"user": user_message, "nova": nova_response}
+        if _turn_tokens(turn) > self.token_budget:
+            turn = _truncate_turn(turn, self.token_budget)
+        with self._lock:
+            self._history.append({"user": user_message, "nova": nova_response})
+            self._recent.append(turn)
+            self._recent_tokens += _turn_tokens(turn)
+            while len(self._recent) > 1 and (len(self._recent) > self.max_turns or
+                                             self._recent_tokens > self.token_budget):
+                evicted = self._recent.pop(0)
+                self._recent_tokens -= _turn_tokens(evicted)
+                self._pending.append(evicted)
+            start = bool(self._pending) and not self._summarizing
+            if start:
+                self._summarizing = True
+        if start:
+            self.spawn(self._summarize_pending)
+    
+    def _summarize_pending(self) -> None:
+        """
+        Incorpora los turnos pendientes al resumen (se ejecuta en segundo plano)
+        """
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._summarizing = False
+                    return
+                turns, self._pending = self._pending, []
+                previous = self._summary
+                generation = self._generation
+            
+            try:
+                summary = self.summarizer(previous, turns)
+            except Exception as e:
+                logger.error(f"Error al resumir el historial: {str(e)}")
+                summary = extractive_summarizer()(previous, turns)
+            
+            with self._lock:
+                if generation == self._generation:
+                    self._summary = summary
+            logger.debug(f"Resumen del historial actualizado con {len(turns)} turnos")
+    
+    def get_messages(self) -> List[Dict[str, str]]:
+        """
+        Obtiene los mensajes del historial para el modelo
+        
+        Returns:
+            List[Dict[str, str]]: Resumen (como mensaje de sistema, si lo hay)
+                seguido de los turnos recientes como pares usuario/asistente
+        """
+        with self._lock:
+            messages = []
+            if self._summary:
+                messages.append({"role": "system",
+                                 "content": f"Resumen de la conversación anterior:\n{self._summary}"})
+            for turn in self._recent:
+                messages.append({"role": "user", "content": turn["user"]})
+                messages.append({"role": "assistant", "content": turn["nova"]})
+            return messages
+    
+    def turns(self) -> List[Dict[str, str]]:
+        """
+        Obtiene los turnos completos de la sesión, del más antiguo al más reciente
+        
+        Returns:
+            List[Dict[str, str]]: Turnos con las claves "user" y "nova"
+        """
+        with self._lock:
+            return list(self._history)
+    
+    def clear(self) -> None:
+        """Vacía la ventana, el resumen y los turnos de la sesión"""
+        with self._lock:
+            self._history.clear()
+            self._recent = []
+            self._recent_tokens = 0
+            self._pending = []
+            self._summary = ""
+            self._generation += 1
+
+class ConversationWindows:
+    """Ventanas de conversación por usuario, con una LRU de las activas"""
+    
+    def __init__(self, factory: Callable[[], ConversationWindow], max_users: int = 256):
+        """
+        Inicializa el registro de ventanas
+        
+        Cada usuario tiene su propia ventana, así que el historial y el
+        resumen de uno nunca llegan al prompt de otro. Al superar `max_users`
+        se descarta la ventana usada hace más tiempo; su memoria persistente
+        no se pierde.
+        
+        Args:
+            factory: Función que crea la ventana de un usuario nuevo
+            max_users: Número máximo de ventanas en memoria
+        """
+        self.factory = factory
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._windows: "OrderedDict[str, ConversationWindow]" = OrderedDict()
+    
+    def get(self, user_id: str) -> ConversationWindow:
+        """
+        Obtiene la ventana de un usuario, creándola si no existe
+        
+        Args:
+            user_id: Identificador del usuario
+            
+        Returns:
+            ConversationWindow: Ventana del usuario
+        """
+        with self._lock:
+            window = self._windows.get(user_id)
+            if window is not None:
+                self._windows.move_to_end(user_id)
+                return window
+            window = self.factory()
+            self._windows[user_id] = window
+            while len(self._windows) > self.max_users:
+                evicted_id, evicted = self._windows.popitem(last=False)
+                evicted.clear()
+                logger.debug(f"Ventana de conversación de {evicted_id} descartada")
+            return window
+    
+    def clear(self, user_id: str) -> None:
+        """
+        Vacía la ventana de un usuario
+        
+        Args:
+            user_id: Identificador del usuario
+        """
+        with self._lock:
+            window = self._windows.pop(user_id, None)
+        if window is not None:
+            window.clear()
+    
+    def __len__(self) -> int:
+        """Número de ventanas en memoria"""
+        with self._lock:
+            return len(self._windows)
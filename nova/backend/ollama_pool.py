@@ -0,0 +1,549 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo para repartir las peticiones entre varios servidores de Ollama
+Elige el servidor con menor latencia y menos peticiones en curso, y aparta los que fallan
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import requests
+
+from nova.backend.ai_handler import OllamaHandler
+from nova.backend.resilience import CircuitBreaker, StreamCancel
+from nova.backend.response_cache import ResponseCache
+
+logger = logging.getLogger('nova.ollama_pool')
+
+def estimate_first_token(result: Dict, elapsed: float) -> Optional[float]:
+    """
+    Estima el tiempo hasta el primer token de una respuesta no streaming
+    
+    Es la duración medida menos lo que Ollama dedicó a generar, así que
+    incluye, como el primer fragmento en streaming, la red, la espera en el
+    servidor, la carga del modelo y la evaluación del prompt.
+    
+    Args:
+        result: Respuesta JSON de Ollama
+        elapsed: Segundos que tardó la respuesta completa
+        
+    Returns:
+        Optional[float]: Segundos hasta el primer token, o None si Ollama no
+            envía sus tiempos
+    """
+    evaluation = result.get("eval_duration")
+    if not evaluation:
+        return None
+    return max(elapsed - evaluation / 1e9, 0.0)
+
+class OllamaEndpoint:
+    """Estado de un servidor de Ollama dentro del pool"""
+    
+    def __init__(self, api_url: str, model_name: str, initial_latency: float, **handler_kwargs):
+        """
+        Inicializa el servidor
+        
+        Args:
+            api_url: URL de /api/chat del servidor
+            model_name: Nombre del modelo a utilizar
+            initial_latency: Tiempo hasta el primer token supuesto hasta tener
+                mediciones (segundos)
+            **handler_kwargs: Plazos y cortocircuito del OllamaHandler del servidor
+        """
+        self.handler = OllamaHandler(api_url, model_name, check_connection=False, **handler_kwargs)
+        self.api_url = api_url
+        self.base_url = api_url.split('/api/')[0]
+        # Medias (EWMA) del tiempo hasta el primer token, que decide el reparto,
+        # y de la duración completa de las respuestas, solo informativa: depende
+        # de la longitud de cada respuesta
+        self.ttft = initial_latency
+        self.latency: Optional[float] = None
+        self.in_flight = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        # Apartado porque /api/tags no responde (y no por fallos al generar)
+        self.unreachable = False
+        self.requests = 0
+        self.errors = 0
+    
+    def available(self, now: float) -> bool:
+        """Indica si el servidor puede recibir peticiones"""
+        return now >= self.ejected_until and self.handler.breaker.state != CircuitBreaker.OPEN
+    
+    def load(self) -> float:
+        """Coste esperado de enviar una petición más a este servidor"""
+        return self.ttft * (self.in_flight + 1)
+    
+    def status(self, now: float) -> Dict:
+        """Resumen del estado del servidor"""
+        return {
+            "url": self.api_url,
+            "available": self.available(now),
+            "ttft_ms": round(self.ttft * 1000, 1),
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "consecutive_failures": self.failures,
+            "circuit": self.handler.breaker.state,
+        }
+
+class OllamaPool(OllamaHandler):
+    """OllamaHandler que reparte las peticiones entre varios servidores"""
+    
+    def __init__(self, api_urls: Sequence[str], model_name: str,
+                 cache: Optional[ResponseCache] = None, max_retries: int = 2,
+                 max_failures: int = 3, ejection_time: float = 30.0,
+                 health_interval: float = 10.0, ewma_alpha: float = 0.3,
+                 connect_timeout: float = 3.0, first_token_timeout: float = 60.0,
+                 total_timeout: float = 300.0, hedge: bool = False,
+                 hedge_percentile: float = 95.0, hedge_min_delay: float = 0.5,
+                 keep_alive: Optional[Union[str, float]] = None):
+        """
+        Inicializa el pool y arranca la comprobación de salud en segundo plano
+        
+        Cada petición va al servidor disponible con menor tiempo medio hasta
+        el primer token (EWMA) multiplicado por sus peticiones en curso más
+        una. Es la misma medida con y sin streaming: en las respuestas únicas
+        se descuenta de la duración el tiempo que Ollama dedicó a generar. Un servidor
+        que falla `max_failures` veces seguidas queda apartado
+        `ejection_time` segundos; uno que no responde a la comprobación de
+        salud, hasta que /api/tags vuelve a responder. Cada servidor tiene
+        además su propio cortocircuito.
+        
+        Con `hedge`, si una respuesta en streaming no da su primer fragmento
+        en el percentil `hedge_percentile` de los tiempos recientes, se lanza
+        la misma petición en otro servidor; gana el primero que responda y la
+        conexión del otro se corta en ese momento.
+        
+        Args:
+            api_urls: URLs de /api/chat de los servidores
+            model_name: Nombre del modelo a utilizar
+            cache: Caché de respuestas para peticiones idénticas (opcional)
+            max_retries: Reintentos en otros servidores si una petición falla
+            max_failures: Fallos seguidos tras los que se aparta un servidor
+            ejection_time: Segundos que un servidor permanece apartado
+            health_interval: Segundos entre comprobaciones de salud (0 = nunca)
+            ewma_alpha: Peso de cada medición nueva en las medias de latencia
+            connect_timeout: Segundos máximos para conectar con un servidor
+            first_token_timeout: Segundos máximos hasta el primer fragmento
+            total_timeout: Segundos máximos de una generación completa
+            hedge: Si es True, se duplican las peticiones lentas en otro servidor
+            hedge_percentile: Percentil del primer fragmento que activa la copia
+            hedge_min_delay: Espera mínima antes de lanzar una copia (segundos)
+            keep_alive: keep_alive que se envía en cada petición (opcional)
+        """
+        if not api_urls:
+            raise ValueError("OllamaPool necesita al menos un servidor")
+        super().__init__(api_urls[0], model_name, cache=cache, check_connection=False,
+                         keep_alive=keep_alive)
+        self.max_retries = max_retries
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.health_interval = health_interval
+        self.ewma_alpha = ewma_alpha
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.endpoints = [OllamaEndpoint(url, model_name, initial_latency=1.0,
+                                         connect_timeout=connect_timeout,
+                                         first_token_timeout=first_token_timeout,
+                                         total_timeout=total_timeout,
+                                         breaker=CircuitBreaker(failure_threshold=max_failures,
+                                                                reset_timeout=ejection_time,
+                                                                name=url.split('/api/')[0]))
+                          for url in api_urls]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        logger.info(f"Pool de Ollama con {len(self.endpoints)} servidores: "
+                    f"{', '.join(endpoint.base_url for endpoint in self.endpoints)}")
+        
+        # Primera comprobación síncrona para partir de latencias reales
+        self.check_health()
+        self._health_thread = None
+        if health_interval > 0:
+            self._health_thread = threading.Thread(target=self._health_loop,
+                                                   name="nova-ollama-health", daemon=True)
+            self._health_thread.start()
+    
+    def _check_connection(self) -> bool:
+        """Verifica la conexión con los servidores del pool
+        
+        Returns:
+            bool: True si al menos un servidor responde
+        """
+        return self.check_health() > 0
+    
+    def check_health(self) -> int:
+        """
+        Comprueba todos los servidores con /api/tags
+        
+        Los que no responden quedan apartados hasta que vuelvan a hacerlo;
+        los apartados por fallos al generar cumplen su tiempo igualmente.
+        
+        Returns:
+            int: Número de servidores disponibles
+        """
+        healthy = 0
+        for endpoint in self.endpoints:
+            start = time.perf_counter()
+            try:
+                response = endpoint.handler.session.get(f"{endpoint.base_url}/api/tags",
+                                                        timeout=endpoint.handler.connect_timeout * 2)
+                response.raise_for_status()
+                models = response.json().get('models', [])
+            except (requests.exceptions.RequestException, ValueError) as e:
+                with self._lock:
+                    if endpoint.available(time.monotonic()):
+                        logger.warning(f"Servidor de Ollama {endpoint.base_url} apartado: {str(e)}")
+                    endpoint.ejected_until = float('inf')
+                    endpoint.unreachable = True
+                continue
+            
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                if endpoint.unreachable:
+                    logger.info(f"Servidor de Ollama {endpoint.base_url} reincorporado")
+                    endpoint.unreachable = False
+                    endpoint.ejected_until = 0.0
+                    endpoint.failures = 0
+                # La sonda solo sirve de estimación inicial: una generación
+                # real tarda mucho más que /api/tags
+                if endpoint.requests == 0:
+                    endpoint.ttft = elapsed
+            if not any(self.model_name in model.get('name', '') for model in models):
+                logger.warning(f"El modelo {self.model_name} no está disponible en "
+                               f"{endpoint.base_url}")
+            healthy += 1
+        return healthy
+    
+    def _health_loop(self) -> None:
+        """Comprueba periódicamente la salud de los servidores"""
+        while not self._stop.wait(self.health_interval):
+            try:
+                self.check_health()
+            except Exception as e:
+                logger.error(f"Error en la comprobación de salud de Ollama: {str(e)}")
+    
+    def _acquire(self, exclude: List[OllamaEndpoint]) -> OllamaEndpoint:
+        """
+        Elige el servidor para una petición y lo marca como ocupado
+        
+        Args:
+            exclude: Servidores ya probados en esta petición
+            
+        Returns:
+            OllamaEndpoint: Servidor elegido
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e not in exclude and e.available(now)]
+            if not candidates:
+                # Todos apartados: probar el que antes vuelve, mejor que no responder
+                candidates = [e for e in self.endpoints if e not in exclude] or self.endpoints
+                endpoint = min(candidates, key=lambda e: e.ejected_until)
+            else:
+                endpoint = min(candidates, key=OllamaEndpoint.load)
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+            return endpoint
+    
+    def _release(self, endpoint: OllamaEndpoint, ttft: Optional[float] = None,
+                 total: Optional[float] = None, failed: bool = False) -> None:
+        """
+        Libera un servidor tras una petición
+        
+        Args:
+            endpoint: Servidor usado
+            ttft: Segundos hasta el primer token, si se conocen
+            total: Segundos de la respuesta completa, si llegó entera
+            failed: Si es True, la petición falló por culpa del servidor
+        """
+        with self._lock:
+            endpoint.in_flight -= 1
+            if not failed:
+                # Un servidor apartado que responde (porque no había otro) vuelve
+                endpoint.failures = 0
+                endpoint.unreachable = False
+                endpoint.ejected_until = 0.0
+                if ttft is not None:
+                    endpoint.ttft += self.ewma_alpha * (ttft - endpoint.ttft)
+                if total is not None:
+                    endpoint.latency = total if endpoint.latency is None else \
+                        endpoint.latency + self.ewma_alpha * (total - endpoint.latency)
+                return
+            endpoint.errors += 1
+            endpoint.failures += 1
+            if endpoint.failures >= self.max_failures and endpoint.available(time.monotonic()):
+                endpoint.ejected_until = time.monotonic() + self.ejection_time
+                logger.warning(f"Servidor de Ollama {endpoint.base_url} apartado tras "
+                               f"{endpoint.failures} fallos seguidos")
+    
+    def _post_chat(self, payload: Dict) -> Dict:
+        """Envía una petición no streaming, reintentando en otros servidores
+        
+        Args:
+            payload: Payload de la petición
+            
+        Returns:
+            Dict: Respuesta JSON de Ollama
+            
+        Raises:
+            requests.exceptions.RequestException: Si fallan todos los intentos
+        """
+        tried: List[OllamaEndpoint] = []
+        while True:
+            endpoint = self._acquire(tried)
+            tried.append(endpoint)
+            start = time.perf_counter()
+            try:
+                result = endpoint.handler._post_chat(payload)
+            except requests.exceptions.RequestException as e:
+                self._release(endpoint, failed=True)
+                if len(tried) > self.max_retries or len(tried) >= len(self.endpoints):
+                    raise
+                logger.warning(f"Fallo en {endpoint.base_url} ({str(e)}), reintentando en otro servidor")
+                self.metrics.incr("retries")
+                continue
+            except Exception:
+                self._release(endpoint, failed=True)
+                raise
+            latency = time.perf_counter() - start
+            self._release(endpoint, ttft=estimate_first_token(result, latency), total=latency)
+            self.response_latency.add(latency)
+            return result
+    
+    def post_internal(self, payload: Dict) -> Dict:
+        """
+        Envía una petición interna al servidor menos cargado
+        
+        No ocupa plaza en el servidor ni actualiza su latencia, sus fallos o
+        las métricas del pool: solo las peticiones de los usuarios cuentan
+        para el reparto y para apartar servidores.
+        
+        Args:
+            payload: Payload de la petición
+            
+        Returns:
+            Dict: Respuesta JSON de Ollama
+            
+        Raises:
+            requests.exceptions.RequestException: Si la petición falla o
+                supera sus plazos
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.available(now)] or self.endpoints
+            endpoint = min(candidates, key=OllamaEndpoint.load)
+        return endpoint.handler.post_internal(payload)
+    
+    def _hedge_delay(self) -> Optional[float]:
+        """
+        Calcula cuánto esperar el primer fragmento antes de lanzar una copia
+        
+        Returns:
+            Optional[float]: Segundos de espera, o None si no se debe duplicar
+        """
+        if not self.hedge or len(self.endpoints) < 2:
+            return None
+        budget = self.first_token_latency.percentile(self.hedge_percentile)
+        if budget is None:
+            return None
+        return max(budget, self.hedge_min_delay)
+    
+    def _iter_chat(self, payload: Dict) -> Iterator[Dict]:
+        """Envía una petición streaming al mejor servidor disponible
+        
+        Solo se reintenta en otro servidor si el fallo ocurre antes del
+        primer fragmento: después, el cliente ya ha recibido parte del texto.
+        El servidor registra el tiempo hasta el primer fragmento y, si la
+        respuesta llega entera, su duración.
+        
+        Args:
+            payload: Payload de la petición
+            
+        Yields:
+            Dict: Cada objeto JSON enviado por Ollama
+            
+        Raises:
+            requests.exceptions.RequestException: Si la petición falla
+        """
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is not None:
+            yield from self._iter_chat_hedged(payload, hedge_delay)
+            return
+        
+        tried: List[OllamaEndpoint] = []
+        while True:
+            endpoint = self._acquire(tried)
+            tried.append(endpoint)
+            start = time.perf_counter()
+            first_chunk_latency = None
+            try:
+                for chunk in endpoint.handler._iter_chat(payload):
+                    if first_chunk_latency is None:
+                        first_chunk_latency = time.perf_counter() - start
+                        self.first_token_latency.add(first_chunk_latency)
+                    yield chunk
+            except requests.exceptions.RequestException as e:
+                self._release(endpoint, failed=True)
+                if (first_chunk_latency is not None or len(tried) > self.max_retries
+                        or len(tried) >= len(self.endpoints)):
+                    raise
+                logger.warning(f"Fallo en {endpoint.base_url} ({str(e)}), reintentando en otro servidor")
+                self.metrics.incr("retries")
+                continue
+            except BaseException:
+                # Generador cerrado por el cliente: no es un fallo del servidor
+                self._release(endpoint, ttft=first_chunk_latency)
+                raise
+            self._release(endpoint, ttft=first_chunk_latency, total=time.perf_counter() - start)
+            return
+    
+    def _stream_attempt(self, endpoint: OllamaEndpoint, payload: Dict,
+                        events: "queue.Queue", cancel: StreamCancel) -> None:
+        """
+        Recorre una respuesta en streaming en un hilo y publica sus fragmentos
+        
+        Args:
+            endpoint: Servidor ya reservado con _acquire
+            payload: Payload de la petición
+            events: Cola de eventos (tipo, servidor, valor) para el consumidor
+            cancel: Al cancelarse, la conexión se cierra en el acto y Ollama
+                deja de generar
+        """
+        start = time.perf_counter()
+        first_chunk_latency = None
+        try:
+            for chunk in endpoint.handler._iter_chat(payload, cancel):
+                if first_chunk_latency is None:
+                    first_chunk_latency = time.perf_counter() - start
+                if cancel.is_set():
+                    break
+                events.put(("chunk", endpoint, chunk))
+        except Exception as e:
+            # Cualquier fallo llega al consumidor, que si no esperaría para siempre
+            self._release(endpoint, failed=True)
+            events.put(("error", endpoint, e))
+            return
+        if cancel.is_set():
+            # Cancelada: la respuesta no llegó entera
+            self._release(endpoint, ttft=first_chunk_latency)
+        else:
+            self._release(endpoint, ttft=first_chunk_latency, total=time.perf_counter() - start)
+        events.put(("done", endpoint, None))
+    
+    def _iter_chat_hedged(self, payload: Dict, hedge_delay: float) -> Iterator[Dict]:
+        """Envía una petición streaming con una copia de respaldo si tarda
+        
+        Args:
+            payload: Payload de la petición
+            hedge_delay: Segundos de espera del primer fragmento antes de la copia
+            
+        Yields:
+            Dict: Cada objeto JSON enviado por el servidor ganador
+            
+        Raises:
+            requests.exceptions.RequestException: Si fallan todos los intentos
+        """
+        events: "queue.Queue" = queue.Queue()
+        cancels: Dict[OllamaEndpoint, StreamCancel] = {}
+        tried: List[OllamaEndpoint] = []
+        
+        def launch() -> None:
+            endpoint = self._acquire(tried)
+            tried.append(endpoint)
+            cancels[endpoint] = StreamCancel()
+            threading.Thread(target=self._stream_attempt,
+                             args=(endpoint, payload, events, cancels[endpoint]),
+                             name="nova-ollama-stream", daemon=True).start()
+        
+        start = time.perf_counter()
+        winner = None
+        failed = 0
+        launch()
+        try:
+            while True:
+                timeout = None
+                if winner is None and len(tried) == 1 and len(self.endpoints) > 1:
+                    timeout = max(0.0, hedge_delay - (time.perf_counter() - start))
+                try:
+                    kind, endpoint, value = events.get(timeout=timeout)
+                except queue.Empty:
+                    logger.debug(f"Sin primer fragmento en {hedge_delay:.2f}s: copia en otro servidor")
+                    self.metrics.incr("hedges")
+                    launch()
+                    continue
+                
+                if winner is None:
+                    if kind == "error":
+                        failed += 1
+                        if failed < len(tried):
+                            continue
+                        if len(tried) > self.max_retries or len(tried) >= len(self.endpoints):
+                            raise value
+                        self.metrics.incr("retries")
+                        launch()
+                        continue
+                    # Primer fragmento: este servidor gana y las respuestas de los
+                    # demás se cierran ya, sin esperar a su siguiente fragmento
+                    winner = endpoint
+                    self.first_token_latency.add(time.perf_counter() - start)
+                    if endpoint is not tried[0]:
+                        self.metrics.incr("hedge_wins")
+                    for other, cancel in cancels.items():
+                        if other is not winner:
+                            cancel.cancel()
+                
+                if endpoint is not winner:
+                    continue
+                if kind == "chunk":
+                    yield value
+                elif kind == "done":
+                    return
+                else:
+                    raise value
+        finally:
+            for cancel in cancels.values():
+                cancel.cancel()
+    
+    def get_metrics(self) -> Dict:
+        """Obtiene las métricas del pool y de sus servidores
+        
+        Returns:
+            Dict: Métricas del pool (con los contadores de todos los servidores
+                sumados) y el detalle por servidor
+        """
+        metrics = super().get_metrics()
+        metrics.pop("circuit", None)
+        for endpoint in self.endpoints:
+            for name, value in endpoint.handler.metrics.snapshot().items():
+                metrics[name] = metrics.get(name, 0) + value
+        metrics["endpoints"] = [dict(endpoint.handler.get_metrics(), url=endpoint.api_url)
+                                for endpoint in self.endpoints]
+        return metrics
+    
+    def status(self) -> List[Dict]:
+        """
+        Obtiene el estado de cada servidor del pool
+        
+        Returns:
+            List[Dict]: Latencia, peticiones en curso, errores y disponibilidad
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [endpoint.status(now) for endpoint in self.endpoints]
+    
+    def close(self) -> None:
+        """Detiene la comprobación de salud y cierra las conexiones"""
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join(timeout=1.0)
+        for endpoint in self.endpoints:
+            endpoint.handler.session.close()
+        logger.info("Pool de Ollama cerrado")
@@ -11,9 +11,18 @@ from typing import Dict, List, Optional
 
 logger = logging.getLogger('nova.personality')
 
+# Versión del texto de la personalidad: cambiarla invalida los prompts ya
+# construidos. El prompt de sistema debe ser idéntico byte a byte entre
+# turnos para que Ollama reutilice su caché del prefijo y no vuelva a
+# evaluarlo entero en cada mensaje.
+PROMPT_VERSION = 1
+
 class NovaPersonality:
     """Clase para gestionar la personalidad de Nova"""
     
+    # Prompts de sistema ya construidos, por (tipo de personalidad, versión)
+    _prompt_cache: Dict[tuple, str] = {}
+    
     def __init__(self, personality_type: Optional[str] = "cyberpunk"):
         """Inicializa la personalidad de Nova con sus características predefinidas"""
         self.personality_type = personality_type
@@ -52,6 +61,10 @@ class NovaPersonality:
     def get_system_prompt(self, user_name: Optional[str] = None) -> str:
         """Genera el prompt de sistema que define la personalidad de Nova
         
+        El prompt solo depende del tipo de personalidad: se construye una vez
+        y se reutiliza el mismo texto en todos los turnos. La información que
+        cambia de un turno a otro va en get_memory_message.
+        
         Args:
             user_name: Nombre del usuario, si es diferente del predeterminado
             
@@ -61,9 +74,37 @@ class NovaPersonality:
         # Actualizar el nombre del usuario si se proporciona
         if user_name:
             self.user_name = user_name
+        
+        key = (self.personality_type, PROMPT_VERSION)
+        system_prompt = self._prompt_cache.get(key)
+        if system_prompt is None:
+            system_prompt = self._prompt_cache.setdefault(key, self._build_system_prompt())
+        return system_prompt
+    
+    def get_memory_message(self, memory_context: str) -> Optional[Dict[str, str]]:
+        """Prepara el mensaje con la memoria relevante para el turno actual
+        
+        Va detrás del historial, justo antes del mensaje del usuario, para no
+        alterar el principio de la conversación que Ollama ya tiene evaluado.
+        
+        Args:
+            memory_context: Contexto de memoria del turno (puede estar vacío)
             
-        # Construir el prompt de sistema
-        system_prompt = f"""You are Nova "Neon" Storm, a 21-year-old cyberpunk hacker with the following traits:
+        Returns:
+            Optional[Dict[str, str]]: Mensaje de sistema, o None si no hay contexto
+        """
+        if not memory_context:
+            return None
+        return {"role": "system",
+                "content": f"Recuerda esta información sobre {self.user_name}:\n{memory_context}"}
+    
+    def _build_system_prompt(self) -> str:
+        """Construye el texto del prompt de sistema
+        
+        Returns:
+            str: Prompt de sistema completo
+        """
+        system_prompt = """You are Nova "Neon" Storm, a 21-year-old cyberpunk hacker with the following traits:
 
 PERSONALITY:
 - You are shy, reserved, and emotionally contained. You don't easily express your feelings.
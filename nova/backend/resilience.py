@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo con las piezas de resiliencia de la comunicación con Ollama
+Plazos por petición, cortocircuito ante servidores caídos, cancelación de
+respuestas en streaming y latencias recientes
+"""
+
+import logging
+import socket
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import requests
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger('nova.resilience')
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """La generación ha superado su plazo total"""
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """El cortocircuito está abierto: la petición se rechaza sin intentarla"""
+
+# Cancelación asociada a la petición que el hilo actual está enviando
+_active_cancel = threading.local()
+
+class StreamCancel:
+    """Permite abandonar desde otro hilo una respuesta en streaming"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._sock: Optional[socket.socket] = None
+        self._response: Optional[requests.Response] = None
+    
+    def is_set(self) -> bool:
+        """Indica si la respuesta se ha abandonado"""
+        with self._lock:
+            return self._cancelled
+    
+    @contextmanager
+    def bind(self) -> Iterator[None]:
+        """
+        Asocia a esta cancelación la petición que se envíe dentro del bloque
+        
+        Así se puede cortar la conexión aunque Ollama aún no haya enviado
+        las cabeceras, que llegan con el primer token. Requiere que la
+        sesión use CancellableAdapter.
+        """
+        _active_cancel.token = self
+        try:
+            yield
+        finally:
+            _active_cancel.token = None
+    
+    def _watch(self, sock: Optional[socket.socket]) -> None:
+        """Registra el socket de la petición (lo llama la conexión al enviarla)"""
+        with self._lock:
+            self._sock = sock
+            if self._cancelled:
+                self._shutdown()
+    
+    def attach(self, response: requests.Response) -> None:
+        """
+        Asocia la respuesta que se está leyendo
+        
+        Si ya se había abandonado, se cierra en el acto.
+        
+        Args:
+            response: Respuesta en streaming
+        """
+        with self._lock:
+            self._response = response
+            if self._sock is None:
+                raw = response.raw
+                connection = getattr(raw, "connection", None) or getattr(raw, "_connection", None)
+                self._sock = getattr(connection, "sock", None)
+            if self._cancelled:
+                self._shutdown()
+                response.close()
+    
+    def cancel(self) -> None:
+        """Abandona la respuesta y cierra su conexión de inmediato"""
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            self._shutdown()
+            if self._response is not None:
+                self._response.close()
+    
+    def _shutdown(self) -> None:
+        """
+        Corta el socket de la petición
+        
+        response.close() por sí solo espera a que llegue el siguiente
+        fragmento; cortar el socket despierta ya al hilo que lo lee y Ollama
+        deja de generar. Se guarda el objeto socket (y no la conexión, que
+        vuelve al pool): una vez cerrado, shutdown() falla sin tocar otra
+        conexión.
+        """
+        if self._sock is None:
+            return
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+class _CancellableConnectionMixin:
+    """Registra el socket en la StreamCancel activa del hilo antes de esperar la respuesta"""
+    
+    def getresponse(self, *args, **kwargs):
+        cancel = getattr(_active_cancel, "token", None)
+        if cancel is not None:
+            cancel._watch(self.sock)
+        return super().getresponse(*args, **kwargs)
+
+class _CancellableHTTPConnection(_CancellableConnectionMixin, HTTPConnection):
+    pass
+
+class _CancellableHTTPSConnection(_CancellableConnectionMixin, HTTPSConnection):
+    pass
+
+class _CancellableHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CancellableHTTPConnection
+
+class _CancellableHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CancellableHTTPSConnection
+
+class CancellableAdapter(requests.adapters.HTTPAdapter):
+    """Adaptador de requests cuyas peticiones se pueden cortar con StreamCancel"""
+    
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CancellableHTTPConnectionPool,
+            "https": _CancellableHTTPSConnectionPool,
+        }
+
+class CircuitBreaker:
+    """Cortocircuito que deja de llamar a un servidor mientras falla"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 name: str = "ollama"):
+        """
+        Inicializa el cortocircuito
+        
+        Tras `failure_threshold` fallos seguidos se abre y rechaza todas las
+        peticiones durante `reset_timeout` segundos. Después deja pasar una
+        sola de prueba (semiabierto): si sale bien se cierra, y si falla se
+        vuelve a abrir. Si la prueba no informa de su resultado en otros
+        `reset_timeout` segundos se da por perdida y se deja pasar otra.
+        
+        Args:
+            failure_threshold: Fallos seguidos que abren el cortocircuito
+            reset_timeout: Segundos que permanece abierto antes de probar
+            name: Nombre para los mensajes de log
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+    
+    @property
+    def state(self) -> str:
+        """Estado actual (closed, open o half_open)"""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+    
+    def allow(self) -> bool:
+        """
+        Indica si se puede enviar una petición
+        
+        Returns:
+            bool: False si el cortocircuito está abierto o ya hay una prueba en curso
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            now = time.monotonic()
+            if self._probe_in_flight and now - self._probe_started < self.reset_timeout:
+                return False
+            self._probe_in_flight = True
+            self._probe_started = now
+            return True
+    
+    def record_success(self) -> None:
+        """Registra una petición correcta"""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Cortocircuito de {self.name} cerrado")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+    
+    def record_failure(self) -> None:
+        """Registra una petición fallida"""
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Cortocircuito de {self.name} abierto tras "
+                                   f"{self._failures} fallos seguidos")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+class LatencyTracker:
+    """Ventana de latencias recientes para estimar percentiles"""
+    
+    def __init__(self, size: int = 200):
+        """
+        Inicializa la ventana
+        
+        Args:
+            size: Número de mediciones recientes que se conservan
+        """
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+    
+    def add(self, seconds: float) -> None:
+        """Añade una medición"""
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def percentile(self, pct: float, min_samples: int = 20) -> Optional[float]:
+        """
+        Calcula un percentil de las mediciones recientes
+        
+        Args:
+            pct: Percentil (0-100)
+            min_samples: Mediciones mínimas para dar un resultado
+            
+        Returns:
+            Optional[float]: Percentil en segundos, o None si hay pocas mediciones
+        """
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+class Metrics:
+    """Contadores de las peticiones a Ollama, seguros entre hilos"""
+    
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+    
+    def incr(self, name: str, amount: int = 1) -> None:
+        """Incrementa un contador"""
+        with self._lock:
+            self._counts[name] += amount
+    
+    def snapshot(self) -> Dict[str, int]:
+        """Copia de todos los contadores"""
+        with self._lock:
+            return dict(self._counts)
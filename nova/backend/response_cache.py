@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo con la caché de respuestas del modelo
+Evita repetir generaciones completas para peticiones idénticas (saludos, sondas...)
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger('nova.response_cache')
+
+class ResponseCache:
+    """Caché LRU con caducidad de respuestas de Ollama, opcionalmente persistente"""
+    
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0,
+                 db_path: Optional[str] = None):
+        """Inicializa la caché
+        
+        Con `db_path`, cada entrada se guarda también en SQLite y al iniciar se
+        recuperan las que aún no han caducado, de modo que la caché sobrevive a
+        los reinicios. SQLite solo refleja el contenido en memoria: las
+        consultas nunca tocan el disco.
+        
+        Args:
+            max_entries: Número máximo de respuestas guardadas
+            ttl: Segundos que una respuesta sigue siendo válida
+            db_path: Ruta de la base de datos para persistir la caché (opcional)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        
+        self._conn: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._open(db_path)
+        logger.info(f"Caché de respuestas inicializada ({max_entries} entradas, TTL {ttl:.0f}s)")
+    
+    def _open(self, db_path: str) -> None:
+        """Abre la base de datos de persistencia y carga las entradas vigentes
+        
+        Args:
+            db_path: Ruta de la base de datos
+        """
+        try:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created REAL NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            self._conn.execute("DELETE FROM response_cache WHERE created < ?",
+                               (time.time() - self.ttl,))
+            rows = self._conn.execute('''
+                SELECT key, response, created FROM response_cache
+                ORDER BY created DESC LIMIT ?
+            ''', (self.max_entries,)).fetchall()
+            # Las más recientes quedan al final, como las usadas por última vez
+            for key, response, created in reversed(rows):
+                self._entries[key] = (response, created)
+            logger.info(f"Caché de respuestas cargada desde {db_path} ({len(rows)} entradas)")
+        except sqlite3.Error as e:
+            logger.error(f"Error al abrir la caché de respuestas persistente: {str(e)}")
+            self._conn = None
+    
+    def _persist(self, sql: str, params: Tuple) -> None:
+        """Ejecuta una escritura en la base de datos de persistencia, si la hay
+        
+        Args:
+            sql: Sentencia SQL
+            params: Parámetros de la sentencia
+        """
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(sql, params)
+        except sqlite3.Error as e:
+            logger.error(f"Error al persistir la caché de respuestas: {str(e)}")
+    
+    @staticmethod
+    def make_key(payload: Dict) -> str:
+        """Calcula la clave de caché de una petición a /api/chat
+        
+        La clave cubre el modelo, los mensajes enviados (prompt de sistema,
+        historial y mensaje actual, sin espacios sobrantes) y las opciones de
+        generación.
+        
+        Args:
+            payload: Payload de la petición (ver build_chat_payload)
+            
+        Returns:
+            str: Hash hexadecimal de la petición
+        """
+        canonical = {
+            "model": payload.get("model"),
+            "messages": [[msg.get("role"), (msg.get("content") or "").strip()]
+                         for msg in payload.get("messages", [])],
+            "options": payload.get("options"),
+        }
+        data = json.dumps(canonical, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Obtiene una respuesta guardada
+        
+        Args:
+            key: Clave de la petición (ver make_key)
+            
+        Returns:
+            Optional[str]: Respuesta guardada, o None si no está o ha caducado
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self._persist("DELETE FROM response_cache WHERE key = ?", (key,))
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key: str, response: str) -> None:
+        """Guarda una respuesta, expulsando la menos usada si la caché está llena
+        
+        Args:
+            key: Clave de la petición (ver make_key)
+            response: Respuesta completa del modelo
+        """
+        created = time.time()
+        with self._lock:
+            self._entries[key] = (response, created)
+            self._entries.move_to_end(key)
+            self._persist("INSERT OR REPLACE INTO response_cache (key, response, created) "
+                          "VALUES (?, ?, ?)", (key, response, created))
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                self._persist("DELETE FROM response_cache WHERE key = ?", (old_key,))
+    
+    def stats(self) -> Dict[str, float]:
+        """Obtiene los contadores de la caché
+        
+        Returns:
+            Dict[str, float]: Aciertos, fallos, expulsiones, tamaño y tasa de acierto
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+    
+    def clear(self) -> None:
+        """Vacía la caché (también la copia persistente)"""
+        with self._lock:
+            self._entries.clear()
+            self._persist("DELETE FROM response_cache", ())
+    
+    def close(self) -> None:
+        """Cierra la base de datos de persistencia"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
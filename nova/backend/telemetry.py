@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo de telemetría de las generaciones del modelo
+Lee los tiempos que Ollama envía con cada respuesta (tokens, duraciones y
+carga del modelo) y mantiene histogramas recientes por modelo
+"""
+
+import logging
+import threading
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional
+
+logger = logging.getLogger('nova.telemetry')
+
+# Límites superiores de los cubos de cada histograma
+HISTOGRAM_BUCKETS = {
+    "ttft_ms": (100, 250, 500, 1000, 2500, 5000, 10000),
+    "total_ms": (500, 1000, 2500, 5000, 10000, 30000, 60000),
+    "load_ms": (10, 100, 1000, 5000, 15000),
+    "tokens_per_sec": (5, 10, 20, 40, 80, 160),
+    "prompt_tokens_per_sec": (100, 250, 500, 1000, 2500, 5000),
+    "prompt_tokens": (128, 256, 512, 1024, 2048, 4096),
+    "completion_tokens": (32, 64, 128, 256, 512, 1024),
+}
+
+def parse_generation_stats(chunk: Dict, ttft: Optional[float] = None) -> Optional[Dict[str, float]]:
+    """
+    Extrae las métricas de la respuesta final de Ollama
+    
+    Ollama da las duraciones en nanosegundos en la respuesta completa (o en
+    el último fragmento, con done=True, en streaming).
+    
+    Args:
+        chunk: Respuesta de Ollama con done=True
+        ttft: Segundos medidos hasta el primer fragmento (opcional); si no se
+            indica, se estima como carga más evaluación del prompt
+            
+    Returns:
+        Optional[Dict[str, float]]: Métricas de la generación, o None si la
+            respuesta no trae tiempos
+    """
+    if not chunk.get("done") or "eval_count" not in chunk:
+        return None
+    
+    def seconds(field: str) -> float:
+        return (chunk.get(field) or 0) / 1e9
+    
+    load = seconds("load_duration")
+    prompt_eval = seconds("prompt_eval_duration")
+    evaluation = seconds("eval_duration")
+    prompt_tokens = chunk.get("prompt_eval_count") or 0
+    completion_tokens = chunk.get("eval_count") or 0
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "tokens_per_sec": completion_tokens / evaluation if evaluation else 0.0,
+        "prompt_tokens_per_sec": prompt_tokens / prompt_eval if prompt_eval else 0.0,
+        "load_ms": load * 1000,
+        "prompt_eval_ms": prompt_eval * 1000,
+        "eval_ms": evaluation * 1000,
+        "total_ms": seconds("total_duration") * 1000,
+        "ttft_ms": (ttft if ttft is not None else load + prompt_eval) * 1000,
+    }
+
+class GenerationTelemetry:
+    """Histogramas recientes, por modelo, de las métricas de generación"""
+    
+    def __init__(self, window: int = 200, reload_threshold: float = 0.25):
+        """
+        Inicializa la telemetría
+        
+        Args:
+            window: Generaciones recientes por modelo que entran en los histogramas
+            reload_threshold: Segundos de carga a partir de los cuales se
+                considera que Ollama ha vuelto a cargar el modelo
+        """
+        self.window = window
+        self.reload_threshold = reload_threshold
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[Dict[str, float]]] = {}
+        self._totals: Dict[str, Counter] = {}
+    
+    def record(self, model: str, chunk: Dict,
+               ttft: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """
+        Registra la respuesta final de una generación
+        
+        Args:
+            model: Modelo que generó la respuesta
+            chunk: Respuesta de Ollama con done=True
+            ttft: Segundos medidos hasta el primer fragmento (opcional)
+            
+        Returns:
+            Optional[Dict[str, float]]: Métricas registradas, o None si la
+                respuesta no trae tiempos
+        """
+        stats = parse_generation_stats(chunk, ttft)
+        if stats is None:
+            return None
+        reloaded = stats["load_ms"] >= self.reload_threshold * 1000
+        with self._lock:
+            samples = self._samples.setdefault(model, deque(maxlen=self.window))
+            samples.append(stats)
+            totals = self._totals.setdefault(model, Counter())
+            totals["generations"] += 1
+            totals["prompt_tokens"] += stats["prompt_tokens"]
+            totals["completion_tokens"] += stats["completion_tokens"]
+            totals["reloads"] += int(reloaded)
+        if reloaded:
+            logger.info(f"Ollama cargó el modelo {model} para esta petición "
+                        f"({stats['load_ms']:.0f} ms)")
+        logger.debug(f"Generación de {model}: {stats['completion_tokens']} tokens a "
+                     f"{stats['tokens_per_sec']:.1f} tok/s, prompt de "
+                     f"{stats['prompt_tokens']} tokens, TTFT {stats['ttft_ms']:.0f} ms")
+        return stats
+    
+    @staticmethod
+    def _describe(values: List[float], buckets) -> Dict:
+        """
+        Resume una serie de valores como percentiles e histograma
+        
+        Args:
+            values: Valores de la ventana
+            buckets: Límites superiores de los cubos
+            
+        Returns:
+            Dict: Media, p50, p95, máximo y recuento por cubo
+        """
+        ordered = sorted(values)
+        
+        def pct(p: float) -> float:
+            return round(ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)], 1)
+        
+        histogram = {str(edge): 0 for edge in buckets}
+        histogram["inf"] = 0
+        for value in ordered:
+            key = next((str(edge) for edge in buckets if value <= edge), "inf")
+            histogram[key] += 1
+        return {
+            "mean": round(sum(ordered) / len(ordered), 1),
+            "p50": pct(50),
+            "p95": pct(95),
+            "max": round(ordered[-1], 1),
+            "histogram": histogram,
+        }
+    
+    def summary(self) -> Dict[str, Dict]:
+        """
+        Obtiene el resumen de cada modelo
+        
+        Returns:
+            Dict[str, Dict]: Por modelo, los totales acumulados y, para cada
+                métrica, percentiles e histograma de la ventana reciente
+        """
+        with self._lock:
+            snapshot = {model: (list(samples), dict(self._totals[model]))
+                        for model, samples in self._samples.items()}
+        result = {}
+        for model, (samples, totals) in snapshot.items():
+            metrics = {name: self._describe([sample[name] for sample in samples], buckets)
+                       for name, buckets in HISTOGRAM_BUCKETS.items()}
+            result[model] = {"totals": totals, "window": len(samples), "metrics": metrics}
+        return result
+    
+    def clear(self) -> None:
+        """Descarta todas las mediciones"""
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
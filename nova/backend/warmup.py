@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo para mantener el modelo de Ollama cargado y preparado
+Precarga el modelo (y opcionalmente el prompt de sistema) en segundo plano
+para que el primer mensaje tras un periodo de inactividad no pague la carga
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Union
+
+import requests
+
+from nova.backend.ai_handler import OllamaHandler
+from nova.backend.ollama_pool import OllamaPool
+
+logger = logging.getLogger('nova.warmup')
+
+class ModelWarmer:
+    """Precarga el modelo en Ollama al arrancar, al conectarse clientes y periódicamente"""
+    
+    def __init__(self, handler: OllamaHandler, system_prompt: Optional[str] = None,
+                 keep_alive: Optional[Union[str, float]] = None, interval: float = 0.0,
+                 min_interval: float = 30.0):
+        """
+        Inicializa el precalentador
+        
+        Cada servidor se precarga con `OllamaHandler.preload`. Sin
+        `system_prompt` solo se carga el modelo; con él, Ollama deja ese
+        prefijo evaluado en su caché y el primer mensaje real solo evalúa lo
+        que viene detrás. Las precargas no cuentan en las métricas ni en el
+        cortocircuito de los servidores.
+        
+        Args:
+            handler: Manejador de Ollama (con un pool se precargan todos los servidores)
+            system_prompt: Prompt de sistema que se deja evaluado (opcional)
+            keep_alive: Tiempo que el modelo sigue cargado (por defecto, el
+                del manejador)
+            interval: Segundos entre precargas periódicas (0 = solo bajo demanda)
+            min_interval: Segundos mínimos entre dos precargas bajo demanda
+        """
+        self.handler = handler
+        self.system_prompt = system_prompt
+        self.keep_alive = keep_alive if keep_alive is not None else handler.keep_alive
+        self.interval = interval
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._running = False
+        self._last_started = float("-inf")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_warmup: Optional[Dict] = None
+    
+    def _targets(self) -> List[OllamaHandler]:
+        """Manejadores de cada servidor que hay que precargar"""
+        if isinstance(self.handler, OllamaPool):
+            return [endpoint.handler for endpoint in self.handler.endpoints]
+        return [self.handler]
+    
+    def warmup(self) -> Dict:
+        """
+        Precarga el modelo en todos los servidores (bloquea hasta terminar)
+        
+        Returns:
+            Dict: Resultado con la duración y los servidores que fallaron
+        """
+        start = time.perf_counter()
+        failed = []
+        for target in self._targets():
+            try:
+                result = target.preload(self.system_prompt, keep_alive=self.keep_alive)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.warning(f"No se pudo precargar {self.handler.model_name} en "
+                               f"{target.api_url}: {str(e)}")
+                failed.append(target.api_url)
+                continue
+            load_ms = (result.get("load_duration") or 0) / 1e6
+            logger.info(f"Modelo {self.handler.model_name} preparado en {target.api_url} "
+                        f"(carga {load_ms:.0f} ms)")
+        
+        self.last_warmup = {
+            "at": time.time(),
+            "seconds": round(time.perf_counter() - start, 3),
+            "primed_prompt": bool(self.system_prompt),
+            "failed": failed,
+        }
+        return self.last_warmup
+    
+    def request_warmup(self) -> bool:
+        """
+        Lanza una precarga en segundo plano si no hay otra reciente o en curso
+        
+        Returns:
+            bool: True si se ha lanzado la precarga
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._running or now - self._last_started < self.min_interval:
+                return False
+            self._running = True
+            self._last_started = now
+        threading.Thread(target=self._run_warmup, name="nova-warmup", daemon=True).start()
+        return True
+    
+    def _run_warmup(self) -> None:
+        """Ejecuta una precarga y libera el turno (se ejecuta en segundo plano)"""
+        try:
+            self.warmup()
+        except Exception as e:
+            logger.error(f"Error al precargar el modelo: {str(e)}")
+        finally:
+            with self._lock:
+                self._running = False
+    
+    def start(self) -> None:
+        """Precarga el modelo ahora y, con `interval`, también periódicamente"""
+        self.request_warmup()
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="nova-warmup-loop",
+                                            daemon=True)
+            self._thread.start()
+    
+    def _loop(self) -> None:
+        """Bucle de precargas periódicas"""
+        while not self._stop.wait(self.interval):
+            self.request_warmup()
+    
+    def status(self) -> Dict:
+        """
+        Obtiene el estado del precalentador
+        
+        Returns:
+            Dict: Configuración y resultado de la última precarga
+        """
+        return {
+            "keep_alive": self.keep_alive,
+            "prime_prompt": bool(self.system_prompt),
+            "interval": self.interval,
+            "running": self._running,
+            "last_warmup": self.last_warmup,
+        }
+    
+    def close(self) -> None:
+        """Detiene las precargas periódicas"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
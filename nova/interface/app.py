@@ -10,21 +10,29 @@ Integra todos los módulos (IA, voz, memoria, avatar) en una interfaz interactiv
 from dotenv import load_dotenv
 load_dotenv()
 
+import atexit
 import json
 import logging
 import os
-from datetime import datetime
+import secrets
+import uuid
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from flask import Flask, render_template, request, jsonify, session, send_from_directory
 from flask_socketio import SocketIO, emit
 
 from nova.backend.ai_handler import OllamaHandler
+from nova.backend.conversation_window import (ConversationWindow, ConversationWindows,
+                                              llm_summarizer)
+from nova.backend.ollama_pool import OllamaPool
 from nova.backend.personality import NovaPersonality
+from nova.backend.response_cache import ResponseCache
+from nova.backend.warmup import ModelWarmer
 from nova.voice.speech_to_text import SpeechToText
 from nova.voice.text_to_speech import TextToSpeech
-from nova.memory.memory_manager import MemoryManager
+from nova.memory.store_factory import MemoryStoreFactory
 
 # Configuración de logging
 logging.basicConfig(
@@ -33,15 +41,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger('nova.interface')
 
-# Inicializar la aplicación Flask
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'nova_secret_key')
-app.config['TEMPLATES_AUTO_RELOAD'] = True
-
-# Configurar SocketIO con opciones adecuadas para entornos serverless
-async_mode = 'eventlet' if not os.environ.get('VERCEL', '0') == '1' else None
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode=async_mode)
-
 # Configuración de rutas de archivos
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 STATIC_DIR = Path(__file__).resolve().parent / 'static'
@@ -53,6 +52,94 @@ DATA_DIR.mkdir(exist_ok=True)
 (DATA_DIR / 'audio').mkdir(exist_ok=True)
 (DATA_DIR / 'temp').mkdir(exist_ok=True)
 
+def load_secret_key(path: Path) -> str:
+    """
+    Obtiene la clave con la que se firman las cookies de sesión
+    
+    Sin SECRET_KEY en el entorno se genera una clave aleatoria y se guarda
+    en `path`, para que las sesiones (y con ellas la memoria de cada usuario)
+    sobrevivan a los reinicios.
+    
+    Args:
+        path: Archivo donde se guarda la clave generada
+        
+    Returns:
+        str: Clave secreta
+    """
+    if os.environ.get('SECRET_KEY'):
+        return os.environ['SECRET_KEY']
+    try:
+        return path.read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        pass
+    key = secrets.token_hex(32)
+    try:
+        fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(key)
+    except FileExistsError:
+        # Otro proceso la ha creado a la vez: usar la suya
+        return path.read_text(encoding='utf-8').strip()
+    except OSError as e:
+        logger.warning(f"No se pudo guardar la clave de sesión, las sesiones no "
+                       f"sobrevivirán a un reinicio: {str(e)}")
+    return key
+
+# Inicializar la aplicación Flask
+app = Flask(__name__)
+app.config['SECRET_KEY'] = load_secret_key(DATA_DIR / 'secret_key')
+# La sesión guarda el identificador del usuario (y con él su memoria)
+app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=365)
+app.config['TEMPLATES_AUTO_RELOAD'] = True
+
+# Configurar SocketIO con opciones adecuadas para entornos serverless
+async_mode = 'eventlet' if not os.environ.get('VERCEL', '0') == '1' else None
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=async_mode)
+
+if async_mode == 'eventlet':
+    from eventlet import tpool
+
+def run_blocking(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Ejecuta una llamada bloqueante sin detener al resto de clientes
+    
+    La aplicación no aplica monkey_patch de eventlet (la voz usa hilos reales
+    con llamadas bloqueantes a PyAudio y Whisper), así que las peticiones a
+    Ollama con `requests` pararían el bucle de eventlet y todos los clientes
+    esperarían al que está generando. Con eventlet la llamada se ejecuta en
+    un hilo del sistema de `tpool` (20 por defecto, ajustable con
+    EVENTLET_THREADPOOL_SIZE, que limita las generaciones simultáneas); sin
+    él, directamente.
+    
+    Args:
+        func: Función a ejecutar
+        *args: Argumentos posicionales
+        **kwargs: Argumentos con nombre
+        
+    Returns:
+        Any: Resultado de la función
+    """
+    if async_mode == 'eventlet':
+        return tpool.execute(func, *args, **kwargs)
+    return func(*args, **kwargs)
+
+def iterate_blocking(iterable: Iterable) -> Iterator:
+    """
+    Recorre un iterador bloqueante (como un streaming de Ollama) sin detener al resto
+    
+    Con eventlet cada paso del iterador se ejecuta en un hilo de `tpool` y el
+    bucle atiende a los demás clientes mientras llega el siguiente fragmento.
+    
+    Args:
+        iterable: Iterador a recorrer
+        
+    Returns:
+        Iterator: Iterador equivalente
+    """
+    if async_mode == 'eventlet':
+        return iter(tpool.Proxy(iter(iterable)))
+    return iter(iterable)
+
 # Inicializar componentes de Nova
 # Verificar si estamos en entorno de Vercel
 is_vercel = os.environ.get('VERCEL', '0') == '1'
@@ -66,12 +153,62 @@ else:
     # En desarrollo local, intentamos primero localhost
     ollama_api_url = "http://92.177.226.9:11434/api/chat"
 
-ai_handler = OllamaHandler(
-    api_url=ollama_api_url,
-    model_name="openchat"  # Utilizando el modelo OpenChat
-)
+# Caché opcional de respuestas: las peticiones idénticas (saludos, sondas de
+# salud...) no vuelven a pasar por el modelo
+response_cache = None
+if os.environ.get('RESPONSE_CACHE', '0') == '1':
+    response_cache = ResponseCache(
+        max_entries=int(os.environ.get('RESPONSE_CACHE_SIZE', '256')),
+        ttl=float(os.environ.get('RESPONSE_CACHE_TTL', '3600')),
+        db_path=(str(DATA_DIR / "response_cache.db")
+                 if os.environ.get('RESPONSE_CACHE_PERSIST', '0') == '1' else None)
+    )
+    atexit.register(response_cache.close)
+
+# Plazos de cada generación (hasta el primer fragmento y en total) y keep_alive
+ollama_options = {
+    "first_token_timeout": float(os.environ.get('OLLAMA_FIRST_TOKEN_TIMEOUT', '60')),
+    "total_timeout": float(os.environ.get('OLLAMA_TOTAL_TIMEOUT', '300')),
+    # Tiempo que Ollama mantiene el modelo y su caché de prompt tras cada petición
+    "keep_alive": os.environ.get('OLLAMA_KEEP_ALIVE') or None,
+}
+
+# Con varios servidores en OLLAMA_API_URLS (separados por comas) las peticiones
+# se reparten entre ellos según su latencia y su carga
+ollama_api_urls = [url.strip() for url in os.environ.get('OLLAMA_API_URLS', '').split(',')
+                   if url.strip()]
+if ollama_api_urls:
+    ai_handler = OllamaPool(
+        api_urls=ollama_api_urls,
+        model_name="openchat",  # Utilizando el modelo OpenChat
+        cache=response_cache,
+        hedge=os.environ.get('OLLAMA_HEDGE', '0') == '1',
+        **ollama_options
+    )
+    atexit.register(ai_handler.close)
+else:
+    ai_handler = OllamaHandler(
+        api_url=ollama_api_url,
+        model_name="openchat",  # Utilizando el modelo OpenChat
+        cache=response_cache,
+        **ollama_options
+    )
 personality = NovaPersonality()
 
+# Precarga del modelo al arrancar y cuando se conecta un cliente, para que el
+# primer mensaje tras un rato sin uso no espere a que Ollama lo cargue. Con
+# OLLAMA_WARMUP_PROMPT=1 también se deja evaluado el prompt de sistema.
+model_warmer = None
+if os.environ.get('OLLAMA_WARMUP', '0' if is_vercel else '1') == '1':
+    model_warmer = ModelWarmer(
+        ai_handler,
+        system_prompt=(personality.get_system_prompt()
+                       if os.environ.get('OLLAMA_WARMUP_PROMPT', '1') == '1' else None),
+        interval=float(os.environ.get('OLLAMA_WARMUP_INTERVAL', '0'))
+    )
+    model_warmer.start()
+    atexit.register(model_warmer.close)
+
 # En Vercel, deshabilitamos los componentes de voz que requieren hardware local
 if not is_vercel:
     speech_to_text = SpeechToText(model_size="base", language="es")
@@ -80,20 +217,149 @@ else:
     speech_to_text = None
     text_to_speech = None
 
-memory_manager = MemoryManager(db_path=str(DATA_DIR / "memory.db"))
+# La escritura diferida es opcional: saca los fsync del camino de cada turno
+# a cambio de poder perder las últimas escrituras si el proceso muere (no
+# conviene en Vercel, donde no hay procesos persistentes)
+memory_write_behind = os.environ.get('MEMORY_WRITE_BEHIND', '0') == '1'
+# Las conversaciones más antiguas que MEMORY_RETENTION_DAYS se archivan al
+# iniciar (0 = conservar todo en la tabla principal)
+memory_retention_days = int(os.environ.get('MEMORY_RETENTION_DAYS', '0'))
+# Cada usuario tiene su propia base de datos de memoria. La memoria única
+# anterior (data/memory.db) tiene los datos de una persona: solo se asigna al
+# usuario indicado en LEGACY_MEMORY_USER, nunca a un visitante cualquiera
+memory_stores = MemoryStoreFactory(
+    base_dir=str(DATA_DIR / "users"),
+    max_open=int(os.environ.get('MEMORY_MAX_OPEN_STORES', '32')),
+    legacy_db_path=str(DATA_DIR / "memory.db"),
+    write_behind=memory_write_behind,
+    retention_days=memory_retention_days or None
+)
+legacy_memory_user = os.environ.get('LEGACY_MEMORY_USER', '').strip()
+if legacy_memory_user:
+    memory_stores.claim_legacy_store(legacy_memory_user)
+# Volcar las escrituras pendientes al detener la aplicación
+atexit.register(memory_stores.close)
 
-# Variables globales para la sesión actual
+# Variables globales para la sesión actual (el micrófono es del equipo local)
 current_session = {
-    "conversation_history": [],
-    "last_response": "",
     "is_listening": False
 }
 
+# Historial que se envía al modelo, uno por usuario: los últimos turnos
+# literales dentro de un presupuesto de tokens y un resumen de los anteriores,
+# generado en segundo plano, para que el prompt no crezca con la duración de
+# la sesión. Los resúmenes son peticiones internas: no cuentan en las
+# métricas, la caché ni el cortocircuito de las conversaciones
+history_summarizer = llm_summarizer(
+    ai_handler, max_tokens=int(os.environ.get('HISTORY_SUMMARY_TOKENS', '300'))
+)
+conversation_windows = ConversationWindows(
+    lambda: ConversationWindow(
+        max_turns=int(os.environ.get('HISTORY_MAX_TURNS', '6')),
+        token_budget=int(os.environ.get('HISTORY_TOKEN_BUDGET', '1500')),
+        summarizer=history_summarizer
+    ),
+    max_users=int(os.environ.get('HISTORY_MAX_USERS', '256'))
+)
+
+def get_user_id() -> str:
+    """
+    Identifica al usuario de la petición para separar su memoria
+    
+    El identificador solo se lee de la sesión, una cookie firmada con
+    SECRET_KEY, así que un cliente no puede elegir el de otro usuario. Si la
+    sesión no lo tiene se crea uno nuevo, con la memoria vacía (se registra
+    en el log para poder asignarle la memoria anterior con
+    LEGACY_MEMORY_USER). En los eventos de Socket.IO la sesión no se
+    puede guardar: el identificador debe existir ya al conectarse, por eso
+    lo crea `index()`.
+    """
+    if 'user_id' not in session:
+        session.permanent = True
+        session['user_id'] = uuid.uuid4().hex
+        logger.info(f"Nuevo usuario: {session['user_id']}")
+    return session['user_id']
+
 @app.route('/')
 def index():
     """Página principal de la aplicación"""
+    # Fijar el usuario antes de que la página abra el WebSocket
+    get_user_id()
     return render_template('index.html')
 
+def load_memory_context(user_id: str, user_message: str) -> str:
+    """
+    Obtiene de la memoria del usuario el contexto relevante para un mensaje
+    
+    Abrir la memoria de un usuario aplica las migraciones y carga el índice
+    de vectores, y la consulta lee de SQLite: todo bloquea, así que se llama
+    con `run_blocking`.
+    
+    Args:
+        user_id: Usuario cuya memoria se consulta
+        user_message: Mensaje actual del usuario
+        
+    Returns:
+        str: Contexto de memoria para el prompt
+    """
+    with memory_stores.acquire(user_id) as memory_manager:
+        return memory_manager.get_memory_for_context(user_message)
+
+def build_turn_prompt(user_id: str, user_message: str) -> Tuple[List[Dict], str]:
+    """
+    Prepara el historial y el prompt de sistema de un turno de conversación
+    
+    Args:
+        user_id: Usuario cuya memoria se consulta
+        user_message: Mensaje actual del usuario
+        
+    Returns:
+        Tuple[List[Dict], str]: Historial para el modelo y prompt de sistema
+    """
+    # Obtener contexto de memoria relevante sin detener al resto de clientes
+    memory_context = run_blocking(load_memory_context, user_id, user_message)
+    
+    # Preparar el historial de conversación del usuario para el modelo (acotado)
+    conversation_history = conversation_windows.get(user_id).get_messages()
+    
+    # El prompt de sistema con la personalidad de Nova no cambia entre turnos,
+    # así Ollama reutiliza lo ya evaluado; la memoria del turno va al final,
+    # justo antes del mensaje del usuario
+    system_prompt = personality.get_system_prompt()
+    memory_message = personality.get_memory_message(memory_context)
+    if memory_message:
+        conversation_history.append(memory_message)
+    
+    return conversation_history, system_prompt
+
+def record_turn(user_id: str, user_message: str, nova_response: str) -> None:
+    """Añade un turno terminado al historial de la sesión del usuario"""
+    conversation_windows.get(user_id).add_turn(user_message, nova_response)
+
+def persist_turn(user_id: str, user_message: str, nova_response: str) -> Optional[str]:
+    """
+    Guarda un turno en la memoria y genera el audio de la respuesta
+    
+    Args:
+        user_id: Usuario al que pertenece la conversación
+        user_message: Mensaje del usuario
+        nova_response: Respuesta completa de Nova
+        
+    Returns:
+        Optional[str]: URL del audio generado, o None si no hay voz disponible
+    """
+    # Guardar la conversación en la memoria
+    with memory_stores.acquire(user_id) as memory_manager:
+        memory_manager.save_conversation(user_message, nova_response)
+    
+    # Generar audio de respuesta solo si no estamos en Vercel y el componente está disponible
+    audio_url = None
+    if not is_vercel and text_to_speech is not None:
+        audio_path = str(DATA_DIR / "audio" / f"response_{int(datetime.now().timestamp())}.wav")
+        text_to_speech.save_to_file(nova_response, audio_path)
+        audio_url = f"/audio/{os.path.basename(audio_path)}"
+    return audio_url
+
 @app.route('/api/send_message', methods=['POST'])
 def send_message():
     """Endpoint para enviar un mensaje a Nova"""
@@ -103,26 +369,12 @@ def send_message():
     if not user_message:
         return jsonify({"error": "Mensaje vacío"}), 400
     
-    # Obtener contexto de memoria relevante
-    memory_context = memory_manager.get_memory_for_context(user_message)
-    
-    # Preparar el historial de conversación para el modelo
-    conversation_history = [
-        {"role": "user", "content": msg["user"]}
-        if i % 2 == 0 else
-        {"role": "assistant", "content": msg["nova"]}
-        for i, msg in enumerate(current_session["conversation_history"])
-    ]
-    
-    # Obtener el prompt de sistema con la personalidad de Nova
-    system_prompt = personality.get_system_prompt()
-    
-    # Si hay contexto de memoria, agregarlo al prompt de sistema
-    if memory_context:
-        system_prompt += f"\n\nRecuerda esta información sobre {personality.user_name}:\n{memory_context}"
+    user_id = get_user_id()
+    conversation_history, system_prompt = build_turn_prompt(user_id, user_message)
     
     # Enviar mensaje a Ollama
-    response = ai_handler.send_message(
+    response = run_blocking(
+        ai_handler.send_message,
         message=user_message,
         conversation_history=conversation_history,
         system_prompt=system_prompt
@@ -130,19 +382,9 @@ def send_message():
     
     nova_response = response.get("response", "Lo siento, no pude procesar tu mensaje.")
     
-    # Guardar la conversación en la memoria
-    memory_manager.save_conversation(user_message, nova_response)
-    
-    # Actualizar el historial de conversación
-    current_session["conversation_history"].append({"user": user_message, "nova": nova_response})
-    current_session["last_response"] = nova_response
-    
-    # Generar audio de respuesta solo si no estamos en Vercel y el componente está disponible
-    audio_url = None
-    if not is_vercel and text_to_speech is not None:
-        audio_path = str(DATA_DIR / "audio" / f"response_{int(datetime.now().timestamp())}.wav")
-        text_to_speech.save_to_file(nova_response, audio_path)
-        audio_url = f"/audio/{os.path.basename(audio_path)}"
+    # Actualizar el historial, guardar en memoria y generar el audio
+    record_turn(user_id, user_message, nova_response)
+    audio_url = run_blocking(persist_turn, user_id, user_message, nova_response)
     
     return jsonify({
         "response": nova_response,
@@ -184,20 +426,88 @@ def stop_listening():
     
     return jsonify({"status": "stopped"})
 
+def load_history_page(user_id: str, limit: int, before_id: Optional[int],
+                      query: Optional[str]) -> Tuple[List[Dict], Optional[int]]:
+    """Lee de la memoria del usuario una página de su historial guardado"""
+    with memory_stores.acquire(user_id) as memory_manager:
+        return memory_manager.get_conversation_history_page(
+            limit=limit, before_id=before_id, query=query)
+
 @app.route('/api/get_conversation_history', methods=['GET'])
 def get_conversation_history():
-    """Obtiene el historial de conversación actual"""
+    """
+    Obtiene el historial de conversación actual
+    
+    Con el parámetro `limit` devuelve en su lugar una página del historial
+    guardado en memoria, de lo más reciente a lo más antiguo. La página
+    siguiente se pide pasando `next_before_id` como `before_id`; `q` filtra
+    por texto.
+    """
+    if 'limit' in request.args:
+        try:
+            limit = min(max(int(request.args['limit']), 1), 500)
+            before_id = request.args.get('before_id', type=int)
+        except ValueError:
+            return jsonify({"error": "Parámetros de paginación no válidos"}), 400
+        
+        conversations, next_before_id = run_blocking(
+            load_history_page,
+            get_user_id(),
+            limit=limit,
+            before_id=before_id,
+            query=request.args.get('q') or None
+        )
+        history = [
+            {
+                "id": conv["id"],
+                "timestamp": conv["timestamp"],
+                "user": conv["user_message"],
+                "nova": conv["nova_response"],
+                "sentiment": conv["sentiment"],
+                "topics": conv["topics"]
+            }
+            for conv in conversations
+        ]
+        return jsonify({
+            "history": history,
+            "count": len(history),
+            "next_before_id": next_before_id
+        })
+    
+    history = conversation_windows.get(get_user_id()).turns()
     return jsonify({
-        "history": current_session["conversation_history"],
-        "count": len(current_session["conversation_history"])
+        "history": history,
+        "count": len(history)
     })
 
 @app.route('/api/clear_conversation', methods=['POST'])
 def clear_conversation():
-    """Limpia el historial de conversación actual"""
-    current_session["conversation_history"] = []
+    """Limpia el historial de conversación actual del usuario"""
+    conversation_windows.clear(get_user_id())
     return jsonify({"status": "cleared"})
 
+@app.route('/api/response_cache', methods=['GET'])
+def get_response_cache_stats():
+    """Devuelve los contadores de la caché de respuestas"""
+    if response_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **response_cache.stats()})
+
+@app.route('/api/generation_stats', methods=['GET'])
+def get_generation_stats():
+    """Devuelve los tiempos de generación recientes de cada modelo"""
+    return jsonify({"models": ai_handler.telemetry.summary()})
+
+@app.route('/api/ollama_status', methods=['GET'])
+def get_ollama_status():
+    """Devuelve el estado de los servidores de Ollama y las métricas de las peticiones"""
+    warmup = model_warmer.status() if model_warmer is not None else None
+    if isinstance(ai_handler, OllamaPool):
+        return jsonify({"endpoints": ai_handler.status(), "metrics": ai_handler.get_metrics(),
+                        "warmup": warmup})
+    return jsonify({"endpoints": [{"url": ai_handler.api_url, "circuit": ai_handler.breaker.state}],
+                    "metrics": ai_handler.get_metrics(), "warmup": warmup})
+
 @app.route('/audio/<filename>')
 def serve_audio(filename):
     """Sirve archivos de audio generados"""
@@ -209,8 +519,16 @@ def serve_audio(filename):
 @socketio.on('connect')
 def handle_connect():
     """Maneja la conexión de un cliente por WebSocket"""
+    if 'user_id' not in session:
+        # Sin la cookie de sesión de index() no hay memoria a la que asociarlo
+        logger.warning(f"Conexión rechazada sin sesión: {request.sid}")
+        return False
     logger.info(f"Cliente conectado: {request.sid}")
     emit('status', {"status": "connected"})
+    
+    # Es probable que el cliente escriba enseguida: asegurar que el modelo está cargado
+    if model_warmer is not None:
+        model_warmer.request_warmup()
 
 @socketio.on('disconnect')
 def handle_disconnect():
@@ -219,18 +537,85 @@ def handle_disconnect():
 
 @socketio.on('send_message')
 def handle_message(data):
-    """Maneja mensajes enviados por WebSocket"""
+    """
+    Maneja mensajes enviados por WebSocket
+    
+    Por defecto la respuesta se transmite en streaming solo al cliente que
+    hizo la pregunta: un evento `nova_token` por fragmento según llega de
+    Ollama y, al terminar, `nova_response` con el texto completo. La memoria
+    y la voz se procesan después, en segundo plano, y el audio se anuncia con
+    `nova_audio`. Con `stream: false` se espera la respuesta completa y se
+    emite `nova_response` a todos los clientes, como antes.
+    """
     user_message = data.get('message', '')
     
     if not user_message:
         emit('error', {"message": "Mensaje vacío"})
         return
     
-    # Procesar el mensaje (reutilizando la lógica de send_message)
-    response_data = send_message().get_json()
+    user_id = session['user_id']
+    conversation_history, system_prompt = build_turn_prompt(user_id, user_message)
     
-    # Emitir la respuesta a todos los clientes
-    emit('nova_response', response_data, broadcast=True)
+    if not data.get('stream', True):
+        response = run_blocking(
+            ai_handler.send_message,
+            message=user_message,
+            conversation_history=conversation_history,
+            system_prompt=system_prompt
+        )
+        nova_response = response.get("response", "Lo siento, no pude procesar tu mensaje.")
+        record_turn(user_id, user_message, nova_response)
+        audio_url = run_blocking(persist_turn, user_id, user_message, nova_response)
+        
+        # Emitir la respuesta solo al cliente que la pidió
+        emit('nova_response', {"response": nova_response, "audio_url": audio_url})
+        return
+    
+    turn_id = uuid.uuid4().hex
+    chunks = []
+    # La lectura del streaming bloquea: se hace fuera del bucle de eventlet
+    for chunk in iterate_blocking(ai_handler.stream_message(
+        message=user_message,
+        conversation_history=conversation_history,
+        system_prompt=system_prompt
+    )):
+        chunks.append(chunk)
+        emit('nova_token', {"turn_id": turn_id, "token": chunk})
+        # Ceder el control para que el fragmento salga ya hacia el navegador
+        socketio.sleep(0)
+    
+    nova_response = "".join(chunks) or "Lo siento, no pude procesar tu mensaje."
+    record_turn(user_id, user_message, nova_response)
+    emit('nova_response', {
+        "turn_id": turn_id,
+        "response": nova_response,
+        "audio_url": None,
+        "streamed": True
+    })
+    
+    # La memoria y la voz no retrasan la respuesta ya mostrada
+    socketio.start_background_task(finish_streamed_turn, request.sid, turn_id, user_id,
+                                   user_message, nova_response)
+
+def finish_streamed_turn(sid: str, turn_id: str, user_id: str, user_message: str,
+                         nova_response: str) -> None:
+    """
+    Guarda en memoria un turno transmitido en streaming y envía su audio
+    
+    Args:
+        sid: Sesión de Socket.IO del cliente que hizo la pregunta
+        turn_id: Identificador del turno enviado con los fragmentos
+        user_id: Usuario al que pertenece la conversación
+        user_message: Mensaje del usuario
+        nova_response: Respuesta completa de Nova
+    """
+    try:
+        audio_url = run_blocking(persist_turn, user_id, user_message, nova_response)
+    except Exception as e:
+        logger.error(f"Error al guardar el turno {turn_id}: {str(e)}")
+        return
+    if audio_url:
+        socketio.emit('nova_audio', {"turn_id": turn_id, "audio_url": audio_url}, to=sid)
 
 def create_app():
     """Crea y configura la aplicación Flask"""
@@ -12,9 +12,13 @@ document.addEventListener('DOMContentLoaded', function() {
     // Ocultar el indicador de voz inicialmente
     voiceIndicator.style.display = 'none';
     
-    // Intentar conectar primero a localhost, si falla, usar la IP alternativa
+    // Conectar al mismo servidor que sirvió la página (su cookie de sesión
+    // identifica al usuario); si falla, usar la IP alternativa
     let socket;
-    let serverUrl = 'http://localhost:5000';
+    // Respuesta que se está recibiendo en streaming (turno, elemento y texto acumulado)
+    let streamingMessage = null;
+    const pageUrl = window.location.origin;
+    let serverUrl = pageUrl;
     const fallbackUrl = 'http://192.168.1.14:5000';
     
     // Función para conectar al socket
@@ -32,8 +36,8 @@ document.addEventListener('DOMContentLoaded', function() {
             socket.on('connect_error', function(error) {
                 console.error('Error de conexión:', error);
                 
-                // Si estamos usando localhost y hay error, intentar con la IP alternativa
-                if (url === serverUrl && serverUrl === 'http://localhost:5000') {
+                // Si falla el servidor de la página, intentar con la IP alternativa
+                if (url === serverUrl && serverUrl === pageUrl) {
                     console.log('Intentando conectar a la IP alternativa...');
                     serverUrl = fallbackUrl;
                     socket.close();
@@ -45,7 +49,30 @@ document.addEventListener('DOMContentLoaded', function() {
                 console.log('Estado:', data);
             });
             
+            socket.on('nova_token', function(data) {
+                // Primer fragmento de un turno: sustituir el "pensando" por la respuesta
+                if (!streamingMessage || streamingMessage.turnId !== data.turn_id) {
+                    removeThinkingMessage();
+                    streamingMessage = { turnId: data.turn_id, content: addNovaMessage(''), text: '' };
+                }
+                streamingMessage.text += data.token;
+                streamingMessage.content.textContent = streamingMessage.text;
+                messagesContainer.scrollTop = messagesContainer.scrollHeight;
+            });
+            
             socket.on('nova_response', function(data) {
+                if (data.streamed) {
+                    // Fin del streaming: dejar el texto completo que envía el servidor
+                    if (streamingMessage && streamingMessage.turnId === data.turn_id) {
+                        streamingMessage.content.textContent = data.response;
+                    } else {
+                        removeThinkingMessage();
+                        addNovaMessage(data.response);
+                    }
+                    streamingMessage = null;
+                    return;
+                }
+                
                 addNovaMessage(data.response);
                 
                 // Reproducir audio si está disponible
@@ -55,6 +82,12 @@ document.addEventListener('DOMContentLoaded', function() {
                 }
             });
             
+            // El audio de una respuesta en streaming llega cuando termina la síntesis
+            socket.on('nova_audio', function(data) {
+                audioPlayer.src = data.audio_url;
+                audioPlayer.play();
+            });
+            
             socket.on('speech_detected', function(data) {
                 userInput.value = data.text;
             });
@@ -85,6 +118,13 @@ document.addEventListener('DOMContentLoaded', function() {
         // Mostrar indicador de procesamiento
         addSystemMessage('Nova está pensando...');
         
+        // Con el socket conectado, la respuesta llega en streaming
+        if (socket && socket.connected) {
+            socket.emit('send_message', { message: message, stream: true });
+            userInput.value = '';
+            return;
+        }
+        
         // Enviar mensaje al servidor
         fetch('/api/send_message', {
             method: 'POST',
@@ -96,10 +136,7 @@ document.addEventListener('DOMContentLoaded', function() {
         .then(response => response.json())
         .then(data => {
             // Eliminar el mensaje de "pensando"
-            const thinkingMessage = Array.from(messagesContainer.getElementsByClassName('message')).find(el => el.textContent === 'Nova está pensando...');
-            if (thinkingMessage) {
-                messagesContainer.removeChild(thinkingMessage);
-            }
+            removeThinkingMessage();
             
             // Añadir respuesta de Nova a la interfaz
             addNovaMessage(data.response);
@@ -167,13 +204,22 @@ document.addEventListener('DOMContentLoaded', function() {
         messagesContainer.scrollTop = messagesContainer.scrollHeight;
     }
     
-    // Función para añadir mensaje de Nova a la interfaz
+    // Función para añadir mensaje de Nova a la interfaz (devuelve su contenido)
     function addNovaMessage(message) {
         const messageDiv = document.createElement('div');
         messageDiv.className = 'message nova-message';
         messageDiv.innerHTML = `<div class="message-content">${message}</div>`;
         messagesContainer.appendChild(messageDiv);
         messagesContainer.scrollTop = messagesContainer.scrollHeight;
+        return messageDiv.firstChild;
+    }
+    
+    // Función para quitar el mensaje de "pensando" de la interfaz
+    function removeThinkingMessage() {
+        const thinkingMessage = Array.from(messagesContainer.getElementsByClassName('message')).find(el => el.textContent === 'Nova está pensando...');
+        if (thinkingMessage) {
+            messagesContainer.removeChild(thinkingMessage);
+        }
     }
     
     // Función para añadir mensaje del sistema a la interfaz
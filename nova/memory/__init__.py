@@ -3,5 +3,11 @@
 
 from nova.memory.memory_manager import MemoryManager
 from nova.memory.database import MemoryDatabase
+from nova.memory.vector_index import Embedder, HashingEmbedder, VectorIndex
+from nova.memory.relevance import RelevanceScorer
+from nova.memory.archive import ConversationArchive
+from nova.memory.store_factory import MemoryStoreFactory
+from nova.memory.async_memory import AsyncMemoryManager
 
-__all__ = ['MemoryManager', 'MemoryDatabase']
\ No newline at end of file
+__all__ = ['MemoryManager', 'MemoryDatabase', 'Embedder', 'HashingEmbedder', 'VectorIndex', 'RelevanceScorer',
+           'ConversationArchive', 'MemoryStoreFactory', 'AsyncMemoryManager']
\ No newline at end of file
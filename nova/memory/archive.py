@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo para el archivo de conversaciones antiguas
+Resume por día y tema las conversaciones antiguas y guarda el texto comprimido
+"""
+
+import json
+import logging
+import sqlite3
+import zlib
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from nova.memory.connection_pool import ConnectionPool
+from nova.memory.database import build_fts_query
+from nova.memory.migrations import table_exists
+
+logger = logging.getLogger('nova.memory.archive')
+
+# Tema con el que se resumen las conversaciones sin temas detectados
+GENERAL_TOPIC = "general"
+
+class ConversationArchive:
+    """Archivo comprimido y resúmenes por día y tema de las conversaciones antiguas"""
+    
+    def __init__(self, pool: ConnectionPool, digest_items: int = 3,
+                 digest_chars: int = 80):
+        """
+        Inicializa el archivo de conversaciones
+        
+        Las tablas las crea la migración 4 del esquema y el índice de texto
+        del archivo, la 6 (ver migrations.py).
+        
+        Args:
+            pool: Pool de conexiones de la base de datos
+            digest_items: Número máximo de mensajes citados en cada extracto
+            digest_chars: Longitud máxima de cada mensaje citado
+        """
+        self.pool = pool
+        self.digest_items = digest_items
+        self.digest_chars = digest_chars
+        self.fts_enabled = False
+        try:
+            with self.pool.reader() as cursor:
+                self.fts_enabled = table_exists(cursor, "conversations_archive_fts")
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo comprobar el índice de texto del archivo: {str(e)}")
+    
+    @staticmethod
+    def _pack(user_message: str, nova_response: str) -> bytes:
+        """
+        Comprime el texto de una conversación
+        
+        Args:
+            user_message: Mensaje del usuario
+            nova_response: Respuesta de Nova
+            
+        Returns:
+            bytes: Texto serializado y comprimido con zlib
+        """
+        payload = json.dumps([user_message, nova_response], ensure_ascii=False)
+        return zlib.compress(payload.encode('utf-8'))
+    
+    @staticmethod
+    def _unpack(content: bytes) -> Tuple[str, str]:
+        """
+        Descomprime el texto de una conversación archivada
+        
+        Args:
+            content: Texto comprimido con `_pack`
+            
+        Returns:
+            Tuple[str, str]: Mensaje del usuario y respuesta de Nova
+        """
+        user_message, nova_response = json.loads(zlib.decompress(content).decode('utf-8'))
+        return user_message, nova_response
+    
+    def _row_to_conversation(self, row: sqlite3.Row) -> Dict:
+        """
+        Convierte una fila del archivo en el mismo formato que la tabla principal
+        
+        Args:
+            row: Fila de `conversations_archive`
+            
+        Returns:
+            Dict: Conversación con el texto descomprimido y `archived` a True
+        """
+        user_message, nova_response = self._unpack(row['content'])
+        return {
+            'id': row['id'],
+            'timestamp': row['timestamp'],
+            'user_message': user_message,
+            'nova_response': nova_response,
+            'sentiment': row['sentiment'],
+            'topics': json.loads(row['topics']) if row['topics'] else row['topics'],
+            'archived': True
+        }
+    
+    @staticmethod
+    def _load_digest(digest: str) -> List[str]:
+        """
+        Lee el extracto de un resumen
+        
+        Args:
+            digest: Lista JSON de mensajes citados
+            
+        Returns:
+            List[str]: Mensajes citados
+        """
+        return json.loads(digest) if digest else []
+    
+    def _snippet(self, text: str) -> str:
+        """
+        Recorta un mensaje para incluirlo en el extracto de un resumen
+        
+        Args:
+            text: Mensaje original
+            
+        Returns:
+            str: Mensaje en una sola línea y de longitud acotada
+        """
+        text = " ".join(text.split())
+        if len(text) > self.digest_chars:
+            text = text[:self.digest_chars - 1].rstrip() + "…"
+        return text
+    
+    def compact(self, older_than: datetime, batch_size: int = 1000) -> int:
+        """
+        Archiva las conversaciones anteriores a una fecha
+        
+        Cada lote se procesa en una transacción: las conversaciones se suman a
+        los resúmenes de su día y tema, se copian comprimidas al archivo y se
+        borran de la tabla principal (los triggers limpian el índice de texto
+        completo y el de temas). Al terminar se libera el espacio con
+        `PRAGMA incremental_vacuum`, sin reescribir toda la base de datos.
+        
+        Args:
+            older_than: Se archivan las conversaciones con fecha anterior
+            batch_size: Número de conversaciones por transacción
+            
+        Returns:
+            int: Número de conversaciones archivadas
+        """
+        cutoff = older_than.isoformat()
+        archived = 0
+        
+        try:
+            while True:
+                with self.pool.writer() as cursor:
+                    cursor.execute('''
+                        SELECT * FROM conversations
+                        WHERE timestamp < ?
+                        ORDER BY timestamp
+                        LIMIT ?
+                    ''', (cutoff, batch_size))
+                    rows = cursor.fetchall()
+                    if not rows:
+                        break
+                    self._archive_batch(cursor, rows)
+                archived += len(rows)
+        except sqlite3.Error as e:
+            logger.error(f"Error al archivar conversaciones: {str(e)}")
+        
+        if archived:
+            logger.info(f"{archived} conversaciones anteriores a {cutoff} archivadas")
+            self.vacuum()
+        return archived
+    
+    def _archive_batch(self, cursor: sqlite3.Cursor, rows: List[sqlite3.Row]) -> None:
+        """
+        Resume, comprime y retira un lote de conversaciones
+        
+        Args:
+            cursor: Cursor de escritura dentro de la transacción del lote
+            rows: Filas de la tabla de conversaciones
+        """
+        # (tema, día) -> [conversaciones, positivas, negativas, neutrales, extractos]
+        rollups: Dict[Tuple[str, str], List] = {}
+        for row in rows:
+            day = row['timestamp'][:10]
+            topics = json.loads(row['topics']) if row['topics'] else []
+            for topic in set(topics) or {GENERAL_TOPIC}:
+                rollup = rollups.setdefault((topic, day), [0, 0, 0, 0, []])
+                rollup[0] += 1
+                if row['sentiment'] == "positivo":
+                    rollup[1] += 1
+                elif row['sentiment'] == "negativo":
+                    rollup[2] += 1
+                else:
+                    rollup[3] += 1
+                if len(rollup[4]) < self.digest_items:
+                    rollup[4].append(self._snippet(row['user_message']))
+        
+        # Sumar a los resúmenes existentes de una compactación anterior
+        for (topic, day), (count, positive, negative, neutral, snippets) in rollups.items():
+            cursor.execute('''
+                SELECT * FROM conversation_summaries WHERE topic = ? AND day = ?
+            ''', (topic, day))
+            existing = cursor.fetchone()
+            if existing:
+                count += existing['conversation_count']
+                positive += existing['positive_count']
+                negative += existing['negative_count']
+                neutral += existing['neutral_count']
+                snippets = (self._load_digest(existing['digest']) + snippets)[:self.digest_items]
+            cursor.execute('''
+                INSERT OR REPLACE INTO conversation_summaries
+                    (topic, day, conversation_count, positive_count, negative_count,
+                     neutral_count, digest)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (topic, day, count, positive, negative, neutral,
+                  json.dumps(snippets, ensure_ascii=False)))
+        
+        if self.fts_enabled:
+            self._index_batch(cursor, rows)
+        cursor.executemany('''
+            INSERT OR REPLACE INTO conversations_archive (id, timestamp, sentiment, topics, content)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(row['id'], row['timestamp'], row['sentiment'], row['topics'],
+               self._pack(row['user_message'], row['nova_response'])) for row in rows])
+        cursor.executemany('''
+            DELETE FROM conversations WHERE id = ?
+        ''', [(row['id'],) for row in rows])
+    
+    def _index_batch(self, cursor: sqlite3.Cursor, rows: List[sqlite3.Row]) -> None:
+        """
+        Añade un lote de conversaciones al índice de texto del archivo
+        
+        El índice no guarda el texto, así que para sustituir una conversación
+        ya archivada hay que borrar su entrada con el texto anterior.
+        
+        Args:
+            cursor: Cursor de escritura dentro de la transacción del lote
+            rows: Filas de la tabla de conversaciones
+        """
+        placeholders = ", ".join("?" for _ in rows)
+        cursor.execute(f'''
+            SELECT id, content FROM conversations_archive WHERE id IN ({placeholders})
+        ''', [row['id'] for row in rows])
+        cursor.executemany('''
+            INSERT INTO conversations_archive_fts
+                (conversations_archive_fts, rowid, user_message, nova_response)
+            VALUES ('delete', ?, ?, ?)
+        ''', [(old['id'],) + self._unpack(old['content']) for old in cursor.fetchall()])
+        cursor.executemany('''
+            INSERT INTO conversations_archive_fts (rowid, user_message, nova_response)
+            VALUES (?, ?, ?)
+        ''', [(row['id'], row['user_message'], row['nova_response']) for row in rows])
+    
+    def vacuum(self, full: bool = False) -> None:
+        """
+        Devuelve al sistema las páginas libres de la base de datos
+        
+        Con auto_vacuum incremental (el de las bases de datos nuevas) solo se
+        mueven las páginas libres. Las bases de datos creadas antes no lo
+        tienen y convertirlas exige un VACUUM completo, que reescribe el
+        archivo y bloquea las escrituras mientras dura; solo se hace si se
+        pide con `full`.
+        
+        Args:
+            full: Si es True, convierte la base de datos con un VACUUM completo
+                cuando todavía no usa auto_vacuum incremental
+        """
+        try:
+            with self.pool.maintenance() as cursor:
+                cursor.execute("PRAGMA auto_vacuum")
+                if cursor.fetchone()[0] == 2:
+                    cursor.execute("PRAGMA incremental_vacuum")
+                    cursor.fetchall()
+                elif full:
+                    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                    cursor.execute("VACUUM")
+                    logger.info("Base de datos convertida a auto_vacuum incremental")
+                else:
+                    logger.info("La base de datos no usa auto_vacuum incremental; "
+                                "el espacio archivado se reutilizará sin devolverlo al sistema")
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo compactar la base de datos: {str(e)}")
+    
+    def get_conversations(self, conversation_ids: List[int]) -> List[Dict]:
+        """
+        Obtiene conversaciones archivadas por su ID conservando el orden recibido
+        
+        Args:
+            conversation_ids: IDs de las conversaciones
+            
+        Returns:
+            List[Dict]: Conversaciones archivadas encontradas
+        """
+        if not conversation_ids:
+            return []
+        
+        try:
+            placeholders = ", ".join("?" for _ in conversation_ids)
+            with self.pool.reader() as cursor:
+                cursor.execute(f'''
+                    SELECT * FROM conversations_archive WHERE id IN ({placeholders})
+                ''', list(conversation_ids))
+                
+                rows = {row['id']: self._row_to_conversation(row) for row in cursor.fetchall()}
+                return [rows[cid] for cid in conversation_ids if cid in rows]
+        except sqlite3.Error as e:
+            logger.error(f"Error al obtener conversaciones archivadas: {str(e)}")
+            return []
+    
+    def search(self, query: str, limit: int = 10, batch_size: int = 500) -> List[Dict]:
+        """
+        Busca texto en las conversaciones archivadas, de la más reciente a la más antigua
+        
+        Con el índice FTS5 del archivo solo se descomprimen las
+        conversaciones encontradas. Sin él, el texto se descomprime por lotes
+        y se compara sin distinguir mayúsculas, igual que la búsqueda LIKE,
+        hasta reunir `limit` resultados.
+        
+        Args:
+            query: Texto a buscar
+            limit: Número máximo de resultados
+            batch_size: Número de filas leídas en cada lote
+            
+        Returns:
+            List[Dict]: Conversaciones archivadas que contienen el texto
+        """
+        if self.fts_enabled:
+            fts_query = build_fts_query(query)
+            if fts_query:
+                try:
+                    with self.pool.reader() as cursor:
+                        cursor.execute('''
+                            SELECT a.* FROM conversations_archive_fts
+                            JOIN conversations_archive a ON a.id = conversations_archive_fts.rowid
+                            WHERE conversations_archive_fts MATCH ?
+                            ORDER BY conversations_archive_fts.rowid DESC
+                            LIMIT ?
+                        ''', (fts_query, limit))
+                        return [self._row_to_conversation(row) for row in cursor.fetchall()]
+                except sqlite3.Error as e:
+                    logger.warning(f"Error en la búsqueda FTS5 del archivo, se recorrerá: {str(e)}")
+        
+        needle = query.lower()
+        results = []
+        
+        try:
+            with self.pool.reader() as cursor:
+                cursor.execute('''
+                    SELECT * FROM conversations_archive ORDER BY id DESC
+                ''')
+                while len(results) < limit:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        user_message, nova_response = self._unpack(row['content'])
+                        if needle in user_message.lower() or needle in nova_response.lower():
+                            results.append(self._row_to_conversation(row))
+                            if len(results) >= limit:
+                                break
+        except sqlite3.Error as e:
+            logger.error(f"Error al buscar en el archivo: {str(e)}")
+        
+        return results
+    
+    def get_summaries(self, topics: List[str], limit: int = 3) -> List[Dict]:
+        """
+        Obtiene los resúmenes más recientes de los temas indicados
+        
+        Args:
+            topics: Temas a buscar
+            limit: Número máximo de resúmenes
+            
+        Returns:
+            List[Dict]: Resúmenes por día y tema, del más reciente al más
+                antiguo; `digest` es la lista de mensajes citados
+        """
+        if not topics:
+            return []
+        
+        try:
+            placeholders = ", ".join("?" for _ in topics)
+            with self.pool.reader() as cursor:
+                cursor.execute(f'''
+                    SELECT * FROM conversation_summaries
+                    WHERE topic IN ({placeholders})
+                    ORDER BY day DESC
+                    LIMIT ?
+                ''', list(topics) + [limit])
+                
+                summaries = [dict(row) for row in cursor.fetchall()]
+            for summary in summaries:
+                summary['digest'] = self._load_digest(summary['digest'])
+            return summaries
+        except sqlite3.Error as e:
+            logger.error(f"Error al obtener resúmenes de conversaciones: {str(e)}")
+            return []
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo con la interfaz asíncrona (asyncio) de la memoria emocional
+Ejecuta las operaciones de SQLite en un pequeño grupo de hilos dedicado
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from nova.memory.memory_manager import MemoryManager
+
+logger = logging.getLogger('nova.memory.async_memory')
+
+class AsyncMemoryManager:
+    """Fachada con métodos awaitables sobre un MemoryManager"""
+    
+    def __init__(self, manager: Optional[MemoryManager] = None, max_workers: int = 2,
+                 **manager_kwargs: Any):
+        """
+        Inicializa la fachada y su grupo de hilos
+        
+        Cada hilo del grupo tiene su propia conexión de lectura (ver
+        ConnectionPool.pin_reader), así que las consultas nunca bloquean el
+        bucle de eventos ni compiten por las conexiones del resto de la
+        aplicación. Las escrituras siguen serializadas en la conexión de
+        escritura del pool.
+        
+        Args:
+            manager: Gestor de memoria existente (opcional)
+            max_workers: Número de hilos dedicados a la memoria
+            **manager_kwargs: Argumentos para crear un MemoryManager si no se
+                proporciona uno (db_path, write_behind, ...)
+        """
+        self._owns_manager = manager is None
+        self.manager = manager if manager is not None else MemoryManager(**manager_kwargs)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="nova-memory",
+            initializer=self.manager.db.pool.pin_reader
+        )
+        logger.info(f"Memoria asíncrona inicializada ({max_workers} hilos)")
+    
+    async def _run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Ejecuta una función síncrona de la memoria en el grupo de hilos
+        
+        Args:
+            func: Función a ejecutar
+            *args: Argumentos posicionales
+            **kwargs: Argumentos con nombre
+            
+        Returns:
+            Any: Resultado de la función
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    async def save_conversation(self, user_message: str, nova_response: str) -> int:
+        """
+        Guarda una conversación y extrae información relevante
+        
+        Args:
+            user_message: Mensaje del usuario
+            nova_response: Respuesta de Nova
+            
+        Returns:
+            int: ID de la conversación guardada
+        """
+        return await self._run(self.manager.save_conversation, user_message, nova_response)
+    
+    async def get_memory_for_context(self, user_message: str, max_items: int = 3,
+                                     token_budget: Optional[int] = None) -> str:
+        """
+        Genera un contexto de memoria relevante para la conversación actual
+        
+        Args:
+            user_message: Mensaje actual del usuario
+            max_items: Número máximo de elementos de memoria a incluir
+            token_budget: Tokens aproximados para los recuerdos (opcional)
+            
+        Returns:
+            str: Contexto de memoria formateado para incluir en el prompt
+        """
+        return await self._run(self.manager.get_memory_for_context, user_message,
+                               max_items=max_items, token_budget=token_budget)
+    
+    async def search_memory(self, query: str) -> Dict[str, List]:
+        """
+        Busca en toda la memoria (conversaciones e información)
+        
+        Args:
+            query: Texto a buscar
+            
+        Returns:
+            Dict[str, List]: Resultados de la búsqueda por categoría
+        """
+        return await self._run(self.manager.search_memory, query)
+    
+    async def search_similar_conversations(self, text: str, limit: int = 3,
+                                           min_score: float = 0.2) -> List[Dict]:
+        """
+        Busca conversaciones semánticamente parecidas a un texto
+        
+        Args:
+            text: Texto de referencia
+            limit: Número máximo de conversaciones
+            min_score: Similitud mínima para considerar una conversación
+            
+        Returns:
+            List[Dict]: Conversaciones ordenadas de mayor a menor similitud
+        """
+        return await self._run(self.manager.search_similar_conversations, text,
+                               limit=limit, min_score=min_score)
+    
+    async def get_recent_conversations(self, limit: int = 5) -> List[Dict]:
+        """
+        Obtiene las conversaciones más recientes
+        
+        Args:
+            limit: Número máximo de conversaciones a obtener
+            
+        Returns:
+            List[Dict]: Lista de conversaciones recientes
+        """
+        return await self._run(self.manager.get_recent_conversations, limit)
+    
+    async def get_conversation_history_page(self, limit: int = 50,
+                                            before_id: Optional[int] = None,
+                                            query: Optional[str] = None
+                                            ) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Obtiene una página del historial guardado
+        
+        Args:
+            limit: Número máximo de conversaciones de la página
+            before_id: Cursor devuelto por la página anterior (opcional)
+            query: Texto que deben contener las conversaciones (opcional)
+            
+        Returns:
+            Tuple[List[Dict], Optional[int]]: Conversaciones y cursor siguiente
+        """
+        return await self._run(self.manager.get_conversation_history_page, limit=limit,
+                               before_id=before_id, query=query)
+    
+    async def save_user_info(self, key: str, value: str, category: str,
+                             confidence: float = 1.0) -> bool:
+        """
+        Guarda información del usuario
+        
+        Args:
+            key: Clave de la información
+            value: Valor asociado
+            category: Categoría de la información
+            confidence: Nivel de confianza de la información (0.0 a 1.0)
+            
+        Returns:
+            bool: True si se guardó correctamente, False en caso contrario
+        """
+        return await self._run(self.manager.save_user_info, key, value, category, confidence)
+    
+    async def get_user_info_summary(self) -> Dict[str, Dict[str, str]]:
+        """
+        Obtiene un resumen de la información del usuario organizada por categorías
+        
+        Returns:
+            Dict[str, Dict[str, str]]: Información del usuario por categorías
+        """
+        return await self._run(self.manager.get_user_info_summary)
+    
+    async def compact_memory(self, older_than_days: Optional[int] = None) -> int:
+        """
+        Archiva las conversaciones antiguas
+        
+        Args:
+            older_than_days: Antigüedad mínima en días (opcional)
+            
+        Returns:
+            int: Número de conversaciones archivadas
+        """
+        return await self._run(self.manager.compact_memory, older_than_days)
+    
+    async def flush(self) -> None:
+        """
+        Garantiza que las escrituras diferidas pendientes estén en disco
+        """
+        await self._run(self.manager.flush)
+    
+    def close(self) -> None:
+        """
+        Detiene el grupo de hilos y cierra el gestor si lo creó esta fachada
+        """
+        self._executor.shutdown(wait=True)
+        if self._owns_manager:
+            self.manager.close()
+        logger.info("Memoria asíncrona cerrada")
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo para exportar e importar la memoria en bloque
+Copia las tablas a archivos JSONL o Parquet por bloques, con memoria acotada
+
+Uso:
+    python -m nova.memory.backup export data/memory.db copia/ --format parquet
+    python -m nova.memory.backup import copia/ data/memory.db
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from tqdm import tqdm
+
+from nova.memory.connection_pool import ConnectionPool
+
+logger = logging.getLogger('nova.memory.backup')
+
+# Tablas exportadas: nombre -> (columna de paginación, columnas)
+TABLES: Dict[str, Tuple[str, List[str]]] = {
+    "conversations": ("id", ["id", "timestamp", "user_message", "nova_response",
+                             "sentiment", "topics"]),
+    "user_info": ("key", ["key", "value", "category", "timestamp", "confidence"]),
+    "preferences": ("key", ["key", "value", "timestamp"]),
+}
+
+FORMATS = ("jsonl", "parquet")
+
+def _parquet_schema(table: str):
+    """
+    Obtiene el esquema Parquet fijo de una tabla
+    
+    Con un esquema explícito todos los bloques comparten tipos aunque uno
+    de ellos tenga una columna completamente vacía.
+    
+    Args:
+        table: Nombre de la tabla
+        
+    Returns:
+        pyarrow.Schema: Esquema de la tabla
+    """
+    import pyarrow as pa
+    
+    schemas = {
+        "conversations": pa.schema([
+            ("id", pa.int64()),
+            ("timestamp", pa.string()),
+            ("user_message", pa.string()),
+            ("nova_response", pa.string()),
+            ("sentiment", pa.string()),
+            ("topics", pa.list_(pa.string())),
+        ]),
+        "user_info": pa.schema([
+            ("key", pa.string()),
+            ("value", pa.string()),
+            ("category", pa.string()),
+            ("timestamp", pa.string()),
+            ("confidence", pa.float64()),
+        ]),
+        "preferences": pa.schema([
+            ("key", pa.string()),
+            ("value", pa.string()),
+            ("timestamp", pa.string()),
+        ]),
+    }
+    return schemas[table]
+
+def _require_pyarrow() -> None:
+    """
+    Comprueba que pyarrow está instalado (necesario para Parquet)
+    
+    Raises:
+        ImportError: Si pyarrow no está disponible
+    """
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ImportError("El formato Parquet requiere pyarrow (pip install pyarrow)")
+
+def iter_table_chunks(pool: ConnectionPool, table: str,
+                      chunk_size: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Recorre una tabla por bloques con paginación por clave
+    
+    Cada bloque es una consulta independiente sobre la clave primaria, así
+    que la memoria usada depende de `chunk_size` y no del tamaño de la tabla.
+    
+    Args:
+        pool: Pool de conexiones de la base de datos
+        table: Nombre de la tabla (ver TABLES)
+        chunk_size: Número de filas por bloque
+        
+    Yields:
+        List[Dict[str, Any]]: Bloque de filas (en conversaciones, con los
+            temas decodificados)
+    """
+    key_column, columns = TABLES[table]
+    column_list = ", ".join(columns)
+    last_key: Any = None
+    
+    while True:
+        with pool.reader() as cursor:
+            if last_key is None:
+                cursor.execute(f'''
+                    SELECT {column_list} FROM {table}
+                    ORDER BY {key_column}
+                    LIMIT ?
+                ''', (chunk_size,))
+            else:
+                cursor.execute(f'''
+                    SELECT {column_list} FROM {table}
+                    WHERE {key_column} > ?
+                    ORDER BY {key_column}
+                    LIMIT ?
+                ''', (last_key, chunk_size))
+            rows = cursor.fetchmany(chunk_size)
+        
+        if not rows:
+            return
+        chunk = [dict(row) for row in rows]
+        if table == "conversations":
+            for record in chunk:
+                record["topics"] = json.loads(record["topics"]) if record["topics"] else None
+        yield chunk
+        if len(rows) < chunk_size:
+            return
+        last_key = rows[-1][key_column]
+
+def _count_rows(pool: ConnectionPool, table: str) -> int:
+    """
+    Cuenta las filas de una tabla (para la barra de progreso)
+    
+    Args:
+        pool: Pool de conexiones de la base de datos
+        table: Nombre de la tabla
+        
+    Returns:
+        int: Número de filas
+    """
+    with pool.reader() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        return cursor.fetchone()[0]
+
+def export_memory(pool: ConnectionPool, output_dir: str, fmt: str = "jsonl",
+                  chunk_size: int = 10000, progress: bool = True) -> Dict[str, int]:
+    """
+    Exporta las conversaciones, la información del usuario y las preferencias
+    
+    Se genera un archivo por tabla (`<tabla>.jsonl` o `<tabla>.parquet`) en
+    `output_dir`. Las filas se leen y escriben por bloques; en Parquet cada
+    bloque es un grupo de filas.
+    
+    Args:
+        pool: Pool de conexiones de la base de datos
+        output_dir: Directorio de destino
+        fmt: Formato de salida ("jsonl" o "parquet")
+        chunk_size: Número de filas por bloque
+        progress: Si es True, muestra el progreso con tqdm
+        
+    Returns:
+        Dict[str, int]: Filas exportadas por tabla
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt} (usa {', '.join(FORMATS)})")
+    if fmt == "parquet":
+        _require_pyarrow()
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    
+    os.makedirs(output_dir, exist_ok=True)
+    exported: Dict[str, int] = {}
+    
+    for table in TABLES:
+        path = os.path.join(output_dir, f"{table}.{fmt}")
+        tmp_path = f"{path}.tmp"
+        count = 0
+        with tqdm(total=_count_rows(pool, table), desc=table, unit=" filas",
+                  disable=not progress) as bar:
+            if fmt == "jsonl":
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    for chunk in iter_table_chunks(pool, table, chunk_size):
+                        f.writelines(json.dumps(record, ensure_ascii=False) + "\n"
+                                     for record in chunk)
+                        count += len(chunk)
+                        bar.update(len(chunk))
+            else:
+                schema = _parquet_schema(table)
+                with pq.ParquetWriter(tmp_path, schema) as writer:
+                    for chunk in iter_table_chunks(pool, table, chunk_size):
+                        frame = pd.DataFrame.from_records(chunk, columns=schema.names)
+                        writer.write_table(pa.Table.from_pandas(frame, schema=schema,
+                                                                preserve_index=False))
+                        count += len(chunk)
+                        bar.update(len(chunk))
+        
+        # Reemplazar el archivo solo cuando la exportación está completa
+        os.replace(tmp_path, path)
+        exported[table] = count
+        logger.info(f"Exportadas {count} filas de {table} a {path}")
+    
+    return exported
+
+def _iter_file_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Lee un archivo exportado por bloques
+    
+    Args:
+        path: Ruta a un archivo .jsonl o .parquet
+        chunk_size: Número de filas por bloque
+        
+    Yields:
+        pd.DataFrame: Bloque de filas
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        with pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False,
+                          convert_dates=False) as reader:
+            yield from reader
+
+def _insert_chunk(cursor: sqlite3.Cursor, table: str, chunk: pd.DataFrame) -> None:
+    """
+    Inserta un bloque de filas importadas con executemany
+    
+    Las conversaciones conservan su ID y no sobrescriben las existentes; la
+    información del usuario y las preferencias sustituyen a las de la misma
+    clave.
+    
+    Args:
+        cursor: Cursor de escritura dentro de la transacción del bloque
+        table: Nombre de la tabla
+        chunk: Filas a insertar
+    """
+    _, columns = TABLES[table]
+    # Convertir NaN/NaT de pandas en NULL
+    chunk = chunk.reindex(columns=columns).astype(object)
+    chunk = chunk.where(chunk.notna(), None)
+    records = list(chunk.itertuples(index=False, name=None))
+    placeholders = ", ".join("?" for _ in columns)
+    
+    if table == "conversations":
+        rows = []
+        topic_pairs = []
+        for record in records:
+            row = dict(zip(columns, record))
+            topics = row["topics"]
+            if topics is not None and not isinstance(topics, str):
+                topics = [str(topic) for topic in topics]
+                topic_pairs.extend((topic, int(row["id"])) for topic in set(topics))
+                row["topics"] = json.dumps(topics) if topics else None
+            row["id"] = int(row["id"])
+            rows.append(tuple(row[column] for column in columns))
+        cursor.executemany(f'''
+            INSERT OR IGNORE INTO conversations ({", ".join(columns)})
+            VALUES ({placeholders})
+        ''', rows)
+        cursor.executemany('''
+            INSERT OR IGNORE INTO conversation_topics (topic, conversation_id)
+            VALUES (?, ?)
+        ''', topic_pairs)
+    else:
+        cursor.executemany(f'''
+            INSERT OR REPLACE INTO {table} ({", ".join(columns)})
+            VALUES ({placeholders})
+        ''', records)
+
+def import_memory(pool: ConnectionPool, input_dir: str, batch_size: int = 10000,
+                  progress: bool = True) -> Dict[str, int]:
+    """
+    Importa una exportación hecha con `export_memory`
+    
+    Cada tabla se lee por bloques de `batch_size` filas y cada bloque se
+    inserta en una única transacción. Las tablas sin archivo se omiten.
+    
+    Args:
+        pool: Pool de conexiones de la base de datos
+        input_dir: Directorio con los archivos exportados
+        batch_size: Número de filas por transacción
+        progress: Si es True, muestra el progreso con tqdm
+        
+    Returns:
+        Dict[str, int]: Filas leídas por tabla
+    """
+    imported: Dict[str, int] = {}
+    
+    for table in TABLES:
+        path = next((os.path.join(input_dir, f"{table}.{fmt}") for fmt in FORMATS
+                     if os.path.exists(os.path.join(input_dir, f"{table}.{fmt}"))), None)
+        if path is None:
+            logger.warning(f"No hay archivo de exportación para {table} en {input_dir}")
+            continue
+        
+        total: Optional[int] = None
+        if path.endswith(".parquet"):
+            _require_pyarrow()
+            import pyarrow.parquet as pq
+            total = pq.ParquetFile(path).metadata.num_rows
+        
+        count = 0
+        with tqdm(total=total, desc=table, unit=" filas", disable=not progress) as bar:
+            for chunk in _iter_file_chunks(path, batch_size):
+                with pool.writer() as cursor:
+                    _insert_chunk(cursor, table, chunk)
+                count += len(chunk)
+                bar.update(len(chunk))
+        
+        imported[table] = count
+        logger.info(f"Importadas {count} filas de {path} en {table}")
+    
+    return imported
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Punto de entrada de la línea de comandos
+    
+    Args:
+        argv: Argumentos (por defecto, los de sys.argv)
+        
+    Returns:
+        int: Código de salida
+    """
+    parser = argparse.ArgumentParser(description="Exporta o importa la memoria de Nova")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    export_parser = subparsers.add_parser("export", help="Exporta la base de datos")
+    export_parser.add_argument("db_path", help="Base de datos de memoria")
+    export_parser.add_argument("output_dir", help="Directorio de destino")
+    export_parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    export_parser.add_argument("--chunk-size", type=int, default=10000)
+    
+    import_parser = subparsers.add_parser("import", help="Importa una exportación")
+    import_parser.add_argument("input_dir", help="Directorio con la exportación")
+    import_parser.add_argument("db_path", help="Base de datos de memoria")
+    import_parser.add_argument("--batch-size", type=int, default=10000)
+    
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    
+    # Importación aquí para no crear un ciclo con database.py
+    from nova.memory.database import MemoryDatabase
+    
+    db = MemoryDatabase(args.db_path)
+    try:
+        if args.command == "export":
+            result = db.export_memory(args.output_dir, fmt=args.format,
+                                      chunk_size=args.chunk_size)
+        else:
+            result = db.import_memory(args.input_dir, batch_size=args.batch_size)
+    finally:
+        db.close()
+    
+    for table, count in result.items():
+        print(f"{table}: {count} filas")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo para la gestión de conexiones SQLite de la memoria
+Implementa un pool con una conexión de escritura y varias de lectura en modo WAL
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List
+
+logger = logging.getLogger('nova.memory.connection_pool')
+
+class ConnectionPool:
+    """Pool de conexiones SQLite con lectores y escritor separados"""
+    
+    def __init__(self, db_path: str, max_readers: int = 4, busy_timeout: float = 5.0):
+        """
+        Inicializa el pool de conexiones
+        
+        Las lecturas usan conexiones que se prestan y devuelven al pool, de modo
+        que funcionan igual con hilos nativos y con greenlets de eventlet. Las
+        escrituras se serializan sobre una única conexión. Con journaling WAL
+        los lectores nunca esperan a que termine una escritura.
+        
+        Args:
+            db_path: Ruta al archivo de base de datos SQLite
+            max_readers: Número máximo de conexiones de lectura simultáneas
+            busy_timeout: Segundos de espera si la base de datos está bloqueada
+        """
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        # Una base de datos en memoria no se puede compartir entre conexiones
+        self.max_readers = 0 if db_path == ":memory:" else max_readers
+        
+        self._write_lock = threading.RLock()
+        self._idle_readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._reader_slots = threading.BoundedSemaphore(max(self.max_readers, 1))
+        self._all_readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        # Conexiones de lectura fijadas a un hilo (ver pin_reader)
+        self._pinned = threading.local()
+        self._closed = False
+        
+        self._writer = self._open(read_only=False)
+        logger.info(f"Pool de conexiones inicializado para {db_path} "
+                    f"({self.max_readers} lectores)")
+    
+    def _open(self, read_only: bool) -> sqlite3.Connection:
+        """
+        Abre y configura una nueva conexión
+        
+        Args:
+            read_only: True si la conexión solo se usará para lecturas
+        
+        Returns:
+            sqlite3.Connection: Conexión configurada
+        """
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            isolation_level=None  # Las transacciones se gestionan explícitamente
+        )
+        conn.row_factory = sqlite3.Row  # Para acceder a las columnas por nombre
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        if not read_only:
+            # Solo tiene efecto en bases de datos nuevas (antes de crear tablas)
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if self.db_path != ":memory:":
+            conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+    
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Presta el cursor de escritura dentro de una transacción
+        
+        La transacción se confirma al salir del bloque y se revierte si se
+        produce una excepción, que se vuelve a lanzar.
+        
+        Yields:
+            sqlite3.Cursor: Cursor de la conexión de escritura
+        """
+        with self._write_lock:
+            cursor = self._writer.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                self._writer.rollback()
+                raise
+            else:
+                self._writer.commit()
+            finally:
+                cursor.close()
+    
+    @contextmanager
+    def maintenance(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Presta el cursor de escritura fuera de cualquier transacción
+        
+        Necesario para órdenes que SQLite no admite dentro de una transacción,
+        como VACUUM o PRAGMA incremental_vacuum.
+        
+        Yields:
+            sqlite3.Cursor: Cursor de la conexión de escritura en modo autocommit
+        """
+        with self._write_lock:
+            cursor = self._writer.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+    
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Presta un cursor de lectura del pool
+        
+        Yields:
+            sqlite3.Cursor: Cursor de una conexión de solo lectura
+        """
+        pinned = getattr(self._pinned, "conn", None)
+        if pinned is not None:
+            cursor = pinned.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+            return
+        
+        if self.max_readers == 0:
+            with self._write_lock:
+                cursor = self._writer.cursor()
+                try:
+                    yield cursor
+                finally:
+                    cursor.close()
+            return
+        
+        self._reader_slots.acquire()
+        try:
+            try:
+                conn = self._idle_readers.get_nowait()
+            except queue.Empty:
+                conn = self._open(read_only=True)
+                with self._readers_lock:
+                    self._all_readers.append(conn)
+            
+            cursor = conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+                self._idle_readers.put(conn)
+        finally:
+            self._reader_slots.release()
+    
+    def pin_reader(self) -> None:
+        """
+        Asigna al hilo actual una conexión de lectura propia
+        
+        Pensado para los hilos de un ejecutor dedicado: sus lecturas usan
+        siempre la misma conexión sin pasar por la cola del pool ni ocupar
+        los huecos de `max_readers`. La conexión se cierra con el pool.
+        """
+        if self.max_readers == 0 or getattr(self._pinned, "conn", None) is not None:
+            return
+        conn = self._open(read_only=True)
+        with self._readers_lock:
+            self._all_readers.append(conn)
+        self._pinned.conn = conn
+    
+    def close(self) -> None:
+        """
+        Cierra todas las conexiones del pool
+        """
+        if self._closed:
+            return
+        self._closed = True
+        with self._readers_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers.clear()
+        with self._write_lock:
+            self._writer.close()
@@ -9,26 +9,106 @@ Implementa una interfaz con SQLite para almacenar información persistente
 import json
 import logging
 import os
+import re
 import sqlite3
+from collections.abc import Mapping
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional, Union, Any, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Union, Any, Tuple
+
+from nova.memory import backup
+from nova.memory.connection_pool import ConnectionPool
+from nova.memory.migrations import run_migrations, table_exists
+from nova.memory.write_behind import WriteBehindQueue, WriteOperation
 
 logger = logging.getLogger('nova.memory.database')
 
+# Marcador de temas aún sin decodificar
+_UNDECODED = object()
+
+class ConversationRecord(Mapping):
+    """Conversación de solo lectura cuyos temas se decodifican al consultarlos"""
+    
+    __slots__ = ('_row', '_topics')
+    
+    def __init__(self, row: sqlite3.Row):
+        """
+        Envuelve una fila de la tabla de conversaciones sin copiarla
+        
+        Args:
+            row: Fila devuelta por SQLite
+        """
+        self._row = row
+        self._topics = _UNDECODED
+    
+    def __getitem__(self, key: str) -> Any:
+        if key == 'topics':
+            if self._topics is _UNDECODED:
+                raw = self._row['topics']
+                self._topics = json.loads(raw) if raw else raw
+            return self._topics
+        try:
+            return self._row[key]
+        except IndexError:
+            raise KeyError(key)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._row.keys())
+    
+    def __len__(self) -> int:
+        return len(self._row)
+    
+    def to_dict(self) -> Dict:
+        """
+        Convierte la conversación en un diccionario (decodificando los temas)
+        
+        Returns:
+            Dict: Mismo formato que devuelve get_recent_conversations
+        """
+        return {key: self[key] for key in self}
+
+def build_fts_query(query: str) -> str:
+    """
+    Convierte un texto libre en una consulta FTS5 segura
+    
+    Los términos se agrupan en una frase con coincidencia de prefijo en el
+    último término, lo que equivale aproximadamente a la búsqueda LIKE.
+    
+    Args:
+        query: Texto a buscar
+        
+    Returns:
+        str: Consulta MATCH, o cadena vacía si no hay términos
+    """
+    terms = re.findall(r"\w+", query, re.UNICODE)
+    if not terms:
+        return ""
+    return '"' + " ".join(terms) + '"*'
+
 class MemoryDatabase:
     """Clase para manejar la base de datos de memoria de Nova"""
     
-    def __init__(self, db_path: str = "./data/memory.db"):
+    def __init__(self, db_path: str = "./data/memory.db", max_readers: int = 4,
+                 busy_timeout: float = 5.0, write_behind: bool = False,
+                 write_batch_size: int = 100, write_flush_interval: float = 0.5):
         """
         Inicializa la conexión con la base de datos
         
         Args:
             db_path: Ruta al archivo de base de datos SQLite
+            max_readers: Número máximo de conexiones de lectura simultáneas
+            busy_timeout: Segundos de espera si la base de datos está bloqueada
+            write_behind: Si es True, las escrituras se encolan y se vuelcan por lotes
+            write_batch_size: Número máximo de escrituras por transacción
+            write_flush_interval: Segundos máximos que una escritura espera en cola
         """
         self.db_path = db_path
-        self.conn = None
-        self.cursor = None
+        self.max_readers = max_readers
+        self.busy_timeout = busy_timeout
+        self.pool = None
+        self.write_queue = None
+        self.fts_enabled = False
         
         # Crear directorio si no existe
         os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
@@ -36,18 +116,28 @@ class MemoryDatabase:
         # Inicializar la base de datos
         self._connect()
         self._create_tables()
+        self._check_fts()
+        
+        if write_behind:
+            self.write_queue = WriteBehindQueue(
+                self.pool,
+                batch_size=write_batch_size,
+                flush_interval=write_flush_interval
+            )
     
     def _connect(self) -> bool:
         """
         Establece la conexión con la base de datos
         
+        Crea un pool con una conexión de escritura y conexiones de lectura
+        independientes en modo WAL, seguro para hilos y greenlets.
+        
         Returns:
             bool: True si la conexión fue exitosa, False en caso contrario
         """
         try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.conn.row_factory = sqlite3.Row  # Para acceder a las columnas por nombre
-            self.cursor = self.conn.cursor()
+            self.pool = ConnectionPool(self.db_path, max_readers=self.max_readers,
+                                       busy_timeout=self.busy_timeout)
             logger.info(f"Conexión establecida con la base de datos: {self.db_path}")
             return True
         except sqlite3.Error as e:
@@ -56,57 +146,142 @@ class MemoryDatabase:
     
     def _create_tables(self) -> None:
         """
-        Crea las tablas necesarias si no existen
+        Crea las tablas necesarias o actualiza las existentes
+        
+        El esquema se versiona con PRAGMA user_version; las migraciones
+        pendientes se aplican en orden sobre bases de datos ya existentes.
+        """
+        try:
+            version = run_migrations(self.pool)
+            logger.info(f"Tablas creadas correctamente (esquema v{version})")
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Error al crear tablas: {str(e)}")
+    
+    def _check_fts(self) -> None:
+        """
+        Comprueba si existe el índice de texto completo (FTS5)
+        
+        El índice lo crea la migración 5; si SQLite no incluye FTS5, la
+        búsqueda sigue funcionando con LIKE.
         """
         try:
-            # Tabla de conversaciones
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS conversations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    user_message TEXT NOT NULL,
-                    nova_response TEXT NOT NULL,
-                    sentiment TEXT,
-                    topics TEXT
-                )
-            ''')
+            with self.pool.reader() as cursor:
+                self.fts_enabled = table_exists(cursor, "conversations_fts")
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo comprobar el índice de texto completo: {str(e)}")
+        if not self.fts_enabled:
+            logger.warning("Índice FTS5 no disponible, se usará búsqueda LIKE")
+    
+    @staticmethod
+    def _build_fts_query(query: str) -> str:
+        """
+        Convierte un texto libre en una consulta FTS5 segura (ver build_fts_query)
+        
+        Args:
+            query: Texto a buscar
             
-            # Tabla de información personal del usuario
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_info (
-                    key TEXT PRIMARY KEY,
-                    value TEXT NOT NULL,
-                    category TEXT NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    confidence REAL DEFAULT 1.0
-                )
-            ''')
+        Returns:
+            str: Consulta MATCH, o cadena vacía si no hay términos
+        """
+        return build_fts_query(query)
+    
+    @staticmethod
+    def _row_to_conversation(row: sqlite3.Row) -> Dict:
+        """
+        Convierte una fila de la tabla de conversaciones en diccionario
+        
+        Args:
+            row: Fila devuelta por SQLite
             
-            # Tabla de preferencias y configuración
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS preferences (
-                    key TEXT PRIMARY KEY,
-                    value TEXT NOT NULL,
-                    timestamp TEXT NOT NULL
-                )
-            ''')
+        Returns:
+            Dict: Conversación con los temas decodificados
+        """
+        conv = dict(row)
+        if conv['topics']:
+            conv['topics'] = json.loads(conv['topics'])
+        return conv
+    
+    def _write(self, operation: WriteOperation,
+               callback: Optional[Callable[[Any], None]] = None) -> Any:
+        """
+        Ejecuta una escritura, inmediata o diferida según la configuración
+        
+        Args:
+            operation: Función que ejecuta la escritura con el cursor recibido
+            callback: Función opcional llamada con el resultado tras el commit
             
-            self.conn.commit()
-            logger.info("Tablas creadas correctamente")
-        except sqlite3.Error as e:
-            logger.error(f"Error al crear tablas: {str(e)}")
+        Returns:
+            Any: Resultado de la operación, o None si quedó encolada
+        """
+        if self.write_queue is not None:
+            self.write_queue.submit(operation, callback)
+            return None
+        
+        with self.pool.writer() as cursor:
+            result = operation(cursor)
+        if callback is not None and result is not None:
+            callback(result)
+        return result
+    
+    def flush(self) -> None:
+        """
+        Espera a que las escrituras diferidas pendientes se confirmen en disco
+        """
+        if self.write_queue is not None:
+            self.write_queue.flush()
+    
+    def export_memory(self, output_dir: str, fmt: str = "jsonl",
+                      chunk_size: int = 10000, progress: bool = True) -> Dict[str, int]:
+        """
+        Exporta las conversaciones, la información del usuario y las preferencias
+        
+        Args:
+            output_dir: Directorio de destino (un archivo por tabla)
+            fmt: Formato de salida ("jsonl" o "parquet", que requiere pyarrow)
+            chunk_size: Número de filas leídas y escritas por bloque
+            progress: Si es True, muestra el progreso con tqdm
+            
+        Returns:
+            Dict[str, int]: Filas exportadas por tabla
+        """
+        self.flush()
+        return backup.export_memory(self.pool, output_dir, fmt=fmt,
+                                    chunk_size=chunk_size, progress=progress)
+    
+    def import_memory(self, input_dir: str, batch_size: int = 10000,
+                      progress: bool = True) -> Dict[str, int]:
+        """
+        Importa una exportación hecha con `export_memory`
+        
+        Las conversaciones conservan su ID y no sustituyen a las existentes;
+        la información del usuario y las preferencias sí se sobrescriben.
+        
+        Args:
+            input_dir: Directorio con los archivos exportados
+            batch_size: Número de filas por transacción
+            progress: Si es True, muestra el progreso con tqdm
+            
+        Returns:
+            Dict[str, int]: Filas leídas por tabla
+        """
+        self.flush()
+        return backup.import_memory(self.pool, input_dir, batch_size=batch_size,
+                                    progress=progress)
     
     def close(self) -> None:
         """
         Cierra la conexión con la base de datos
         """
-        if self.conn:
-            self.conn.close()
+        if self.write_queue is not None:
+            self.write_queue.close()
+        if self.pool:
+            self.pool.close()
             logger.info("Conexión con la base de datos cerrada")
     
     def save_conversation(self, user_message: str, nova_response: str, 
                          sentiment: Optional[str] = None, 
-                         topics: Optional[List[str]] = None) -> int:
+                         topics: Optional[List[str]] = None,
+                         on_saved: Optional[Callable[[int], None]] = None) -> int:
         """
         Guarda una conversación en la base de datos
         
@@ -115,21 +290,34 @@ class MemoryDatabase:
             nova_response: Respuesta de Nova
             sentiment: Sentimiento detectado (opcional)
             topics: Lista de temas detectados (opcional)
+            on_saved: Función llamada con el ID tras confirmar la escritura (opcional)
             
         Returns:
-            int: ID de la conversación guardada, o -1 si hay error
+            int: ID de la conversación guardada, 0 si la escritura quedó
+                diferida, o -1 si hay error
         """
         try:
             timestamp = datetime.now().isoformat()
             topics_json = json.dumps(topics) if topics else None
             
-            self.cursor.execute('''
-                INSERT INTO conversations (timestamp, user_message, nova_response, sentiment, topics)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (timestamp, user_message, nova_response, sentiment, topics_json))
+            def insert(cursor: sqlite3.Cursor) -> int:
+                cursor.execute('''
+                    INSERT INTO conversations (timestamp, user_message, nova_response, sentiment, topics)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (timestamp, user_message, nova_response, sentiment, topics_json))
+                conversation_id = cursor.lastrowid
+                if topics:
+                    cursor.executemany('''
+                        INSERT OR IGNORE INTO conversation_topics (topic, conversation_id)
+                        VALUES (?, ?)
+                    ''', [(topic, conversation_id) for topic in set(topics)])
+                return conversation_id
+            
+            conversation_id = self._write(insert, on_saved)
+            if conversation_id is None:
+                logger.debug("Conversación encolada para escritura diferida")
+                return 0
             
-            self.conn.commit()
-            conversation_id = self.cursor.lastrowid
             logger.debug(f"Conversación guardada con ID: {conversation_id}")
             return conversation_id
         except sqlite3.Error as e:
@@ -147,25 +335,176 @@ class MemoryDatabase:
             List[Dict]: Lista de conversaciones recientes
         """
         try:
-            self.cursor.execute('''
+            with self.pool.reader() as cursor:
+                cursor.execute('''
+                    SELECT * FROM conversations
+                    ORDER BY timestamp DESC
+                    LIMIT ?
+                ''', (limit,))
+                
+                rows = cursor.fetchall()
+                return [self._row_to_conversation(row) for row in rows]
+        except sqlite3.Error as e:
+            logger.error(f"Error al obtener conversaciones recientes: {str(e)}")
+            return []
+    
+    def iter_conversations(self, before_id: Optional[int] = None,
+                           query: Optional[str] = None,
+                           chunk_size: int = 500) -> Iterator[ConversationRecord]:
+        """
+        Recorre las conversaciones de la más reciente a la más antigua
+        
+        Usa paginación por clave (`id < último id leído`) en bloques de
+        `chunk_size` filas: cada bloque es una consulta indexada independiente
+        y la conexión de lectura se devuelve al pool antes de entregar las
+        filas, así que el recorrido usa memoria constante y no ocupa el pool
+        aunque el consumidor se detenga a mitad.
+        
+        Args:
+            before_id: Empezar por las conversaciones con ID menor (opcional)
+            query: Texto que deben contener las conversaciones (opcional)
+            chunk_size: Número de filas leídas en cada consulta
+            
+        Yields:
+            ConversationRecord: Conversación con los temas decodificados bajo demanda
+        """
+        if query is not None:
+            fts_query = self._build_fts_query(query) if self.fts_enabled else ""
+            if fts_query:
+                sql = '''
+                    SELECT c.* FROM conversations_fts
+                    JOIN conversations c ON c.id = conversations_fts.rowid
+                    WHERE conversations_fts MATCH ? AND conversations_fts.rowid < ?
+                    ORDER BY conversations_fts.rowid DESC
+                    LIMIT ?
+                '''
+                params: Tuple = (fts_query,)
+            else:
+                search_pattern = f"%{query}%"
+                sql = '''
+                    SELECT * FROM conversations
+                    WHERE (user_message LIKE ? OR nova_response LIKE ?) AND id < ?
+                    ORDER BY id DESC
+                    LIMIT ?
+                '''
+                params = (search_pattern, search_pattern)
+        else:
+            sql = '''
                 SELECT * FROM conversations
-                ORDER BY timestamp DESC
+                WHERE id < ?
+                ORDER BY id DESC
                 LIMIT ?
-            ''', (limit,))
-            
-            rows = self.cursor.fetchall()
-            conversations = []
+            '''
+            params = ()
+        
+        last_id = before_id if before_id is not None else (1 << 63) - 1
+        while True:
+            try:
+                with self.pool.reader() as cursor:
+                    cursor.execute(sql, params + (last_id, chunk_size))
+                    rows = cursor.fetchmany(chunk_size)
+            except sqlite3.Error as e:
+                logger.error(f"Error al recorrer conversaciones: {str(e)}")
+                return
             
             for row in rows:
-                conv = dict(row)
-                # Convertir topics de JSON a lista si existe
-                if conv['topics']:
-                    conv['topics'] = json.loads(conv['topics'])
-                conversations.append(conv)
+                yield ConversationRecord(row)
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1]['id']
+    
+    def get_conversations_page(self, limit: int = 50, before_id: Optional[int] = None,
+                               query: Optional[str] = None) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Obtiene una página de conversaciones de la más reciente a la más antigua
+        
+        Args:
+            limit: Número máximo de conversaciones de la página
+            before_id: Cursor devuelto por la página anterior (opcional)
+            query: Texto que deben contener las conversaciones (opcional)
             
-            return conversations
+        Returns:
+            Tuple[List[Dict], Optional[int]]: Conversaciones de la página y el
+                cursor de la siguiente, o None si no hay más
+        """
+        records = list(islice(
+            self.iter_conversations(before_id=before_id, query=query, chunk_size=limit + 1),
+            limit + 1
+        ))
+        next_before_id = records[limit - 1]['id'] if len(records) > limit else None
+        return [record.to_dict() for record in records[:limit]], next_before_id
+    
+    def get_conversations_by_topics(self, topics: List[str], limit: int = 10) -> List[Dict]:
+        """
+        Obtiene las conversaciones más recientes que tratan alguno de los temas
+        
+        Cada tema lee solo sus `limit` conversaciones más recientes recorriendo
+        hacia atrás la clave primaria (topic, conversation_id) de
+        `conversation_topics`, sin ordenar todas las coincidencias. La lista
+        resultante (como mucho `len(topics) * limit` IDs) se recorre en orden
+        de ID descendente, así que tampoco hace falta un B-tree temporal.
+        
+        Args:
+            topics: Temas a buscar
+            limit: Número máximo de conversaciones
+            
+        Returns:
+            List[Dict]: Conversaciones sin duplicados, de la más reciente a la más antigua
+        """
+        topics = list(dict.fromkeys(topics))
+        if not topics or limit <= 0:
+            return []
+        
+        try:
+            per_topic = " UNION ALL ".join('''
+                        SELECT * FROM (
+                            SELECT conversation_id FROM conversation_topics
+                            WHERE topic = ?
+                            ORDER BY conversation_id DESC
+                            LIMIT ?
+                        )''' for _ in topics)
+            params: List[Any] = []
+            for topic in topics:
+                params.extend((topic, limit))
+            with self.pool.reader() as cursor:
+                cursor.execute(f'''
+                    SELECT c.* FROM conversations c
+                    WHERE c.id IN ({per_topic}
+                    )
+                    ORDER BY c.id DESC
+                    LIMIT ?
+                ''', params + [limit])
+                
+                rows = cursor.fetchall()
+                return [self._row_to_conversation(row) for row in rows]
         except sqlite3.Error as e:
-            logger.error(f"Error al obtener conversaciones recientes: {str(e)}")
+            logger.error(f"Error al buscar conversaciones por tema: {str(e)}")
+            return []
+    
+    def get_conversations_by_ids(self, conversation_ids: List[int]) -> List[Dict]:
+        """
+        Obtiene varias conversaciones por su ID conservando el orden recibido
+        
+        Args:
+            conversation_ids: IDs de las conversaciones
+            
+        Returns:
+            List[Dict]: Conversaciones encontradas, en el mismo orden que los IDs
+        """
+        if not conversation_ids:
+            return []
+        
+        try:
+            placeholders = ", ".join("?" for _ in conversation_ids)
+            with self.pool.reader() as cursor:
+                cursor.execute(f'''
+                    SELECT * FROM conversations WHERE id IN ({placeholders})
+                ''', list(conversation_ids))
+                
+                rows = {row['id']: self._row_to_conversation(row) for row in cursor.fetchall()}
+                return [rows[cid] for cid in conversation_ids if cid in rows]
+        except sqlite3.Error as e:
+            logger.error(f"Error al obtener conversaciones por ID: {str(e)}")
             return []
     
     def save_user_info(self, key: str, value: str, category: str, 
@@ -185,13 +524,15 @@ class MemoryDatabase:
         try:
             timestamp = datetime.now().isoformat()
             
-            # Intentar actualizar si la clave ya existe
-            self.cursor.execute('''
-                INSERT OR REPLACE INTO user_info (key, value, category, timestamp, confidence)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (key, value, category, timestamp, confidence))
+            def upsert(cursor: sqlite3.Cursor) -> bool:
+                # Intentar actualizar si la clave ya existe
+                cursor.execute('''
+                    INSERT OR REPLACE INTO user_info (key, value, category, timestamp, confidence)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (key, value, category, timestamp, confidence))
+                return True
             
-            self.conn.commit()
+            self._write(upsert)
             logger.debug(f"Información de usuario guardada: {key}={value}")
             return True
         except sqlite3.Error as e:
@@ -211,28 +552,29 @@ class MemoryDatabase:
             Union[Dict, List[Dict]]: Información del usuario
         """
         try:
-            if key:
-                # Buscar por clave específica
-                self.cursor.execute('''
-                    SELECT * FROM user_info WHERE key = ?
-                ''', (key,))
-                row = self.cursor.fetchone()
-                return dict(row) if row else {}
-            elif category:
-                # Buscar por categoría
-                self.cursor.execute('''
-                    SELECT * FROM user_info WHERE category = ?
-                    ORDER BY timestamp DESC
-                ''', (category,))
-            else:
-                # Obtener toda la información
-                self.cursor.execute('''
-                    SELECT * FROM user_info
-                    ORDER BY category, key
-                ''')
-            
-            rows = self.cursor.fetchall()
-            return [dict(row) for row in rows]
+            with self.pool.reader() as cursor:
+                if key:
+                    # Buscar por clave específica
+                    cursor.execute('''
+                        SELECT * FROM user_info WHERE key = ?
+                    ''', (key,))
+                    row = cursor.fetchone()
+                    return dict(row) if row else {}
+                elif category:
+                    # Buscar por categoría
+                    cursor.execute('''
+                        SELECT * FROM user_info WHERE category = ?
+                        ORDER BY timestamp DESC
+                    ''', (category,))
+                else:
+                    # Obtener toda la información
+                    cursor.execute('''
+                        SELECT * FROM user_info
+                        ORDER BY category, key
+                    ''')
+                
+                rows = cursor.fetchall()
+                return [dict(row) for row in rows]
         except sqlite3.Error as e:
             logger.error(f"Error al obtener información de usuario: {str(e)}")
             return [] if key is None else {}
@@ -251,12 +593,14 @@ class MemoryDatabase:
         try:
             timestamp = datetime.now().isoformat()
             
-            self.cursor.execute('''
-                INSERT OR REPLACE INTO preferences (key, value, timestamp)
-                VALUES (?, ?, ?)
-            ''', (key, value, timestamp))
+            def upsert(cursor: sqlite3.Cursor) -> bool:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO preferences (key, value, timestamp)
+                    VALUES (?, ?, ?)
+                ''', (key, value, timestamp))
+                return True
             
-            self.conn.commit()
+            self._write(upsert)
             logger.debug(f"Preferencia guardada: {key}={value}")
             return True
         except sqlite3.Error as e:
@@ -274,12 +618,13 @@ class MemoryDatabase:
             str: Valor de la preferencia o cadena vacía si no existe
         """
         try:
-            self.cursor.execute('''
-                SELECT value FROM preferences WHERE key = ?
-            ''', (key,))
-            
-            row = self.cursor.fetchone()
-            return row['value'] if row else ""
+            with self.pool.reader() as cursor:
+                cursor.execute('''
+                    SELECT value FROM preferences WHERE key = ?
+                ''', (key,))
+                
+                row = cursor.fetchone()
+                return row['value'] if row else ""
         except sqlite3.Error as e:
             logger.error(f"Error al obtener preferencia: {str(e)}")
             return ""
@@ -292,12 +637,13 @@ class MemoryDatabase:
             Dict[str, str]: Diccionario con todas las preferencias
         """
         try:
-            self.cursor.execute('''
-                SELECT key, value FROM preferences
-            ''')
-            
-            rows = self.cursor.fetchall()
-            return {row['key']: row['value'] for row in rows}
+            with self.pool.reader() as cursor:
+                cursor.execute('''
+                    SELECT key, value FROM preferences
+                ''')
+                
+                rows = cursor.fetchall()
+                return {row['key']: row['value'] for row in rows}
         except sqlite3.Error as e:
             logger.error(f"Error al obtener todas las preferencias: {str(e)}")
             return {}
@@ -306,6 +652,40 @@ class MemoryDatabase:
         """
         Busca conversaciones que contengan el texto especificado
         
+        Usa el índice FTS5 ordenado por relevancia (bm25) cuando está
+        disponible y, si no, recurre a una búsqueda LIKE.
+        
+        Args:
+            query: Texto a buscar
+            limit: Número máximo de resultados
+            
+        Returns:
+            List[Dict]: Lista de conversaciones que coinciden con la búsqueda
+        """
+        if self.fts_enabled:
+            fts_query = self._build_fts_query(query)
+            if fts_query:
+                try:
+                    with self.pool.reader() as cursor:
+                        cursor.execute('''
+                            SELECT c.* FROM conversations_fts
+                            JOIN conversations c ON c.id = conversations_fts.rowid
+                            WHERE conversations_fts MATCH ?
+                            ORDER BY bm25(conversations_fts), c.id DESC
+                            LIMIT ?
+                        ''', (fts_query, limit))
+                        
+                        rows = cursor.fetchall()
+                        return [self._row_to_conversation(row) for row in rows]
+                except sqlite3.Error as e:
+                    logger.warning(f"Error en búsqueda FTS5, se usará LIKE: {str(e)}")
+        
+        return self._search_conversations_like(query, limit)
+    
+    def _search_conversations_like(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Busca conversaciones con LIKE (recorrido completo de la tabla)
+        
         Args:
             query: Texto a buscar
             limit: Número máximo de resultados
@@ -316,23 +696,16 @@ class MemoryDatabase:
         try:
             search_pattern = f"%{query}%"
             
-            self.cursor.execute('''
-                SELECT * FROM conversations
-                WHERE user_message LIKE ? OR nova_response LIKE ?
-                ORDER BY timestamp DESC
-                LIMIT ?
-            ''', (search_pattern, search_pattern, limit))
-            
-            rows = self.cursor.fetchall()
-            conversations = []
-            
-            for row in rows:
-                conv = dict(row)
-                if conv['topics']:
-                    conv['topics'] = json.loads(conv['topics'])
-                conversations.append(conv)
-            
-            return conversations
+            with self.pool.reader() as cursor:
+                cursor.execute('''
+                    SELECT * FROM conversations
+                    WHERE user_message LIKE ? OR nova_response LIKE ?
+                    ORDER BY timestamp DESC
+                    LIMIT ?
+                ''', (search_pattern, search_pattern, limit))
+                
+                rows = cursor.fetchall()
+                return [self._row_to_conversation(row) for row in rows]
         except sqlite3.Error as e:
             logger.error(f"Error al buscar conversaciones: {str(e)}")
             return []
\ No newline at end of file
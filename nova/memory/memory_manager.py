@@ -7,33 +7,104 @@ Implementa la lógica para recordar información del usuario y conversaciones pa
 """
 
 import logging
-import re
-from datetime import datetime
+import sqlite3
+import threading
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Union, Any, Tuple
 
+from nova.memory.archive import ConversationArchive
 from nova.memory.database import MemoryDatabase
+from nova.memory.relevance import RelevanceScorer, estimate_tokens
+from nova.memory.text_analyzer import TextAnalyzer
+from nova.memory.vector_index import Embedder, VectorIndex
 
 logger = logging.getLogger('nova.memory.memory_manager')
 
 class MemoryManager:
     """Clase para gestionar la memoria emocional de Nova"""
     
-    def __init__(self, db_path: str = "./data/memory.db"):
+    def __init__(self, db_path: str = "./data/memory.db", write_behind: bool = False,
+                 semantic_memory: bool = True, embedder: Optional[Embedder] = None,
+                 analyzer_config: Optional[str] = None,
+                 retention_days: Optional[int] = None,
+                 analyzer: Optional[TextAnalyzer] = None,
+                 context_token_budget: Optional[int] = 400,
+                 scorer: Optional[RelevanceScorer] = None):
         """
         Inicializa el gestor de memoria
         
         Args:
             db_path: Ruta al archivo de base de datos SQLite
+            write_behind: Si es True, las escrituras se vuelcan a disco en segundo
+                plano y no añaden latencia a cada turno
+            semantic_memory: Si es True, se mantiene un índice de vectores para
+                recordar conversaciones parecidas aunque no compartan temas
+            embedder: Generador de embeddings (por defecto, hashing local)
+            analyzer_config: Ruta a un JSON con las palabras clave de sentimiento,
+                temas y patrones de datos (opcional)
+            retention_days: Si se indica, al iniciar se archivan en segundo
+                plano las conversaciones con más de estos días (opcional)
+            analyzer: Analizador ya compilado para compartirlo entre varios
+                gestores (opcional, tiene prioridad sobre analyzer_config)
+            context_token_budget: Tokens aproximados que pueden ocupar los
+                recuerdos en el prompt (None = sin límite)
+            scorer: Puntuación de relevancia de los recuerdos (opcional)
         """
-        self.db = MemoryDatabase(db_path)
+        self.db = MemoryDatabase(db_path, write_behind=write_behind)
+        self.vector_index = None
+        if semantic_memory:
+            self.vector_index = VectorIndex(self.db.pool, embedder=embedder)
+        # Conversaciones antiguas: resúmenes por día y tema y texto comprimido
+        self.archive = ConversationArchive(self.db.pool)
+        self.retention_days = retention_days
+        # Selección de los recuerdos que entran en el prompt
+        self.scorer = scorer or RelevanceScorer()
+        self.context_token_budget = context_token_budget
+        # Analizador precompilado de sentimiento, temas y datos personales
+        if analyzer is not None:
+            self.analyzer = analyzer
+        elif analyzer_config:
+            self.analyzer = TextAnalyzer.from_config(analyzer_config)
+        else:
+            self.analyzer = TextAnalyzer()
         self.categories = {
             "personal": ["nombre", "edad", "cumpleaños", "trabajo", "hobbies"],
             "preferencias": ["comida", "música", "películas", "libros", "colores"],
             "relación": ["aniversario", "lugares", "momentos", "regalos", "planes"],
             "emocional": ["estado_ánimo", "preocupaciones", "alegrías", "miedos", "sueños"]
         }
+        
+        # Caché del perfil del usuario: se carga una vez y se actualiza al escribir
+        self._profile_lock = threading.RLock()
+        self._profile_rows: Optional[Dict[str, Dict]] = None
+        self._profile_summary: Dict[str, Dict[str, str]] = {}
+        self._profile_block: Optional[str] = None
+        
+        # Los embeddings que falten se calculan sin retrasar la apertura
+        self._closing = threading.Event()
+        self._backfill_thread: Optional[threading.Thread] = None
+        if self.vector_index is not None:
+            self._backfill_thread = threading.Thread(
+                target=self._backfill_vectors, name="nova-memory-backfill", daemon=True)
+            self._backfill_thread.start()
+        
+        # La compactación inicial no retrasa el arranque
+        self._compaction_thread: Optional[threading.Thread] = None
+        if retention_days:
+            self._compaction_thread = threading.Thread(
+                target=self.compact_memory, name="nova-memory-compaction", daemon=True)
+            self._compaction_thread.start()
         logger.info("Gestor de memoria inicializado")
     
+    def _backfill_vectors(self) -> None:
+        """
+        Indexa en segundo plano las conversaciones que aún no tienen embedding
+        """
+        try:
+            self.vector_index.backfill(stop=self._closing)
+        except sqlite3.Error as e:
+            logger.error(f"Error al calcular los embeddings pendientes: {str(e)}")
+    
     def save_conversation(self, user_message: str, nova_response: str) -> int:
         """
         Guarda una conversación y extrae información relevante
@@ -51,12 +122,19 @@ class MemoryManager:
         # Extraer temas de la conversación
         topics = self._extract_topics(user_message)
         
+        # Indexar la conversación en la memoria semántica una vez guardada
+        on_saved = None
+        if self.vector_index is not None:
+            def on_saved(saved_id: int) -> None:
+                self.vector_index.add(saved_id, user_message, nova_response)
+        
         # Guardar la conversación
         conversation_id = self.db.save_conversation(
             user_message=user_message,
             nova_response=nova_response,
             sentiment=sentiment,
-            topics=topics
+            topics=topics,
+            on_saved=on_saved
         )
         
         # Extraer y guardar información del usuario
@@ -74,24 +152,7 @@ class MemoryManager:
         Returns:
             str: Sentimiento detectado (positivo, negativo, neutral)
         """
-        # Palabras positivas y negativas en español
-        positive_words = ["feliz", "contento", "alegre", "genial", "excelente", "bueno", "increíble", 
-                         "maravilloso", "fantástico", "encantado", "amo", "adoro", "me gusta"]
-        
-        negative_words = ["triste", "enojado", "molesto", "terrible", "horrible", "malo", "pésimo", 
-                         "fatal", "odio", "detesto", "no me gusta", "preocupado"]
-        
-        # Contar ocurrencias
-        positive_count = sum(1 for word in positive_words if word in text.lower())
-        negative_count = sum(1 for word in negative_words if word in text.lower())
-        
-        # Determinar sentimiento
-        if positive_count > negative_count:
-            return "positivo"
-        elif negative_count > positive_count:
-            return "negativo"
-        else:
-            return "neutral"
+        return self.analyzer.analyze(text).sentiment
     
     def _extract_topics(self, text: str) -> List[str]:
         """
@@ -103,26 +164,7 @@ class MemoryManager:
         Returns:
             List[str]: Lista de temas detectados
         """
-        # Temas comunes en español
-        topic_keywords = {
-            "trabajo": ["trabajo", "empleo", "oficina", "jefe", "compañeros", "proyecto"],
-            "familia": ["familia", "padres", "hermanos", "hijos", "pareja"],
-            "salud": ["salud", "enfermedad", "médico", "hospital", "dolor"],
-            "entretenimiento": ["película", "serie", "música", "concierto", "juego", "videojuego"],
-            "comida": ["comida", "restaurante", "cocinar", "receta", "cena", "almuerzo"],
-            "viajes": ["viaje", "vacaciones", "hotel", "playa", "montaña", "turismo"],
-            "tecnología": ["tecnología", "computadora", "teléfono", "app", "software", "internet"],
-            "educación": ["estudios", "universidad", "escuela", "aprender", "curso", "profesor"]
-        }
-        
-        detected_topics = []
-        text_lower = text.lower()
-        
-        for topic, keywords in topic_keywords.items():
-            if any(keyword in text_lower for keyword in keywords):
-                detected_topics.append(topic)
-        
-        return detected_topics
+        return list(self.analyzer.analyze(text).topics)
     
     def _extract_and_save_user_info(self, text: str) -> None:
         """
@@ -131,35 +173,9 @@ class MemoryManager:
         Args:
             text: Texto del usuario a analizar
         """
-        # Patrones para extraer información personal
-        patterns = {
-            # Formato: (categoría, clave, patrón regex)
-            "personal": [
-                ("nombre", r"me llamo ([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)"),
-                ("edad", r"tengo (\d+) años"),
-                ("cumpleaños", r"mi cumpleaños es (el )?([0-9]{1,2} de [a-zA-Z]+)"),
-                ("trabajo", r"trabajo (en|como) ([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)"),
-            ],
-            "preferencias": [
-                ("comida", r"mi comida favorita es ([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)"),
-                ("música", r"me gusta (escuchar|la música) ([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)"),
-                ("color", r"mi color favorito es (el )?([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)"),
-            ],
-            "emocional": [
-                ("estado_ánimo", r"me siento ([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)"),
-                ("preocupaciones", r"estoy preocupado por ([A-Za-zÁáÉéÍíÓóÚúÑñ\s,.]+)"),
-            ]
-        }
-        
-        # Buscar coincidencias y guardar información
-        for category, pattern_list in patterns.items():
-            for key, pattern in pattern_list:
-                matches = re.search(pattern, text, re.IGNORECASE)
-                if matches:
-                    # El último grupo de captura contiene la información
-                    value = matches.group(matches.lastindex).strip()
-                    self.db.save_user_info(key, value, category)
-                    logger.debug(f"Información extraída: {category}.{key} = {value}")
+        for category, key, value in self.analyzer.analyze(text).facts:
+            self.save_user_info(key, value, category)
+            logger.debug(f"Información extraída: {category}.{key} = {value}")
     
     def get_recent_conversations(self, limit: int = 5) -> List[Dict]:
         """
@@ -173,28 +189,112 @@ class MemoryManager:
         """
         return self.db.get_recent_conversations(limit)
     
-    def get_user_info_summary(self) -> Dict[str, Dict[str, str]]:
+    def get_conversation_history_page(self, limit: int = 50, before_id: Optional[int] = None,
+                                      query: Optional[str] = None) -> Tuple[List[Dict], Optional[int]]:
         """
-        Obtiene un resumen de la información del usuario organizada por categorías
+        Obtiene una página del historial guardado, de lo más reciente a lo más antiguo
+        
+        Args:
+            limit: Número máximo de conversaciones de la página
+            before_id: Cursor devuelto por la página anterior (opcional)
+            query: Texto que deben contener las conversaciones (opcional)
+            
+        Returns:
+            Tuple[List[Dict], Optional[int]]: Conversaciones y cursor de la
+                página siguiente (None si no hay más)
+        """
+        return self.db.get_conversations_page(limit=limit, before_id=before_id, query=query)
+    
+    def _ensure_profile(self) -> Dict[str, Dict]:
+        """
+        Carga el perfil del usuario en la caché si aún no está cargado
         
         Returns:
-            Dict[str, Dict[str, str]]: Información del usuario por categorías
+            Dict[str, Dict]: Filas de información del usuario indexadas por clave
         """
-        all_info = self.db.get_user_info()
+        with self._profile_lock:
+            if self._profile_rows is None:
+                all_info = self.db.get_user_info()
+                
+                # Organizar por categorías
+                self._profile_rows = {}
+                self._profile_summary = {}
+                for info in all_info:
+                    self._profile_rows[info['key']] = info
+                    self._profile_summary.setdefault(info['category'], {})[info['key']] = info['value']
+                self._profile_block = None
+                logger.debug(f"Perfil del usuario cargado en caché ({len(all_info)} entradas)")
+            return self._profile_rows
+    
+    def save_user_info(self, key: str, value: str, category: str,
+                       confidence: float = 1.0) -> bool:
+        """
+        Guarda información del usuario y actualiza la caché del perfil
         
-        # Organizar por categorías
-        summary = {}
-        for info in all_info:
-            category = info['category']
-            key = info['key']
-            value = info['value']
+        Args:
+            key: Clave de la información (ej: 'nombre', 'comida')
+            value: Valor asociado
+            category: Categoría de la información (ej: 'personal')
+            confidence: Nivel de confianza de la información (0.0 a 1.0)
             
-            if category not in summary:
-                summary[category] = {}
+        Returns:
+            bool: True si se guardó correctamente, False en caso contrario
+        """
+        if not self.db.save_user_info(key, value, category, confidence):
+            return False
+        
+        with self._profile_lock:
+            rows = self._ensure_profile()
+            previous = rows.get(key)
+            if previous and previous['category'] != category:
+                # La clave es única: si cambia de categoría, se quita de la anterior
+                old_items = self._profile_summary.get(previous['category'], {})
+                old_items.pop(key, None)
+                if not old_items:
+                    self._profile_summary.pop(previous['category'], None)
             
-            summary[category][key] = value
+            rows[key] = {
+                'key': key,
+                'value': value,
+                'category': category,
+                'timestamp': datetime.now().isoformat(),
+                'confidence': confidence
+            }
+            self._profile_summary.setdefault(category, {})[key] = value
+            self._profile_block = None
+        return True
+    
+    def get_user_info_summary(self) -> Dict[str, Dict[str, str]]:
+        """
+        Obtiene un resumen de la información del usuario organizada por categorías
         
-        return summary
+        Returns:
+            Dict[str, Dict[str, str]]: Información del usuario por categorías
+        """
+        with self._profile_lock:
+            self._ensure_profile()
+            return {category: dict(items) for category, items in self._profile_summary.items()}
+    
+    def _get_profile_block(self) -> str:
+        """
+        Obtiene el bloque de texto del perfil para el prompt, ya renderizado
+        
+        Returns:
+            str: Bloque "Información sobre el usuario", o cadena vacía si no hay datos
+        """
+        with self._profile_lock:
+            self._ensure_profile()
+            if self._profile_block is None:
+                lines = []
+                if self._profile_summary:
+                    lines.append("\nInformación sobre el usuario:")
+                    for category, items in self._profile_summary.items():
+                        if items:  # Solo incluir categorías con información
+                            lines.append(f"- {category.capitalize()}:")
+                            for key, value in items.items():
+                                lines.append(f"  * {key}: {value}")
+                self._profile_block = "\n".join(lines)
+            return self._profile_block
     
     def search_memory(self, query: str) -> Dict[str, List]:
         """
@@ -206,69 +306,205 @@ class MemoryManager:
         Returns:
             Dict[str, List]: Resultados de la búsqueda por categoría
         """
-        # Buscar en conversaciones
-        conversations = self.db.search_conversations(query)
+        # Buscar en conversaciones y, si no hay suficientes, en el archivo
+        limit = 10
+        conversations = self.db.search_conversations(query, limit=limit)
+        if len(conversations) < limit:
+            conversations += self.archive.search(query, limit=limit - len(conversations))
         
-        # Buscar en información de usuario
-        all_info = self.db.get_user_info()
+        # Buscar en información de usuario (desde la caché del perfil)
+        query_lower = query.lower()
+        with self._profile_lock:
+            all_info = list(self._ensure_profile().values())
         matching_info = []
         
         for info in all_info:
-            if query.lower() in info['value'].lower() or query.lower() in info['key'].lower():
-                matching_info.append(info)
+            if query_lower in info['value'].lower() or query_lower in info['key'].lower():
+                matching_info.append(dict(info))
         
         return {
             "conversations": conversations,
             "user_info": matching_info
         }
     
-    def get_memory_for_context(self, user_message: str, max_items: int = 3) -> str:
+    def search_similar_conversations(self, text: str, limit: int = 3,
+                                     min_score: float = 0.2) -> List[Dict]:
+        """
+        Busca conversaciones semánticamente parecidas a un texto
+        
+        Args:
+            text: Texto de referencia
+            limit: Número máximo de conversaciones
+            min_score: Similitud mínima (coseno) para considerar una conversación
+            
+        Returns:
+            List[Dict]: Conversaciones ordenadas de mayor a menor similitud
+        """
+        return [conv for conv, _ in self._search_similar_scored(text, limit, min_score)]
+    
+    def _search_similar_scored(self, text: str, limit: int,
+                               min_score: float) -> List[Tuple[Dict, float]]:
+        """
+        Busca conversaciones parecidas a un texto junto con su similitud
+        
+        Args:
+            text: Texto de referencia
+            limit: Número máximo de conversaciones
+            min_score: Similitud mínima (coseno) para considerar una conversación
+            
+        Returns:
+            List[Tuple[Dict, float]]: Pares (conversación, similitud), de mayor a menor
+        """
+        if self.vector_index is None:
+            return []
+        
+        matches = self.vector_index.search(text, k=limit, min_score=min_score)
+        match_ids = [cid for cid, _ in matches]
+        found = {conv['id']: conv for conv in self.db.get_conversations_by_ids(match_ids)}
+        
+        # Los embeddings se conservan al archivar: recuperar el texto del archivo
+        missing_ids = [cid for cid in match_ids if cid not in found]
+        for conv in self.archive.get_conversations(missing_ids):
+            found[conv['id']] = conv
+        
+        return [(found[cid], score) for cid, score in matches if cid in found]
+    
+    @staticmethod
+    def _conversation_tokens(conv: Dict) -> int:
+        """
+        Estima los tokens que ocupa una conversación en el contexto
+        
+        Args:
+            conv: Conversación recordada
+            
+        Returns:
+            int: Tokens aproximados (texto y prefijos "- Usuario:"/"- Nova:")
+        """
+        return estimate_tokens(conv['user_message']) + estimate_tokens(conv['nova_response']) + 6
+    
+    def get_memory_for_context(self, user_message: str, max_items: int = 3,
+                               token_budget: Optional[int] = None) -> str:
         """
         Genera un contexto de memoria relevante para la conversación actual
         
+        Se reúne un conjunto amplio de candidatas (parecidas según la memoria
+        semántica y recientes que comparten tema), se puntúan con el
+        RelevanceScorer y solo las mejores que caben en el presupuesto de
+        tokens entran en el prompt. Lo que sobre del presupuesto se dedica a
+        los resúmenes de conversaciones archivadas.
+        
         Args:
             user_message: Mensaje actual del usuario
             max_items: Número máximo de elementos de memoria a incluir
+            token_budget: Tokens aproximados para los recuerdos (por defecto,
+                context_token_budget; el perfil del usuario no cuenta)
             
         Returns:
             str: Contexto de memoria formateado para incluir en el prompt
         """
         context_parts = []
+        budget = token_budget if token_budget is not None else self.context_token_budget
+        remaining_tokens = float('inf') if budget is None else budget
         
         # Extraer temas del mensaje actual
         current_topics = self._extract_topics(user_message)
         
-        # Buscar conversaciones relacionadas con los temas actuales
+        # Candidatas: varias veces más de las que caben, para poder elegir
+        pool_size = max_items * 4
+        similar = self._search_similar_scored(user_message, limit=pool_size, min_score=0.2)
+        similarities = {conv['id']: score for conv, score in similar}
+        candidates = [conv for conv, _ in similar]
+        candidates += self.db.get_conversations_by_topics(current_topics, limit=pool_size)
+        
+        # Eliminar duplicados conservando el orden
+        unique_candidates = []
+        seen_ids = set()
+        for conv in candidates:
+            if conv['id'] not in seen_ids:
+                seen_ids.add(conv['id'])
+                unique_candidates.append(conv)
+        
+        # Quedarse con las mejor puntuadas que caben en el presupuesto
         related_conversations = []
-        for topic in current_topics:
-            topic_convs = self.db.search_conversations(topic, limit=2)
-            related_conversations.extend(topic_convs)
+        if unique_candidates:
+            scores = self.scorer.score(unique_candidates, current_topics, similarities)
+            related_conversations = self.scorer.top_k(
+                unique_candidates, scores, max_items, token_budget=budget,
+                cost=self._conversation_tokens
+            )
         
-        # Limitar a las más recientes si hay demasiadas
         if related_conversations:
-            related_conversations = related_conversations[:max_items]
             context_parts.append("Conversaciones previas relacionadas:")
             for conv in related_conversations:
                 context_parts.append(f"- Usuario: {conv['user_message']}")
                 context_parts.append(f"- Nova: {conv['nova_response']}")
+                remaining_tokens -= self._conversation_tokens(conv)
+        
+        # Completar con los resúmenes de conversaciones ya archivadas
+        remaining = max_items - len(related_conversations)
+        if remaining > 0 and remaining_tokens > 0:
+            summary_lines = []
+            for summary in self.archive.get_summaries(current_topics, limit=remaining):
+                line = (f"- {summary['day']} ({summary['topic']}, "
+                        f"{summary['conversation_count']} conversaciones, "
+                        f"{summary['positive_count']} positivas, "
+                        f"{summary['negative_count']} negativas): "
+                        f"{' | '.join(summary['digest'])}")
+                tokens = estimate_tokens(line)
+                if tokens > remaining_tokens:
+                    continue
+                remaining_tokens -= tokens
+                summary_lines.append(line)
+            if summary_lines:
+                context_parts.append("Resúmenes de conversaciones antiguas:")
+                context_parts.extend(summary_lines)
         
-        # Obtener información relevante del usuario
-        user_info = self.get_user_info_summary()
-        if user_info:
-            context_parts.append("\nInformación sobre el usuario:")
-            for category, items in user_info.items():
-                if items:  # Solo incluir categorías con información
-                    context_parts.append(f"- {category.capitalize()}:")
-                    for key, value in items.items():
-                        context_parts.append(f"  * {key}: {value}")
+        # Obtener información relevante del usuario (bloque cacheado)
+        profile_block = self._get_profile_block()
+        if profile_block:
+            context_parts.append(profile_block)
         
         # Unir todo el contexto
         memory_context = "\n".join(context_parts)
         
         return memory_context
     
+    def compact_memory(self, older_than_days: Optional[int] = None) -> int:
+        """
+        Archiva las conversaciones antiguas para mantener pequeña la tabla principal
+        
+        Las conversaciones se resumen por día y tema, su texto se guarda
+        comprimido y sigue disponible para la búsqueda y la memoria semántica.
+        
+        Args:
+            older_than_days: Antigüedad mínima en días (por defecto, retention_days)
+            
+        Returns:
+            int: Número de conversaciones archivadas
+        """
+        days = older_than_days if older_than_days is not None else self.retention_days
+        if not days:
+            return 0
+        
+        # Las escrituras diferidas pendientes también deben poder archivarse
+        self.db.flush()
+        return self.archive.compact(datetime.now() - timedelta(days=days))
+    
+    def flush(self) -> None:
+        """
+        Garantiza que las escrituras diferidas pendientes estén en disco
+        """
+        self.db.flush()
+    
     def close(self) -> None:
         """
         Cierra la conexión con la base de datos
         """
+        self._closing.set()
+        if self._backfill_thread is not None:
+            self._backfill_thread.join()
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+        if self.vector_index is not None:
+            self.vector_index.close()
         self.db.close()
\ No newline at end of file
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo para las migraciones del esquema de la base de datos de memoria
+Aplica cambios versionados sobre PRAGMA user_version en bases ya existentes
+"""
+
+import json
+import logging
+import sqlite3
+import zlib
+from typing import Callable, List, Tuple
+
+from nova.memory.connection_pool import ConnectionPool
+
+logger = logging.getLogger('nova.memory.migrations')
+
+Migration = Callable[[sqlite3.Cursor], None]
+
+def add_column_if_missing(cursor: sqlite3.Cursor, table: str, column: str,
+                          definition: str) -> bool:
+    """
+    Añade una columna a una tabla si aún no existe
+    
+    Args:
+        cursor: Cursor de escritura
+        table: Nombre de la tabla
+        column: Nombre de la columna
+        definition: Tipo y restricciones de la columna (ej: "TEXT DEFAULT ''")
+        
+    Returns:
+        bool: True si se añadió la columna
+    """
+    cursor.execute(f"PRAGMA table_info({table})")
+    if any(row[1] == column for row in cursor.fetchall()):
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+def table_exists(cursor: sqlite3.Cursor, name: str) -> bool:
+    """
+    Comprueba si existe una tabla (normal o virtual)
+    
+    Args:
+        cursor: Cursor de la base de datos
+        name: Nombre de la tabla
+        
+    Returns:
+        bool: True si la tabla existe
+    """
+    cursor.execute('''
+        SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?
+    ''', (name,))
+    return cursor.fetchone() is not None
+
+def _create_base_tables(cursor: sqlite3.Cursor) -> None:
+    """
+    Versión 1: tablas originales de conversaciones, usuario y preferencias
+    """
+    # Tabla de conversaciones
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            user_message TEXT NOT NULL,
+            nova_response TEXT NOT NULL,
+            sentiment TEXT,
+            topics TEXT
+        )
+    ''')
+    
+    # Tabla de información personal del usuario
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_info (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            category TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            confidence REAL DEFAULT 1.0
+        )
+    ''')
+    
+    # Tabla de preferencias y configuración
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS preferences (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        )
+    ''')
+
+def _create_topic_index(cursor: sqlite3.Cursor, batch_size: int = 5000) -> None:
+    """
+    Versión 2: tabla normalizada de temas por conversación
+    
+    `conversation_topics` guarda un par (tema, conversación) por fila con
+    clave primaria compuesta, de modo que buscar las conversaciones más
+    recientes de varios temas es una única consulta indexada. Se rellena a
+    partir de la columna JSON `conversations.topics`.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_topics (
+            topic TEXT NOT NULL,
+            conversation_id INTEGER NOT NULL,
+            PRIMARY KEY (topic, conversation_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conversation_topics_conversation
+        ON conversation_topics (conversation_id)
+    ''')
+    
+    # Borrar los temas al borrar la conversación
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS conversation_topics_ad
+        AFTER DELETE ON conversations BEGIN
+            DELETE FROM conversation_topics WHERE conversation_id = old.id;
+        END
+    ''')
+    
+    # Copiar los temas de las conversaciones existentes
+    last_id = 0
+    while True:
+        cursor.execute('''
+            SELECT id, topics FROM conversations
+            WHERE id > ? AND topics IS NOT NULL
+            ORDER BY id
+            LIMIT ?
+        ''', (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        pairs = [(topic, row[0])
+                 for row in rows
+                 for topic in set(json.loads(row[1]) or [])]
+        cursor.executemany('''
+            INSERT OR IGNORE INTO conversation_topics (topic, conversation_id)
+            VALUES (?, ?)
+        ''', pairs)
+        last_id = rows[-1][0]
+
+def _create_performance_indexes(cursor: sqlite3.Cursor) -> None:
+    """
+    Versión 3: índices secundarios para las consultas más frecuentes
+    """
+    # get_recent_conversations ordena por timestamp
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conversations_timestamp
+        ON conversations (timestamp)
+    ''')
+    # get_user_info(category=...) filtra por categoría y ordena por timestamp
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_info_category
+        ON user_info (category, timestamp)
+    ''')
+
+def _create_archive_tables(cursor: sqlite3.Cursor) -> None:
+    """
+    Versión 4: archivo comprimido y resúmenes de conversaciones antiguas
+    
+    `conversations_archive` guarda las conversaciones retiradas de la tabla
+    principal con el texto comprimido con zlib. `conversation_summaries`
+    agrega por día y tema el número de conversaciones, los sentimientos y un
+    extracto breve, para poder recordarlas sin descomprimir el archivo.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversations_archive (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            sentiment TEXT,
+            topics TEXT,
+            content BLOB NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            topic TEXT NOT NULL,
+            day TEXT NOT NULL,
+            conversation_count INTEGER NOT NULL DEFAULT 0,
+            positive_count INTEGER NOT NULL DEFAULT 0,
+            negative_count INTEGER NOT NULL DEFAULT 0,
+            neutral_count INTEGER NOT NULL DEFAULT 0,
+            digest TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (topic, day)
+        ) WITHOUT ROWID
+    ''')
+
+def _create_fulltext_index(cursor: sqlite3.Cursor) -> None:
+    """
+    Versión 5: índice de texto completo (FTS5) sobre las conversaciones
+    
+    El índice es una tabla virtual de contenido externo sincronizada con
+    `conversations` mediante triggers, y se rellena con las conversaciones
+    existentes. Si SQLite no incluye FTS5 la migración no crea nada y la
+    búsqueda sigue funcionando con LIKE.
+    """
+    if table_exists(cursor, "conversations_fts"):
+        # Bases creadas antes de versionar el índice: solo faltan los triggers
+        needs_rebuild = False
+    else:
+        needs_rebuild = True
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE conversations_fts USING fts5(
+                    user_message,
+                    nova_response,
+                    content='conversations',
+                    content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 no disponible, se usará búsqueda LIKE: {str(e)}")
+            return
+    
+    # Triggers para mantener el índice sincronizado
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS conversations_fts_ai
+        AFTER INSERT ON conversations BEGIN
+            INSERT INTO conversations_fts (rowid, user_message, nova_response)
+            VALUES (new.id, new.user_message, new.nova_response);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS conversations_fts_ad
+        AFTER DELETE ON conversations BEGIN
+            INSERT INTO conversations_fts (conversations_fts, rowid, user_message, nova_response)
+            VALUES ('delete', old.id, old.user_message, old.nova_response);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS conversations_fts_au
+        AFTER UPDATE ON conversations BEGIN
+            INSERT INTO conversations_fts (conversations_fts, rowid, user_message, nova_response)
+            VALUES ('delete', old.id, old.user_message, old.nova_response);
+            INSERT INTO conversations_fts (rowid, user_message, nova_response)
+            VALUES (new.id, new.user_message, new.nova_response);
+        END
+    ''')
+    
+    if needs_rebuild:
+        cursor.execute("INSERT INTO conversations_fts (conversations_fts) VALUES ('rebuild')")
+
+def _index_archive(cursor: sqlite3.Cursor, batch_size: int = 1000) -> None:
+    """
+    Versión 6: extractos en JSON e índice de texto completo del archivo
+    
+    Los extractos de `conversation_summaries` pasan de mensajes unidos con
+    " | " (ambiguo si un mensaje contenía esa secuencia) a una lista JSON.
+    `conversations_archive_fts` es un índice FTS5 sin contenido (solo guarda
+    el índice invertido, el texto sigue comprimido en el archivo) para no
+    descomprimir todo el archivo en cada búsqueda. Si SQLite no incluye FTS5
+    solo se convierten los extractos.
+    """
+    cursor.execute("SELECT topic, day, digest FROM conversation_summaries")
+    cursor.executemany('''
+        UPDATE conversation_summaries SET digest = ? WHERE topic = ? AND day = ?
+    ''', [(json.dumps(row[2].split(" | ") if row[2] else [], ensure_ascii=False),
+           row[0], row[1]) for row in cursor.fetchall()])
+    
+    if table_exists(cursor, "conversations_archive_fts"):
+        return
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE conversations_archive_fts USING fts5(
+                user_message,
+                nova_response,
+                content='',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 no disponible, el archivo se buscará descomprimiéndolo: {str(e)}")
+        return
+    
+    # Indexar las conversaciones ya archivadas
+    last_id = -1
+    while True:
+        cursor.execute('''
+            SELECT id, content FROM conversations_archive WHERE id > ? ORDER BY id LIMIT ?
+        ''', (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        cursor.executemany('''
+            INSERT INTO conversations_archive_fts (rowid, user_message, nova_response)
+            VALUES (?, ?, ?)
+        ''', [[row[0]] + json.loads(zlib.decompress(row[1]).decode('utf-8')) for row in rows])
+        last_id = rows[-1][0]
+
+def _create_embeddings_table(cursor: sqlite3.Cursor) -> None:
+    """
+    Versión 7: vectores de la memoria semántica
+    
+    Un blob float32 por conversación y embedder. Las bases en las que el
+    índice de vectores ya creó la tabla por su cuenta la conservan.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_embeddings (
+            conversation_id INTEGER NOT NULL,
+            model TEXT NOT NULL,
+            vector BLOB NOT NULL,
+            PRIMARY KEY (model, conversation_id)
+        )
+    ''')
+
+# Migraciones en orden: (versión, descripción, función)
+# Nunca modificar una migración publicada: añadir una nueva versión al final
+MIGRATIONS: List[Tuple[int, str, Migration]] = [
+    (1, "tablas base", _create_base_tables),
+    (2, "índice normalizado de temas", _create_topic_index),
+    (3, "índices de timestamp y categoría", _create_performance_indexes),
+    (4, "archivo y resúmenes de conversaciones", _create_archive_tables),
+    (5, "índice de texto completo", _create_fulltext_index),
+    (6, "extractos en JSON e índice de texto del archivo", _index_archive),
+    (7, "vectores de la memoria semántica", _create_embeddings_table),
+]
+
+def get_schema_version(pool: ConnectionPool) -> int:
+    """
+    Obtiene la versión actual del esquema
+    
+    Args:
+        pool: Pool de conexiones de la base de datos
+        
+    Returns:
+        int: Valor de PRAGMA user_version
+    """
+    with pool.reader() as cursor:
+        cursor.execute("PRAGMA user_version")
+        return cursor.fetchone()[0]
+
+def run_migrations(pool: ConnectionPool,
+                   migrations: List[Tuple[int, str, Migration]] = MIGRATIONS) -> int:
+    """
+    Aplica las migraciones pendientes sobre la base de datos
+    
+    Cada migración se ejecuta en su propia transacción junto con la
+    actualización de PRAGMA user_version, así que un fallo deja la base de
+    datos en la última versión completa. Si se aplicó alguna migración, se
+    actualizan las estadísticas del planificador con ANALYZE y PRAGMA optimize.
+    
+    Args:
+        pool: Pool de conexiones de la base de datos
+        migrations: Lista ordenada de migraciones
+        
+    Returns:
+        int: Versión del esquema tras aplicar las migraciones
+    """
+    version = get_schema_version(pool)
+    applied = 0
+    
+    for target, description, migration in migrations:
+        if target <= version:
+            continue
+        with pool.writer() as cursor:
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {int(target)}")
+        logger.info(f"Migración {target} aplicada: {description}")
+        version = target
+        applied += 1
+    
+    if applied:
+        with pool.writer() as cursor:
+            cursor.execute("ANALYZE")
+        with pool.writer() as cursor:
+            cursor.execute("PRAGMA optimize")
+        logger.info(f"Esquema de memoria actualizado a la versión {version}")
+    
+    return version
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo para puntuar la relevancia de los recuerdos de Nova
+Ordena las conversaciones candidatas por recencia, temas, intensidad y similitud
+"""
+
+import logging
+import math
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger('nova.memory.relevance')
+
+# Sentimientos que marcan una conversación como emocionalmente importante
+_INTENSE_SENTIMENTS = ("positivo", "negativo")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estima el número de tokens de un texto sin tokenizador
+    
+    En español los tokenizadores BPE habituales producen del orden de un
+    token por cada cuatro caracteres; basta para repartir un presupuesto.
+    
+    Args:
+        text: Texto a medir
+        
+    Returns:
+        int: Número aproximado de tokens
+    """
+    return (len(text) + 3) // 4
+
+class RelevanceScorer:
+    """Puntuación vectorizada de la relevancia de conversaciones recordadas"""
+    
+    def __init__(self, recency_weight: float = 1.0, topic_weight: float = 1.0,
+                 sentiment_weight: float = 0.3, similarity_weight: float = 1.5,
+                 half_life_hours: float = 72.0):
+        """
+        Inicializa el puntuador
+        
+        La puntuación es una suma ponderada de cuatro señales en [0, 1]:
+        decaimiento exponencial por antigüedad, proporción de temas del
+        mensaje actual que comparte la conversación, intensidad emocional y
+        similitud semántica (si la hay).
+        
+        Args:
+            recency_weight: Peso de la recencia
+            topic_weight: Peso de los temas compartidos
+            sentiment_weight: Peso de la intensidad emocional
+            similarity_weight: Peso de la similitud semántica
+            half_life_hours: Horas tras las que la recencia vale la mitad
+        """
+        self.weights = np.array([recency_weight, topic_weight, sentiment_weight,
+                                 similarity_weight], dtype=np.float64)
+        self.half_life_hours = half_life_hours
+    
+    def score(self, conversations: Sequence[Dict], current_topics: Sequence[str],
+              similarities: Optional[Dict[int, float]] = None,
+              now: Optional[datetime] = None) -> np.ndarray:
+        """
+        Calcula la puntuación de cada conversación
+        
+        Args:
+            conversations: Conversaciones candidatas
+            current_topics: Temas del mensaje actual
+            similarities: Similitud semántica por ID de conversación (opcional)
+            now: Momento de referencia para la recencia (por defecto, ahora)
+            
+        Returns:
+            np.ndarray: Puntuación de cada conversación, en el mismo orden
+        """
+        count = len(conversations)
+        if count == 0:
+            return np.zeros(0, dtype=np.float64)
+        now = now or datetime.now()
+        similarities = similarities or {}
+        current = set(current_topics)
+        
+        ages = np.empty(count, dtype=np.float64)
+        overlaps = np.zeros(count, dtype=np.float64)
+        for i, conv in enumerate(conversations):
+            try:
+                ages[i] = (now - datetime.fromisoformat(conv['timestamp'])).total_seconds()
+            except (TypeError, ValueError):
+                ages[i] = np.inf
+            if current and conv.get('topics'):
+                overlaps[i] = len(current.intersection(conv['topics'])) / len(current)
+        
+        sentiments = np.array([conv.get('sentiment') for conv in conversations], dtype=object)
+        similarity = np.array([similarities.get(conv['id'], 0.0) for conv in conversations],
+                              dtype=np.float64)
+        
+        features = np.column_stack([
+            np.exp2(-np.maximum(ages, 0.0) / (self.half_life_hours * 3600.0)),
+            overlaps,
+            np.isin(sentiments, _INTENSE_SENTIMENTS).astype(np.float64),
+            np.clip(similarity, 0.0, 1.0),
+        ])
+        return features @ self.weights
+    
+    @staticmethod
+    def top_k(conversations: Sequence[Dict], scores: np.ndarray, k: int,
+              token_budget: Optional[int] = None,
+              cost: Callable[[Dict], int] = lambda conv: 0) -> List[Dict]:
+        """
+        Selecciona las conversaciones mejor puntuadas dentro de un presupuesto
+        
+        Las conversaciones que repiten el mismo mensaje del usuario se
+        descartan, y las que no caben en el presupuesto restante se saltan
+        para dar paso a otras más cortas.
+        
+        Args:
+            conversations: Conversaciones candidatas
+            scores: Puntuación de cada conversación
+            k: Número máximo de conversaciones
+            token_budget: Tokens disponibles (None = sin límite)
+            cost: Función que estima los tokens de una conversación
+            
+        Returns:
+            List[Dict]: Conversaciones elegidas, de mayor a menor puntuación
+        """
+        selected = []
+        seen_messages = set()
+        remaining = math.inf if token_budget is None else token_budget
+        for index in np.argsort(-scores, kind="stable"):
+            if len(selected) >= k:
+                break
+            conv = conversations[index]
+            message = " ".join(conv['user_message'].lower().split())
+            if message in seen_messages:
+                continue
+            tokens = cost(conv)
+            if tokens > remaining:
+                continue
+            seen_messages.add(message)
+            remaining -= tokens
+            selected.append(conv)
+        return selected
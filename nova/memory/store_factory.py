@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo para la gestión de memorias separadas por usuario
+Cada usuario tiene su propio archivo SQLite; los abiertos se mantienen en una LRU
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from nova.memory.memory_manager import MemoryManager
+from nova.memory.text_analyzer import TextAnalyzer
+from nova.memory.vector_index import HashingEmbedder
+
+logger = logging.getLogger('nova.memory.store_factory')
+
+# Caracteres permitidos en el nombre del archivo de un usuario
+_SAFE_ID = re.compile(r"[^A-Za-z0-9_-]")
+
+class _OpenStore:
+    """Gestor de memoria abierto junto con su estado de uso"""
+    
+    __slots__ = ('manager', 'in_use', 'last_used')
+    
+    def __init__(self, manager: MemoryManager):
+        self.manager = manager
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+class MemoryStoreFactory:
+    """Fábrica de gestores de memoria, uno por usuario, con caché LRU de abiertos"""
+    
+    def __init__(self, base_dir: str, max_open: int = 32, idle_timeout: float = 600.0,
+                 default_user_id: str = "default", legacy_db_path: Optional[str] = None,
+                 **manager_kwargs: Any):
+        """
+        Inicializa la fábrica
+        
+        Cada usuario guarda su memoria en `base_dir/<usuario>.db`, así que los
+        datos de un usuario no pisan los de otro y las escrituras de usuarios
+        distintos no compiten por el mismo bloqueo de archivo. Los gestores se
+        abren la primera vez que se piden y se cierran al superar `max_open`
+        (el menos usado recientemente) o tras `idle_timeout` segundos sin uso.
+        
+        Args:
+            base_dir: Directorio de las bases de datos de los usuarios
+            max_open: Número máximo de gestores abiertos a la vez
+            idle_timeout: Segundos sin uso tras los que se cierra un gestor
+            default_user_id: Usuario para las peticiones sin identificar
+            legacy_db_path: Memoria única anterior a las memorias por usuario
+                (opcional); solo se asigna a un usuario llamando
+                explícitamente a `claim_legacy_store`
+            **manager_kwargs: Argumentos para cada MemoryManager (write_behind,
+                retention_days, ...)
+        """
+        self.base_dir = base_dir
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self.default_user_id = default_user_id
+        self.legacy_db_path = legacy_db_path
+        
+        # El analizador y el generador de embeddings no tienen estado por
+        # usuario: se compilan una vez y se comparten
+        analyzer_config = manager_kwargs.pop('analyzer_config', None)
+        if 'analyzer' not in manager_kwargs:
+            if analyzer_config:
+                manager_kwargs['analyzer'] = TextAnalyzer.from_config(analyzer_config)
+            else:
+                manager_kwargs['analyzer'] = TextAnalyzer()
+        if manager_kwargs.get('embedder') is None:
+            manager_kwargs['embedder'] = HashingEmbedder()
+        self.manager_kwargs = manager_kwargs
+        
+        self._lock = threading.RLock()
+        self._stores: "OrderedDict[str, _OpenStore]" = OrderedDict()
+        # Usuarios que otro hilo está abriendo en este momento
+        self._opening: Dict[str, threading.Event] = {}
+        self._closed = False
+        
+        os.makedirs(base_dir, exist_ok=True)
+        logger.info(f"Memorias por usuario en {base_dir} (máximo {max_open} abiertas)")
+    
+    def db_path_for(self, user_id: str) -> str:
+        """
+        Obtiene la ruta de la base de datos de un usuario
+        
+        Args:
+            user_id: Identificador del usuario o de la sesión
+            
+        Returns:
+            str: Ruta del archivo SQLite del usuario
+        """
+        safe_id = _SAFE_ID.sub("_", user_id)[:64]
+        if safe_id != user_id:
+            # Evitar que dos identificadores distintos compartan archivo
+            digest = hashlib.blake2b(user_id.encode('utf-8'), digest_size=6).hexdigest()
+            safe_id = f"{safe_id}-{digest}"
+        return os.path.join(self.base_dir, f"{safe_id}.db")
+    
+    def claim_legacy_store(self, user_id: str) -> bool:
+        """
+        Convierte la memoria única anterior en la memoria de un usuario nuevo
+        
+        Contiene los datos de una persona, así que nunca se llama por
+        iniciativa de un visitante: el usuario lo elige quien administra la
+        instalación. Se vuelca el WAL en la base de datos y esta se mueve a
+        la ruta del usuario, así que solo puede reclamarla un usuario. No se
+        hace nada si el usuario ya tiene memoria o si otro la reclamó antes.
+        
+        Args:
+            user_id: Identificador del usuario
+            
+        Returns:
+            bool: True si el usuario se ha quedado con la memoria anterior
+        """
+        if not self.legacy_db_path:
+            return False
+        target = self.db_path_for(user_id)
+        with self._lock:
+            if (not os.path.exists(self.legacy_db_path) or os.path.exists(target)
+                    or user_id in self._stores or user_id in self._opening):
+                return False
+            try:
+                conn = sqlite3.connect(self.legacy_db_path)
+                try:
+                    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                finally:
+                    conn.close()
+                for suffix in ("-wal", "-shm"):
+                    if os.path.exists(self.legacy_db_path + suffix):
+                        os.replace(self.legacy_db_path + suffix, target + suffix)
+                os.replace(self.legacy_db_path, target)
+            except (OSError, sqlite3.Error) as e:
+                logger.error(f"No se pudo asignar la memoria anterior al usuario {user_id}: {str(e)}")
+                return False
+        logger.info(f"Memoria anterior {self.legacy_db_path} asignada al usuario {user_id}")
+        return True
+    
+    @contextmanager
+    def acquire(self, user_id: Optional[str] = None) -> Iterator[MemoryManager]:
+        """
+        Presta el gestor de memoria de un usuario, abriéndolo si hace falta
+        
+        Mientras el bloque está activo el gestor no se cierra aunque salga de
+        la LRU.
+        
+        Args:
+            user_id: Identificador del usuario o de la sesión (opcional)
+            
+        Yields:
+            MemoryManager: Gestor de memoria del usuario
+        """
+        store = self._checkout(user_id or self.default_user_id)
+        try:
+            yield store.manager
+        finally:
+            self._checkin(store)
+    
+    def _checkout(self, user_id: str) -> _OpenStore:
+        """
+        Obtiene el gestor abierto de un usuario y lo marca como en uso
+        
+        Args:
+            user_id: Identificador del usuario
+            
+        Returns:
+            _OpenStore: Gestor abierto
+        """
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("La fábrica de memorias está cerrada")
+                store = self._stores.get(user_id)
+                if store is not None:
+                    self._stores.move_to_end(user_id)
+                    store.in_use += 1
+                    store.last_used = time.monotonic()
+                    return store
+                opening = self._opening.get(user_id)
+                if opening is None:
+                    # Este hilo abre la base de datos; los demás esperan
+                    opening = self._opening[user_id] = threading.Event()
+                    break
+            opening.wait()
+        
+        try:
+            # Abrir fuera del bloqueo: las migraciones y la carga del índice
+            # de un usuario no retrasan a los demás
+            manager = MemoryManager(db_path=self.db_path_for(user_id), **self.manager_kwargs)
+        except BaseException:
+            with self._lock:
+                self._opening.pop(user_id).set()
+            raise
+        
+        with self._lock:
+            store = _OpenStore(manager)
+            store.in_use = 1
+            self._stores[user_id] = store
+            self._opening.pop(user_id).set()
+            evicted = self._evict()
+        self._close_managers(evicted)
+        logger.debug(f"Memoria del usuario {user_id} abierta")
+        return store
+    
+    def _checkin(self, store: _OpenStore) -> None:
+        """
+        Devuelve un gestor prestado y cierra los que lleven demasiado sin uso
+        
+        Args:
+            store: Gestor devuelto
+        """
+        with self._lock:
+            store.in_use -= 1
+            store.last_used = time.monotonic()
+            evicted = self._evict()
+        self._close_managers(evicted)
+    
+    def _evict(self) -> List[MemoryManager]:
+        """
+        Saca de la LRU los gestores sobrantes o inactivos que no estén en uso
+        
+        Debe llamarse con el bloqueo adquirido; los gestores devueltos se
+        cierran después, fuera del bloqueo.
+        
+        Returns:
+            List[MemoryManager]: Gestores que hay que cerrar
+        """
+        now = time.monotonic()
+        excess = len(self._stores) - self.max_open
+        evicted = []
+        for user_id, store in list(self._stores.items()):
+            if store.in_use:
+                continue
+            if excess > 0 or now - store.last_used > self.idle_timeout:
+                del self._stores[user_id]
+                evicted.append(store.manager)
+                excess -= 1
+        return evicted
+    
+    @staticmethod
+    def _close_managers(managers: List[MemoryManager]) -> None:
+        """
+        Cierra gestores de memoria (vuelca antes sus escrituras pendientes)
+        
+        Args:
+            managers: Gestores a cerrar
+        """
+        for manager in managers:
+            try:
+                manager.close()
+            except Exception as e:
+                logger.error(f"Error al cerrar memoria de usuario: {str(e)}")
+    
+    def close_idle(self) -> int:
+        """
+        Cierra los gestores que llevan más de `idle_timeout` segundos sin uso
+        
+        Returns:
+            int: Número de gestores cerrados
+        """
+        with self._lock:
+            evicted = self._evict()
+        self._close_managers(evicted)
+        return len(evicted)
+    
+    def open_count(self) -> int:
+        """
+        Obtiene el número de gestores abiertos
+        
+        Returns:
+            int: Gestores abiertos en la LRU
+        """
+        with self._lock:
+            return len(self._stores)
+    
+    def close(self) -> None:
+        """
+        Cierra todos los gestores abiertos
+        """
+        with self._lock:
+            self._closed = True
+            managers = [store.manager for store in self._stores.values()]
+            self._stores.clear()
+        self._close_managers(managers)
+        logger.info("Memorias de usuario cerradas")
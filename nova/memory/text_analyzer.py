@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo para el análisis de los mensajes del usuario
+Detecta sentimiento, temas y datos personales con un único recorrido del texto
+"""
+
+import json
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger('nova.memory.text_analyzer')
+
+# Palabras positivas y negativas en español
+DEFAULT_SENTIMENT_WORDS: Dict[str, List[str]] = {
+    "positivo": ["feliz", "contento", "alegre", "genial", "excelente", "bueno", "increíble",
+                 "maravilloso", "fantástico", "encantado", "amo", "adoro", "me gusta"],
+    "negativo": ["triste", "enojado", "molesto", "terrible", "horrible", "malo", "pésimo",
+                 "fatal", "odio", "detesto", "no me gusta", "preocupado"]
+}
+
+# Temas comunes en español
+DEFAULT_TOPIC_KEYWORDS: Dict[str, List[str]] = {
+    "trabajo": ["trabajo", "empleo", "oficina", "jefe", "compañeros", "proyecto"],
+    "familia": ["familia", "padres", "hermanos", "hijos", "pareja"],
+    "salud": ["salud", "enfermedad", "médico", "hospital", "dolor"],
+    "entretenimiento": ["película", "serie", "música", "concierto", "juego", "videojuego"],
+    "comida": ["comida", "restaurante", "cocinar", "receta", "cena", "almuerzo"],
+    "viajes": ["viaje", "vacaciones", "hotel", "playa", "montaña", "turismo"],
+    "tecnología": ["tecnología", "computadora", "teléfono", "app", "software", "internet"],
+    "educación": ["estudios", "universidad", "escuela", "aprender", "curso", "profesor"]
+}
+
+# Patrones para extraer información personal: categoría -> [(clave, patrón regex)]
+# El último grupo de captura de cada patrón contiene la información
+DEFAULT_FACT_PATTERNS: Dict[str, List[Tuple[str, str]]] = {
+    "personal": [
+        ("nombre", r"me llamo ([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)"),
+        ("edad", r"tengo (\d+) años"),
+        ("cumpleaños", r"mi cumpleaños es (el )?([0-9]{1,2} de [a-zA-Z]+)"),
+        ("trabajo", r"trabajo (en|como) ([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)"),
+    ],
+    "preferencias": [
+        ("comida", r"mi comida favorita es ([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)"),
+        ("música", r"me gusta (escuchar|la música) ([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)"),
+        ("color", r"mi color favorito es (el )?([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)"),
+    ],
+    "emocional": [
+        ("estado_ánimo", r"me siento ([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)"),
+        ("preocupaciones", r"estoy preocupado por ([A-Za-zÁáÉéÍíÓóÚúÑñ\s,.]+)"),
+    ]
+}
+
+# Caracteres con significado especial en una expresión regular
+_REGEX_META = set(".^$*+?{}[]\\|()")
+
+class TextAnalysis(NamedTuple):
+    """Resultado del análisis de un texto"""
+    positive_count: int
+    negative_count: int
+    topics: Tuple[str, ...]
+    facts: Tuple[Tuple[str, str, str], ...]  # (categoría, clave, valor)
+    
+    @property
+    def sentiment(self) -> str:
+        """Sentimiento detectado (positivo, negativo, neutral)"""
+        if self.positive_count > self.negative_count:
+            return "positivo"
+        elif self.negative_count > self.positive_count:
+            return "negativo"
+        else:
+            return "neutral"
+
+class TextAnalyzer:
+    """Analizador precompilado de sentimiento, temas y datos personales"""
+    
+    def __init__(self, sentiment_words: Optional[Dict[str, List[str]]] = None,
+                 topic_keywords: Optional[Dict[str, List[str]]] = None,
+                 fact_patterns: Optional[Dict[str, List[Tuple[str, str]]]] = None,
+                 cache_size: int = 64):
+        """
+        Compila las tablas de palabras clave en un único autómata
+        
+        Todas las palabras clave (sentimiento, temas y el prefijo literal de
+        cada patrón de datos personales) se combinan en una sola expresión
+        regular factorizada como un trie, de modo que un único recorrido del
+        texto encuentra todas. Las palabras clave deben empezar en un límite
+        de palabra ("amo" ya no coincide dentro de "llamo"). Los patrones de
+        datos solo se evalúan si su prefijo aparece en el texto.
+        
+        Args:
+            sentiment_words: Palabras por sentimiento ("positivo"/"negativo")
+            topic_keywords: Palabras clave por tema
+            fact_patterns: Patrones de datos personales por categoría
+            cache_size: Número de análisis recientes que se conservan en caché
+        """
+        self.sentiment_words = sentiment_words or DEFAULT_SENTIMENT_WORDS
+        self.topic_keywords = topic_keywords or DEFAULT_TOPIC_KEYWORDS
+        self.fact_patterns = fact_patterns or DEFAULT_FACT_PATTERNS
+        self._topic_order = {topic: i for i, topic in enumerate(self.topic_keywords)}
+        
+        # palabra clave -> acciones: ("sentiment", etiqueta) / ("topic", tema)
+        self._actions: Dict[str, List[Tuple[str, str]]] = {}
+        # prefijo literal -> índices de los patrones de datos que lo usan
+        self._fact_triggers: Dict[str, List[int]] = {}
+        for label, words in self.sentiment_words.items():
+            for word in words:
+                self._add_action(word, ("sentiment", label))
+        for topic, words in self.topic_keywords.items():
+            for word in words:
+                self._add_action(word, ("topic", topic))
+        
+        # Patrones de datos: (categoría, clave, regex compilada)
+        self._facts: List[Tuple[str, str, re.Pattern]] = []
+        self._unanchored_facts: List[int] = []
+        for category, pattern_list in self.fact_patterns.items():
+            for key, pattern in pattern_list:
+                index = len(self._facts)
+                self._facts.append((category, key, re.compile(pattern, re.IGNORECASE)))
+                trigger = self._literal_prefix(pattern).lower()
+                if trigger:
+                    self._fact_triggers.setdefault(trigger, []).append(index)
+                else:
+                    # Sin prefijo literal, el patrón se busca en todo el texto
+                    self._unanchored_facts.append(index)
+        
+        # El recorrido no solapa coincidencias: al encontrar una palabra clave
+        # se anotan también las que contiene ("no me gusta" incluye "me gusta")
+        words = set(self._actions) | set(self._fact_triggers)
+        self._contained: Dict[str, List[str]] = {
+            word: [other for other in words if self._contains_word(word, other)]
+            for word in words
+        }
+        
+        # Se aplica sobre el texto en minúsculas, más rápido que IGNORECASE
+        self._scanner = re.compile(r"(?<!\w)(" + self._trie_pattern(words) + ")")
+        self.analyze = lru_cache(maxsize=cache_size)(self._analyze)
+        logger.info(f"Analizador de texto compilado con {len(words)} palabras clave")
+    
+    @classmethod
+    def from_config(cls, config_path: str, **kwargs) -> "TextAnalyzer":
+        """
+        Crea un analizador a partir de un archivo JSON de configuración
+        
+        El archivo puede definir cualquiera de las claves "sentiment", "topics"
+        y "facts" (con el mismo formato que las tablas por defecto); las que
+        falten usan los valores por defecto.
+        
+        Args:
+            config_path: Ruta al archivo JSON
+            
+        Returns:
+            TextAnalyzer: Analizador compilado con las tablas del archivo
+        """
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        
+        facts = config.get("facts")
+        if facts is not None:
+            facts = {category: [tuple(item) for item in items] for category, items in facts.items()}
+        
+        return cls(
+            sentiment_words=config.get("sentiment"),
+            topic_keywords=config.get("topics"),
+            fact_patterns=facts,
+            **kwargs
+        )
+    
+    def _add_action(self, word: str, action: Tuple[str, str]) -> None:
+        """
+        Asocia una acción a una palabra clave
+        
+        Args:
+            word: Palabra clave
+            action: Acción a ejecutar cuando aparece
+        """
+        self._actions.setdefault(word.lower(), []).append(action)
+    
+    @staticmethod
+    def _contains_word(text: str, word: str) -> bool:
+        """
+        Comprueba si una palabra clave aparece dentro de otra en un límite de palabra
+        
+        Args:
+            text: Palabra clave contenedora
+            word: Palabra clave buscada
+            
+        Returns:
+            bool: True si `word` aparece en `text` empezando una palabra
+        """
+        start = text.find(word)
+        while start != -1:
+            if start == 0 or not text[start - 1].isalnum():
+                return True
+            start = text.find(word, start + 1)
+        return False
+    
+    @staticmethod
+    def _trie_pattern(words) -> str:
+        """
+        Construye una alternancia factorizada por prefijos comunes
+        
+        Con las palabras agrupadas como un trie, el motor de expresiones
+        regulares descarta cada posición tras comparar uno o dos caracteres
+        en lugar de probar todas las alternativas una a una.
+        
+        Args:
+            words: Palabras clave
+            
+        Returns:
+            str: Patrón regex que coincide con la palabra más larga posible
+        """
+        trie: Dict[str, Dict] = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        
+        def build(node: Dict[str, Dict]) -> str:
+            branches = [re.escape(char) + build(child)
+                        for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ""
+            body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+            # Si aquí termina una palabra, el resto es opcional
+            return f"(?:{body})?" if "" in node else body
+        
+        return build(trie)
+    
+    @staticmethod
+    def _literal_prefix(pattern: str) -> str:
+        """
+        Obtiene el prefijo literal de un patrón (hasta el primer metacarácter)
+        
+        Args:
+            pattern: Patrón regex
+            
+        Returns:
+            str: Prefijo literal sin espacios finales
+        """
+        prefix = []
+        for char in pattern:
+            if char in _REGEX_META:
+                break
+            prefix.append(char)
+        # Un cuantificador tras el último carácter lo haría opcional
+        if len(prefix) < len(pattern) and pattern[len(prefix)] in "*?{" and prefix:
+            prefix.pop()
+        return "".join(prefix).strip()
+    
+    def _analyze(self, text: str) -> TextAnalysis:
+        """
+        Analiza un texto en un único recorrido
+        
+        Args:
+            text: Texto a analizar
+            
+        Returns:
+            TextAnalysis: Sentimiento, temas y datos personales detectados
+        """
+        found_words = set()
+        for match in set(self._scanner.findall(text.lower())):
+            found_words.update(self._contained[match])
+        
+        # Los patrones de datos solo se evalúan si su prefijo ha aparecido
+        candidates = list(self._unanchored_facts)
+        for word in found_words:
+            candidates.extend(self._fact_triggers.get(word, ()))
+        
+        fact_values: Dict[int, str] = {}
+        for index in candidates:
+            fact_match = self._facts[index][2].search(text)
+            if fact_match:
+                # El último grupo de captura contiene la información
+                fact_values[index] = fact_match.group(fact_match.lastindex).strip()
+        
+        # Cada palabra clave cuenta una sola vez, como en el análisis original
+        positive_count = negative_count = 0
+        topics = set()
+        for word in found_words:
+            for kind, target in self._actions.get(word, ()):
+                if kind == "sentiment":
+                    if target == "positivo":
+                        positive_count += 1
+                    elif target == "negativo":
+                        negative_count += 1
+                elif kind == "topic":
+                    topics.add(target)
+        
+        return TextAnalysis(
+            positive_count=positive_count,
+            negative_count=negative_count,
+            topics=tuple(sorted(topics, key=self._topic_order.__getitem__)),
+            facts=tuple((self._facts[i][0], self._facts[i][1], value)
+                        for i, value in sorted(fact_values.items()))
+        )
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo para la memoria semántica de Nova
+Guarda embeddings de las conversaciones y busca las más parecidas a un texto
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from nova.memory.connection_pool import ConnectionPool
+
+logger = logging.getLogger('nova.memory.vector_index')
+
+class Embedder:
+    """Interfaz base para los generadores de embeddings"""
+    
+    # Nombre con el que se guardan los vectores; cambiarlo obliga a recalcularlos
+    name = "base"
+    dim = 0
+    
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Convierte una lista de textos en vectores
+        
+        Args:
+            texts: Textos a convertir
+            
+        Returns:
+            np.ndarray: Matriz float32 de forma (len(texts), dim) con filas normalizadas
+        """
+        raise NotImplementedError
+
+class HashingEmbedder(Embedder):
+    """Embedder local y determinista basado en hashing de palabras y bigramas"""
+    
+    def __init__(self, dim: int = 512):
+        """
+        Inicializa el embedder
+        
+        No necesita modelo ni conexión a internet: cada palabra y cada par de
+        palabras consecutivas se proyecta con un hash estable sobre `dim`
+        dimensiones con signo.
+        
+        Args:
+            dim: Número de dimensiones de los vectores
+        """
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+    
+    @staticmethod
+    def _tokenize(text: str) -> List[str]:
+        """
+        Normaliza el texto (minúsculas, sin tildes) y lo divide en palabras
+        
+        Args:
+            text: Texto a dividir
+            
+        Returns:
+            List[str]: Palabras del texto
+        """
+        text = unicodedata.normalize("NFKD", text.lower())
+        text = "".join(c for c in text if not unicodedata.combining(c))
+        return re.findall(r"\w+", text)
+    
+    def _features(self, text: str) -> List[str]:
+        """
+        Obtiene las palabras y bigramas del texto
+        
+        Args:
+            text: Texto a analizar
+            
+        Returns:
+            List[str]: Rasgos a proyectar
+        """
+        words = [w for w in self._tokenize(text) if len(w) > 2]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                sign = 1.0 if value & 1 else -1.0
+                vectors[row, (value >> 1) % self.dim] += sign
+        
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+class VectorIndex:
+    """Índice de vectores de conversaciones con búsqueda top-k por producto escalar"""
+    
+    def __init__(self, pool: ConnectionPool, embedder: Optional[Embedder] = None,
+                 mmap_threshold: int = 200000, chunk_size: int = 65536,
+                 max_vectors: Optional[int] = 250000):
+        """
+        Inicializa el índice y carga los vectores guardados
+        
+        Los vectores se guardan como blobs float32 en la tabla
+        `conversation_embeddings` (creada por las migraciones de
+        MemoryDatabase), que es su única copia persistente, y se
+        cargan en una matriz contigua. Si hay más de `mmap_threshold` filas,
+        la matriz vive en un archivo temporal privado de este proceso
+        (borrado nada más mapearlo) en lugar de en la RAM: ningún otro
+        proceso ni la copia de seguridad lo ven, así que no hay nada que
+        puedan corromper.
+        
+        Cada búsqueda recorre todas las filas: unos `dim` productos por
+        conversación (512 con el embedder por defecto, 2 KB por fila). Por eso
+        el índice se limita a las `max_vectors` conversaciones más recientes;
+        con el valor por defecto ocupa unos 500 MB y una búsqueda tarda
+        decenas de milisegundos. Las más antiguas se quitan del índice (y sus
+        vectores de la base de datos) y se siguen encontrando por temas y
+        texto.
+        
+        Args:
+            pool: Pool de conexiones de la base de datos
+            embedder: Generador de embeddings (por defecto HashingEmbedder)
+            mmap_threshold: Filas a partir de las cuales se usa memoria mapeada
+            chunk_size: Filas por bloque al calcular similitudes
+            max_vectors: Conversaciones máximas en el índice (None = sin límite)
+        """
+        self.pool = pool
+        self.embedder = embedder or HashingEmbedder()
+        self.mmap_threshold = mmap_threshold
+        self.chunk_size = chunk_size
+        self.max_vectors = max_vectors
+        self.scratch_dir = None
+        if pool.db_path != ":memory:":
+            self.scratch_dir = os.path.dirname(os.path.abspath(pool.db_path))
+            # Las versiones anteriores compartían un .npy junto a la base de datos
+            legacy = f"{pool.db_path}.{self.embedder.name}.npy"
+            for path in (legacy, f"{legacy}.tmp"):
+                if os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        logger.warning(f"No se pudo borrar el índice antiguo {path}: {str(e)}")
+        # Archivos temporales que el sistema no dejó borrar mientras estaban mapeados
+        self._scratch_files: List[str] = []
+        
+        self._lock = threading.RLock()
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self._size = 0
+        
+        self._load()
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def _scratch_matrix(self, shape: Tuple[int, int]) -> np.ndarray:
+        """
+        Crea una matriz respaldada por un archivo temporal privado
+        
+        El archivo tiene un nombre único y se borra en cuanto está mapeado:
+        la memoria sigue siendo válida hasta que se libera la matriz, y
+        ningún otro proceso puede abrirlo.
+        
+        Args:
+            shape: Forma de la matriz
+            
+        Returns:
+            np.ndarray: Matriz float32 mapeada (rellena de ceros)
+        """
+        fd, path = tempfile.mkstemp(prefix=".nova-vectors-", suffix=".f32", dir=self.scratch_dir)
+        try:
+            os.ftruncate(fd, shape[0] * shape[1] * 4)
+            vectors = np.memmap(path, dtype=np.float32, mode="r+", shape=shape)
+        finally:
+            os.close(fd)
+            try:
+                os.unlink(path)
+            except OSError:
+                # En Windows no se puede borrar un archivo mapeado: se borra al cerrar
+                self._scratch_files.append(path)
+        return vectors
+    
+    def _reserve(self, capacity: int) -> None:
+        """
+        Amplía la matriz para que admita al menos `capacity` filas
+        
+        Args:
+            capacity: Número de filas necesario
+        """
+        if capacity <= len(self._ids):
+            return
+        
+        new_capacity = max(capacity, 2 * len(self._ids), 1024)
+        if self.max_vectors:
+            new_capacity = max(capacity, min(new_capacity, self.max_vectors + self.max_vectors // 10))
+        shape = (new_capacity, self.embedder.dim)
+        if new_capacity >= self.mmap_threshold:
+            vectors = self._scratch_matrix(shape)
+            logger.info(f"Índice de vectores mapeado en un archivo temporal ({new_capacity} filas)")
+        else:
+            vectors = np.zeros(shape, dtype=np.float32)
+        
+        vectors[:self._size] = self._vectors[:self._size]
+        ids = np.zeros(new_capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        self._vectors = vectors
+        self._ids = ids
+    
+    def _positions(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Busca en qué fila de la matriz está cada conversación
+        
+        Args:
+            ids: IDs de las conversaciones
+            
+        Returns:
+            np.ndarray: Fila de cada ID, o -1 si no está en el índice
+        """
+        current = self._ids[:self._size]
+        positions = np.full(len(ids), -1, dtype=np.int64)
+        if not self._size or not len(ids):
+            return positions
+        if len(ids) <= 16:
+            # Caso habitual (una conversación por turno): una pasada por ID
+            for i, cid in enumerate(ids):
+                hit = np.flatnonzero(current == cid)
+                if hit.size:
+                    positions[i] = hit[0]
+            return positions
+        order = np.argsort(current, kind="stable")
+        found = np.minimum(np.searchsorted(current, ids, sorter=order), self._size - 1)
+        candidates = order[found]
+        return np.where(current[candidates] == ids, candidates, -1)
+    
+    def _upsert(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Actualiza las filas de las conversaciones ya indexadas y añade el resto
+        
+        Args:
+            ids: IDs de las conversaciones
+            vectors: Vectores correspondientes
+        """
+        with self._lock:
+            positions = self._positions(ids)
+            existing = positions >= 0
+            if existing.any():
+                self._vectors[positions[existing]] = vectors[existing]
+            if not existing.all():
+                self._append(ids[~existing], vectors[~existing])
+    
+    def _append(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Añade vectores al final de la matriz en memoria
+        
+        Args:
+            ids: IDs de las conversaciones (que no estén ya en el índice)
+            vectors: Vectores correspondientes
+        """
+        with self._lock:
+            self._reserve(self._size + len(ids))
+            self._vectors[self._size:self._size + len(ids)] = vectors
+            self._ids[self._size:self._size + len(ids)] = ids
+            self._size += len(ids)
+            if self.max_vectors and self._size > self.max_vectors + self.max_vectors // 10:
+                self._evict(self._size - self.max_vectors)
+    
+    def _evict(self, count: int) -> None:
+        """
+        Quita del índice las `count` filas añadidas hace más tiempo
+        
+        Se llama con un margen del 10 % sobre `max_vectors` para que la
+        compactación (una copia de toda la matriz) sea poco frecuente.
+        
+        Args:
+            count: Número de filas a quitar
+        """
+        evicted = [int(cid) for cid in self._ids[:count]]
+        remaining = self._size - count
+        for start in range(0, remaining, self.chunk_size):
+            end = min(start + self.chunk_size, remaining)
+            self._vectors[start:end] = self._vectors[count + start:count + end]
+            self._ids[start:end] = self._ids[count + start:count + end]
+        self._size = remaining
+        try:
+            with self.pool.writer() as cursor:
+                cursor.executemany('''
+                    DELETE FROM conversation_embeddings WHERE model = ? AND conversation_id = ?
+                ''', [(self.embedder.name, cid) for cid in evicted])
+        except sqlite3.Error as e:
+            logger.error(f"Error al borrar vectores antiguos del índice: {str(e)}")
+        logger.info(f"Índice de vectores recortado a {remaining} conversaciones")
+    
+    def _load(self, batch_size: int = 10000) -> None:
+        """
+        Carga en memoria los vectores guardados del embedder actual
+        
+        Args:
+            batch_size: Filas leídas por bloque
+        """
+        limit = self.max_vectors or -1
+        with self.pool.reader() as cursor:
+            cursor.execute('''
+                SELECT COUNT(*) FROM conversation_embeddings WHERE model = ?
+            ''', (self.embedder.name,))
+            total = cursor.fetchone()[0]
+            self._reserve(min(total, self.max_vectors) if self.max_vectors else total)
+            
+            # Las más recientes, en orden ascendente para que las primeras
+            # filas de la matriz sean las primeras en salir
+            cursor.execute('''
+                SELECT conversation_id, vector FROM (
+                    SELECT conversation_id, vector FROM conversation_embeddings
+                    WHERE model = ?
+                    ORDER BY conversation_id DESC
+                    LIMIT ?
+                ) ORDER BY conversation_id
+            ''', (self.embedder.name, limit))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                ids = np.array([row[0] for row in rows], dtype=np.int64)
+                vectors = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float32)
+                self._append(ids, vectors.reshape(len(rows), self.embedder.dim))
+        
+        logger.info(f"Índice de vectores cargado: {self._size} conversaciones")
+    
+    def backfill(self, batch_size: int = 1000,
+                 stop: Optional[threading.Event] = None) -> int:
+        """
+        Calcula los embeddings de las conversaciones que aún no lo tienen
+        
+        Puede ejecutarse en segundo plano mientras se guardan y buscan
+        conversaciones: hasta que termina, las búsquedas solo ven las ya
+        indexadas.
+        
+        Args:
+            batch_size: Conversaciones procesadas por transacción
+            stop: Si se activa, se detiene al terminar el bloque en curso
+            
+        Returns:
+            int: Número de conversaciones añadidas al índice
+        """
+        added = 0
+        last_id = 0
+        if self.max_vectors:
+            # Solo las conversaciones que cabrían en el índice
+            with self.pool.reader() as cursor:
+                cursor.execute('''
+                    SELECT id FROM conversations ORDER BY id DESC LIMIT 1 OFFSET ?
+                ''', (self.max_vectors,))
+                row = cursor.fetchone()
+            last_id = row[0] if row else 0
+        while stop is None or not stop.is_set():
+            with self.pool.reader() as cursor:
+                cursor.execute('''
+                    SELECT c.id, c.user_message, c.nova_response FROM conversations c
+                    LEFT JOIN conversation_embeddings e
+                        ON e.conversation_id = c.id AND e.model = ?
+                    WHERE e.conversation_id IS NULL AND c.id > ?
+                    ORDER BY c.id
+                    LIMIT ?
+                ''', (self.embedder.name, last_id, batch_size))
+                rows = cursor.fetchall()
+            if not rows:
+                break
+            
+            ids = [row[0] for row in rows]
+            self._store(ids, [self._conversation_text(row[1], row[2]) for row in rows])
+            added += len(rows)
+            last_id = ids[-1]
+        
+        if added:
+            logger.info(f"Embeddings calculados para {added} conversaciones existentes")
+        return added
+    
+    @staticmethod
+    def _conversation_text(user_message: str, nova_response: str) -> str:
+        """
+        Construye el texto que representa a una conversación en el índice
+        
+        Args:
+            user_message: Mensaje del usuario
+            nova_response: Respuesta de Nova
+            
+        Returns:
+            str: Texto a convertir en vector
+        """
+        return f"{user_message}\n{nova_response}"
+    
+    def _store(self, ids: List[int], texts: List[str]) -> None:
+        """
+        Calcula, guarda y añade al índice los vectores de varias conversaciones
+        
+        Args:
+            ids: IDs de las conversaciones
+            texts: Textos a convertir en vectores
+        """
+        vectors = self.embedder.embed(texts).astype(np.float32, copy=False)
+        with self.pool.writer() as cursor:
+            cursor.executemany('''
+                INSERT OR REPLACE INTO conversation_embeddings (conversation_id, model, vector)
+                VALUES (?, ?, ?)
+            ''', [(cid, self.embedder.name, vector.tobytes())
+                  for cid, vector in zip(ids, vectors)])
+        self._upsert(np.asarray(ids, dtype=np.int64), vectors)
+    
+    def add(self, conversation_id: int, user_message: str, nova_response: str) -> None:
+        """
+        Añade una conversación recién guardada al índice
+        
+        Args:
+            conversation_id: ID de la conversación
+            user_message: Mensaje del usuario
+            nova_response: Respuesta de Nova
+        """
+        try:
+            self._store([conversation_id], [self._conversation_text(user_message, nova_response)])
+        except sqlite3.Error as e:
+            logger.error(f"Error al guardar embedding de la conversación {conversation_id}: {str(e)}")
+    
+    def search_batch(self, queries: Sequence[str], k: int = 5) -> List[List[Tuple[int, float]]]:
+        """
+        Busca las conversaciones más similares a varios textos a la vez
+        
+        La similitud es el producto escalar (coseno, al estar normalizados)
+        calculado por bloques de `chunk_size` filas, de modo que el coste de
+        memoria no depende del tamaño del índice.
+        
+        Args:
+            queries: Textos a buscar
+            k: Número de resultados por consulta
+            
+        Returns:
+            List[List[Tuple[int, float]]]: Pares (id, similitud) por consulta, de mayor a menor
+        """
+        if not queries or k <= 0:
+            return [[] for _ in queries]
+        
+        query_vectors = self.embedder.embed(queries)
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+        
+        with self._lock:
+            for start in range(0, self._size, self.chunk_size):
+                end = min(start + self.chunk_size, self._size)
+                scores = query_vectors @ self._vectors[start:end].T
+                ids = np.broadcast_to(self._ids[start:end], scores.shape)
+                
+                # Conservar solo los k mejores acumulados hasta ahora
+                scores = np.concatenate([best_scores, scores], axis=1)
+                ids = np.concatenate([best_ids, ids], axis=1)
+                if scores.shape[1] > k:
+                    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                    scores = np.take_along_axis(scores, top, axis=1)
+                    ids = np.take_along_axis(ids, top, axis=1)
+                best_scores, best_ids = scores, ids
+        
+        results = []
+        for scores, ids in zip(best_scores, best_ids):
+            order = np.argsort(-scores)
+            results.append([(int(ids[i]), float(scores[i])) for i in order])
+        return results
+    
+    def search(self, query: str, k: int = 5, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """
+        Busca las conversaciones más similares a un texto
+        
+        Args:
+            query: Texto a buscar
+            k: Número máximo de resultados
+            min_score: Similitud mínima para incluir un resultado
+            
+        Returns:
+            List[Tuple[int, float]]: Pares (id, similitud) de mayor a menor
+        """
+        return [(cid, score) for cid, score in self.search_batch([query], k)[0]
+                if score > min_score]
+    
+    def close(self) -> None:
+        """
+        Libera la matriz y borra los archivos temporales que quedaran
+        """
+        with self._lock:
+            self._vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._size = 0
+        for path in self._scratch_files:
+            try:
+                os.unlink(path)
+            except OSError as e:
+                logger.warning(f"No se pudo borrar el archivo temporal {path}: {str(e)}")
+        self._scratch_files = []
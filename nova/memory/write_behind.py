@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Módulo para la escritura diferida (write-behind) de la memoria
+Agrupa las escrituras en lotes que se confirman en una sola transacción
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from nova.memory.connection_pool import ConnectionPool
+
+logger = logging.getLogger('nova.memory.write_behind')
+
+# Una operación recibe el cursor de escritura y devuelve un resultado opcional
+WriteOperation = Callable[[sqlite3.Cursor], Any]
+WriteCallback = Callable[[Any], None]
+
+# Marcadores internos de la cola
+_FLUSH = object()
+_STOP = object()
+
+class WriteBehindQueue:
+    """Cola acotada de escrituras que un hilo en segundo plano vuelca por lotes"""
+    
+    def __init__(self, pool: ConnectionPool, batch_size: int = 100,
+                 flush_interval: float = 0.5, max_pending: int = 10000):
+        """
+        Inicializa la cola y arranca el hilo escritor
+        
+        Args:
+            pool: Pool de conexiones de la base de datos
+            batch_size: Número máximo de operaciones por transacción
+            flush_interval: Segundos máximos que una operación espera en la cola
+            max_pending: Tamaño máximo de la cola; si se llena, `submit` espera
+        """
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="nova-memory-writer",
+                                        daemon=True)
+        self._thread.start()
+        logger.info(f"Escritura diferida activada (lote={batch_size}, "
+                    f"intervalo={flush_interval}s)")
+    
+    def submit(self, operation: WriteOperation,
+               callback: Optional[WriteCallback] = None) -> None:
+        """
+        Encola una operación de escritura
+        
+        Args:
+            operation: Función que ejecuta la escritura con el cursor recibido
+            callback: Función opcional llamada con el resultado tras el commit
+        """
+        if self._closed:
+            # Tras el cierre, las escrituras se hacen de forma síncrona
+            self._write_batch([(operation, callback)])
+            return
+        self._queue.put((operation, callback))
+    
+    def flush(self) -> None:
+        """
+        Espera a que todas las operaciones encoladas estén confirmadas en disco
+        """
+        if self._closed:
+            return
+        self._queue.put(_FLUSH)
+        self._queue.join()
+    
+    def close(self) -> None:
+        """
+        Vuelca las operaciones pendientes y detiene el hilo escritor
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        logger.info("Escritura diferida detenida")
+    
+    def _run(self) -> None:
+        """
+        Bucle del hilo escritor: agrupa operaciones por tamaño o por tiempo
+        """
+        stopping = False
+        while not stopping:
+            batch: List[Tuple[WriteOperation, Optional[WriteCallback]]] = []
+            item = self._queue.get()
+            taken = 1
+            
+            if item is _STOP:
+                stopping = True
+            elif item is not _FLUSH:
+                batch.append(item)
+                deadline = time.monotonic() + self.flush_interval
+                
+                # Completar el lote hasta llenarlo o agotar el intervalo
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    taken += 1
+                    if item is _FLUSH:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+            
+            if stopping:
+                # Vaciar lo que quede en la cola antes de salir
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    taken += 1
+                    if item is not _FLUSH and item is not _STOP:
+                        batch.append(item)
+            
+            try:
+                if batch:
+                    self._write_batch(batch)
+            except Exception as e:
+                # El hilo escritor no puede morir: flush() y close() esperan por él
+                logger.error(f"Error inesperado en el hilo escritor: {str(e)}")
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+    
+    def _write_batch(self, batch: List[Tuple[WriteOperation, Optional[WriteCallback]]]) -> None:
+        """
+        Ejecuta un lote de operaciones en una única transacción
+        
+        Si la transacción falla, las operaciones se reintentan una a una para
+        que un error aislado no descarte el lote completo. Cualquier excepción
+        de una operación (no solo de SQLite) descarta solo esa operación.
+        
+        Args:
+            batch: Lista de pares (operación, callback)
+        """
+        try:
+            with self.pool.writer() as cursor:
+                results = [operation(cursor) for operation, _ in batch]
+        except Exception as e:
+            logger.error(f"Error al volcar lote de {len(batch)} escrituras: {str(e)}")
+            results = []
+            for operation, _ in batch:
+                try:
+                    with self.pool.writer() as cursor:
+                        results.append(operation(cursor))
+                except Exception as e:
+                    logger.error(f"Error en escritura diferida: {str(e)}")
+                    results.append(None)
+        
+        logger.debug(f"Lote de {len(batch)} escrituras confirmado")
+        for (_, callback), result in zip(batch, results):
+            if callback is not None and result is not None:
+                try:
+                    callback(result)
+                except Exception as e:
+                    logger.error(f"Error en callback de escritura diferida: {str(e)}")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas del cliente asíncrono de Ollama contra el servidor falso
+Cubren las respuestas completas y en streaming, el límite de generaciones
+simultáneas y la cancelación a mitad de una generación
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.fake_ollama import FakeOllamaServer
+from nova.backend.async_ai_handler import AsyncOllamaHandler
+
+FIRST_TOKEN = 0.2
+
+@pytest.fixture
+def server():
+    """Servidor falso sin carga de modelo ni variación en los tiempos"""
+    with FakeOllamaServer(first_token_latency=FIRST_TOKEN, tokens_per_sec=50.0,
+                          response_tokens=5, load_time=0.0, jitter=0.0, seed=1) as fake:
+        yield fake
+
+def make_handler(server, **kwargs):
+    return AsyncOllamaHandler(server.chat_url, "openchat", **kwargs)
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+async def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.02)
+    return True
+
+def test_send_message(server):
+    async def scenario():
+        async with make_handler(server) as handler:
+            return await handler.send_message("Hola", system_prompt="Eres Nova")
+    
+    result = asyncio.run(scenario())
+    assert "error" not in result
+    assert len(result["response"].split()) == 5
+    assert result["model"] == "openchat"
+    assert result["stats"]["completion_tokens"] == 5
+    assert server.stats()["requests"] == 1
+
+def test_stream_message(server):
+    async def scenario():
+        async with make_handler(server) as handler:
+            chunks = await collect(handler.stream_message("Hola"))
+            return chunks, handler.in_flight
+    
+    chunks, in_flight = asyncio.run(scenario())
+    assert len(chunks) == 5
+    assert len("".join(chunks).split()) == 5
+    assert in_flight == 0
+
+def test_concurrent_generations_are_limited(server):
+    async def scenario():
+        async with make_handler(server, max_concurrent=2) as handler:
+            peak = 0
+            
+            async def watch():
+                nonlocal peak
+                while True:
+                    peak = max(peak, handler.in_flight)
+                    await asyncio.sleep(0.01)
+            
+            watcher = asyncio.create_task(watch())
+            start = time.perf_counter()
+            results = await asyncio.gather(
+                *(handler.send_message(f"Mensaje {i}") for i in range(5)))
+            elapsed = time.perf_counter() - start
+            watcher.cancel()
+            return results, peak, elapsed
+    
+    results, peak, elapsed = asyncio.run(scenario())
+    assert all("error" not in result for result in results)
+    assert peak == 2
+    # Cinco peticiones de dos en dos: al menos tres tandas sucesivas
+    assert elapsed >= 3 * FIRST_TOKEN * 0.9
+
+def test_cancelled_stream_frees_its_slot(server):
+    server.response_tokens = 100
+    
+    async def scenario():
+        async with make_handler(server, max_concurrent=1) as handler:
+            first_chunk = asyncio.Event()
+            
+            async def consume():
+                async for _ in handler.stream_message("Cuéntame algo largo"):
+                    first_chunk.set()
+            
+            task = asyncio.create_task(consume())
+            await asyncio.wait_for(first_chunk.wait(), timeout=3.0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert handler.in_flight == 0
+            
+            # El servidor deja de generar y el hueco queda libre
+            assert await wait_for(lambda: server.stats()["cancelled"] == 1)
+            server.response_tokens = 5
+            result = await asyncio.wait_for(handler.send_message("Hola"), timeout=3.0)
+            assert "error" not in result
+    
+    asyncio.run(scenario())
+
+def test_cancelled_request_frees_its_slot(server):
+    async def scenario():
+        async with make_handler(server, max_concurrent=1) as handler:
+            task = asyncio.create_task(handler.send_message("Hola"))
+            assert await wait_for(lambda: handler.in_flight == 1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert handler.in_flight == 0
+            result = await asyncio.wait_for(handler.send_message("Hola"), timeout=3.0)
+            assert "error" not in result
+    
+    asyncio.run(scenario())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas de la ventana del historial que se envía al modelo
+Cubren el desalojo por número de turnos y por tokens, el recorte de turnos
+demasiado largos, el resumen en segundo plano y la separación por usuario
+"""
+
+import pytest
+
+from nova.backend.conversation_window import (ConversationWindow, ConversationWindows,
+                                              _truncate_turn, _turn_tokens)
+
+class ManualSpawn:
+    """Guarda las tareas en segundo plano para ejecutarlas cuando diga la prueba"""
+    
+    def __init__(self):
+        self.tasks = []
+    
+    def __call__(self, task):
+        self.tasks.append(task)
+    
+    def run(self):
+        tasks, self.tasks = self.tasks, []
+        for task in tasks:
+            task()
+
+def joined(previous, turns):
+    return "|".join(([previous] if previous else []) + [turn["user"] for turn in turns])
+
+def sent_users(window):
+    return [m["content"] for m in window.get_messages() if m["role"] == "user"]
+
+def test_old_turns_are_evicted_into_the_summary():
+    spawn = ManualSpawn()
+    window = ConversationWindow(max_turns=3, token_budget=10000, summarizer=joined,
+                                spawn=spawn)
+    for i in range(5):
+        window.add_turn(f"u{i}", f"n{i}")
+    
+    assert sent_users(window) == ["u2", "u3", "u4"]
+    # Un solo resumen en curso aunque se desalojen varios turnos
+    assert len(spawn.tasks) == 1
+    spawn.run()
+    assert window.summary == "u0|u1"
+    
+    messages = window.get_messages()
+    assert messages[0] == {"role": "system",
+                           "content": "Resumen de la conversación anterior:\nu0|u1"}
+    assert [m["role"] for m in messages[1:]] == ["user", "assistant"] * 3
+    assert [turn["user"] for turn in window.turns()] == [f"u{i}" for i in range(5)]
+
+def test_token_budget_limits_recent_turns():
+    spawn = ManualSpawn()
+    turn = {"user": "a" * 100, "nova": "b" * 100}
+    budget = 2 * _turn_tokens(turn) + 5
+    window = ConversationWindow(max_turns=10, token_budget=budget, summarizer=joined,
+                                spawn=spawn)
+    for i in range(4):
+        window.add_turn(f"{i}" + "a" * 99, "b" * 100)
+    
+    users = sent_users(window)
+    assert [user[0] for user in users] == ["2", "3"]
+    assert sum(_turn_tokens({"user": user, "nova": "b" * 100}) for user in users) <= budget
+    spawn.run()
+    assert [part[0] for part in window.summary.split("|")] == ["0", "1"]
+
+def test_oversized_turn_is_truncated_and_kept():
+    window = ConversationWindow(max_turns=6, token_budget=100, spawn=ManualSpawn())
+    window.add_turn("u" * 1000, "n" * 1000)
+    
+    messages = window.get_messages()
+    sent = {"user": messages[0]["content"], "nova": messages[1]["content"]}
+    assert _turn_tokens(sent) <= 100
+    assert len(sent["user"]) >= len(sent["nova"])
+    # El historial de la sesión conserva el turno completo
+    assert window.turns() == [{"user": "u" * 1000, "nova": "n" * 1000}]
+
+@pytest.mark.parametrize("user, nova", [
+    ("hola", "n" * 2000),
+    ("u" * 2000, "adiós"),
+    ("u" * 2000, "n" * 2000),
+])
+def test_truncate_turn_fits_budget(user, nova):
+    truncated = _truncate_turn({"user": user, "nova": nova}, 60)
+    assert _turn_tokens(truncated) <= 60
+    assert user.startswith(truncated["user"]) and nova.startswith(truncated["nova"])
+    # El mensaje del usuario conserva al menos la mitad del espacio
+    assert len(truncated["user"]) >= min(len(user), (60 - 10) * 4 // 2)
+
+def test_truncate_turn_with_tiny_budget():
+    assert _truncate_turn({"user": "hola", "nova": "adiós"}, 5) == {"user": "", "nova": ""}
+
+def test_clear_discards_summary_in_progress():
+    spawn = ManualSpawn()
+    window = None
+    
+    def clearing(previous, turns):
+        window.clear()
+        return "resumen de antes de borrar"
+    
+    window = ConversationWindow(max_turns=1, summarizer=clearing, spawn=spawn)
+    window.add_turn("primero", "uno")
+    window.add_turn("segundo", "dos")
+    spawn.run()
+    assert window.summary == ""
+    assert window.get_messages() == []
+    assert window.turns() == []
+
+def test_failing_summarizer_falls_back_to_extractive():
+    def broken(previous, turns):
+        raise RuntimeError("modelo caído")
+    
+    spawn = ManualSpawn()
+    window = ConversationWindow(max_turns=1, summarizer=broken, spawn=spawn)
+    window.add_turn("Me llamo Ana", "Encantada")
+    window.add_turn("¿Qué tal?", "Bien")
+    spawn.run()
+    assert window.summary == "- El usuario dijo: Me llamo Ana"
+
+def test_windows_are_separate_per_user():
+    windows = ConversationWindows(lambda: ConversationWindow(spawn=ManualSpawn()))
+    windows.get("ana").add_turn("Soy Ana", "Hola, Ana")
+    windows.get("luis").add_turn("Soy Luis", "Hola, Luis")
+    
+    assert sent_users(windows.get("ana")) == ["Soy Ana"]
+    assert sent_users(windows.get("luis")) == ["Soy Luis"]
+    
+    windows.clear("ana")
+    assert windows.get("ana").turns() == []
+    assert sent_users(windows.get("luis")) == ["Soy Luis"]
+
+def test_least_recently_used_window_is_dropped():
+    windows = ConversationWindows(lambda: ConversationWindow(spawn=ManualSpawn()),
+                                  max_users=2)
+    first = windows.get("a")
+    first.add_turn("hola", "hola")
+    windows.get("b")
+    windows.get("a")
+    windows.get("c")
+    
+    assert len(windows) == 2
+    assert windows.get("a") is first
+    assert windows.get("a").turns() == [{"user": "hola", "nova": "hola"}]
+    assert windows.get("b").turns() == []
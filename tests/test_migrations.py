@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas de las migraciones del esquema de la memoria
+Construyen una base de datos con el esquema original (versión 0) y datos,
+la actualizan y comprueban que los datos se conservan y la versión final
+"""
+
+import json
+import sqlite3
+import zlib
+from datetime import datetime
+
+import pytest
+
+from nova.memory.archive import ConversationArchive
+from nova.memory.connection_pool import ConnectionPool
+from nova.memory.database import MemoryDatabase
+from nova.memory.memory_manager import MemoryManager
+from nova.memory.migrations import (MIGRATIONS, get_schema_version, run_migrations,
+                                    table_exists)
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+CONVERSATIONS = [
+    ("2024-01-01T10:00:00", "Me encanta la música clásica", "¡Qué buen gusto!", "positive",
+     ["música"]),
+    ("2024-01-02T11:00:00", "Hoy he ido al cine", "¿Qué película viste?", "neutral",
+     ["cine", "ocio"]),
+    ("2024-01-03T12:00:00", "Estoy cansado del trabajo", "Descansa un poco", "negative",
+     ["trabajo"]),
+    ("2024-01-04T13:00:00", "Sin temas", "Vale", "neutral", None),
+]
+
+def fts5_available() -> bool:
+    """Indica si el SQLite de Python incluye FTS5"""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+@pytest.fixture
+def v0_db(tmp_path):
+    """Base de datos con el esquema anterior a las migraciones y datos"""
+    path = str(tmp_path / "memory.db")
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            user_message TEXT NOT NULL,
+            nova_response TEXT NOT NULL,
+            sentiment TEXT,
+            topics TEXT
+        );
+        CREATE TABLE user_info (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            category TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            confidence REAL DEFAULT 1.0
+        );
+        CREATE TABLE preferences (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        );
+    ''')
+    conn.executemany('''
+        INSERT INTO conversations (timestamp, user_message, nova_response, sentiment, topics)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(ts, user, nova, sentiment, json.dumps(topics) if topics is not None else None)
+          for ts, user, nova, sentiment, topics in CONVERSATIONS])
+    conn.execute('''
+        INSERT INTO user_info (key, value, category, timestamp, confidence)
+        VALUES ('nombre', 'Ana', 'personal', '2024-01-01T10:00:00', 0.9)
+    ''')
+    conn.execute('''
+        INSERT INTO preferences (key, value, timestamp)
+        VALUES ('voz', 'suave', '2024-01-01T10:00:00')
+    ''')
+    conn.commit()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+    conn.close()
+    return path
+
+def test_upgrade_from_v0_keeps_data(v0_db):
+    pool = ConnectionPool(v0_db)
+    try:
+        assert run_migrations(pool) == LATEST_VERSION
+        assert get_schema_version(pool) == LATEST_VERSION
+        
+        with pool.reader() as cursor:
+            cursor.execute('''
+                SELECT timestamp, user_message, nova_response, sentiment, topics
+                FROM conversations ORDER BY id
+            ''')
+            rows = [tuple(row) for row in cursor.fetchall()]
+            cursor.execute("SELECT key, value, category, confidence FROM user_info")
+            user_info = [tuple(row) for row in cursor.fetchall()]
+            cursor.execute("SELECT key, value FROM preferences")
+            preferences = [tuple(row) for row in cursor.fetchall()]
+            cursor.execute("SELECT topic, conversation_id FROM conversation_topics")
+            topics = set(tuple(row) for row in cursor.fetchall())
+    finally:
+        pool.close()
+    
+    assert rows == [(ts, user, nova, sentiment,
+                     json.dumps(topics) if topics is not None else None)
+                    for ts, user, nova, sentiment, topics in CONVERSATIONS]
+    assert user_info == [("nombre", "Ana", "personal", 0.9)]
+    assert preferences == [("voz", "suave")]
+    assert topics == {("música", 1), ("cine", 2), ("ocio", 2), ("trabajo", 3)}
+
+def test_migrations_are_idempotent(v0_db):
+    pool = ConnectionPool(v0_db)
+    try:
+        run_migrations(pool)
+        with pool.reader() as cursor:
+            cursor.execute("SELECT type, name FROM sqlite_master ORDER BY type, name")
+            schema = [tuple(row) for row in cursor.fetchall()]
+        
+        assert run_migrations(pool) == LATEST_VERSION
+        with pool.reader() as cursor:
+            cursor.execute("SELECT type, name FROM sqlite_master ORDER BY type, name")
+            assert [tuple(row) for row in cursor.fetchall()] == schema
+            cursor.execute("SELECT COUNT(*) FROM conversation_topics")
+            assert cursor.fetchone()[0] == 4
+    finally:
+        pool.close()
+
+def test_failed_migration_keeps_last_complete_version(v0_db):
+    def broken(cursor):
+        cursor.execute("CREATE TABLE half_done (id INTEGER)")
+        raise sqlite3.OperationalError("fallo simulado")
+    
+    pool = ConnectionPool(v0_db)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            run_migrations(pool, MIGRATIONS[:2] + [(3, "rota", broken)])
+        assert get_schema_version(pool) == 2
+        with pool.reader() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'")
+            assert cursor.fetchone() is None
+        
+        assert run_migrations(pool) == LATEST_VERSION
+    finally:
+        pool.close()
+
+@pytest.mark.skipif(not fts5_available(), reason="SQLite sin FTS5")
+def test_fulltext_index_is_backfilled_and_synced(v0_db):
+    db = MemoryDatabase(v0_db)
+    try:
+        assert db.fts_enabled
+        assert [c["id"] for c in db.search_conversations("musica clasica")] == [1]
+        
+        new_id = db.save_conversation("Quiero aprender guitarra", "¡Buena idea!",
+                                      topics=["música"])
+        assert [c["id"] for c in db.search_conversations("guitarra")] == [new_id]
+        assert [c["id"] for c in db.get_conversations_by_topics(["música"])] == [new_id, 1]
+    finally:
+        db.close()
+
+def test_archive_digests_and_index_are_migrated(v0_db):
+    pool = ConnectionPool(v0_db)
+    try:
+        run_migrations(pool, MIGRATIONS[:4])
+        with pool.writer() as cursor:
+            cursor.execute('''
+                INSERT INTO conversations_archive (id, timestamp, sentiment, topics, content)
+                VALUES (100, '2023-05-01T10:00:00', 'neutral', '["viajes"]', ?)
+            ''', (zlib.compress(json.dumps(["Volví de Lisboa", "¿Qué tal el viaje?"],
+                                             ensure_ascii=False).encode('utf-8')),))
+            cursor.execute('''
+                INSERT INTO conversation_summaries (topic, day, conversation_count, digest)
+                VALUES ('viajes', '2023-05-01', 2, 'Volví de Lisboa | Hice la maleta')
+            ''')
+        
+        assert run_migrations(pool) == LATEST_VERSION
+        archive = ConversationArchive(pool)
+        summaries = archive.get_summaries(["viajes"])
+        assert summaries[0]['digest'] == ["Volví de Lisboa", "Hice la maleta"]
+        assert [c['id'] for c in archive.search("lisboa")] == [100]
+    finally:
+        pool.close()
+
+def test_digest_with_separator_round_trips(v0_db):
+    db = MemoryDatabase(v0_db)
+    try:
+        archive = ConversationArchive(db.pool)
+        db.save_conversation("Elige: té | café", "Café", topics=["bebidas"])
+        with db.pool.writer() as cursor:
+            cursor.execute("UPDATE conversations SET timestamp = '2020-01-01T00:00:00'")
+        assert archive.compact(datetime(2021, 1, 1)) == len(CONVERSATIONS) + 1
+        
+        summary = archive.get_summaries(["bebidas"])[0]
+        assert summary['digest'] == ["Elige: té | café"]
+        assert [c['user_message'] for c in archive.search("café")] == ["Elige: té | café"]
+    finally:
+        db.close()
+
+def test_embeddings_table_is_a_migration(v0_db):
+    pool = ConnectionPool(v0_db)
+    try:
+        run_migrations(pool, MIGRATIONS[:6])
+        with pool.reader() as cursor:
+            assert not table_exists(cursor, "conversation_embeddings")
+        assert run_migrations(pool) == LATEST_VERSION
+        with pool.reader() as cursor:
+            assert table_exists(cursor, "conversation_embeddings")
+    finally:
+        pool.close()
+
+def test_vectors_are_backfilled_in_background(v0_db):
+    manager = MemoryManager(v0_db)
+    try:
+        manager._backfill_thread.join(5.0)
+        assert not manager._backfill_thread.is_alive()
+        assert len(manager.vector_index) == len(CONVERSATIONS)
+        matches = manager.vector_index.search("música clásica", k=1)
+        assert [cid for cid, _ in matches] == [1]
+    finally:
+        manager.close()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas del reparto de peticiones entre servidores de Ollama
+Comprueban que el pool decide por el tiempo hasta el primer token (EWMA) y
+no por la duración completa, que depende de la longitud de cada respuesta
+"""
+
+import pytest
+
+from benchmarks.fake_ollama import FakeOllamaServer
+from nova.backend.ollama_pool import OllamaPool, estimate_first_token
+
+@pytest.fixture
+def servers():
+    """Un servidor que empieza antes pero escribe más y otro lento y escueto"""
+    quick = FakeOllamaServer(first_token_latency=0.05, tokens_per_sec=50.0,
+                             response_tokens=20, load_time=0.0, jitter=0.0, seed=1)
+    terse = FakeOllamaServer(first_token_latency=0.3, tokens_per_sec=50.0,
+                             response_tokens=1, load_time=0.0, jitter=0.0, seed=2)
+    with quick, terse:
+        yield quick, terse
+
+@pytest.fixture
+def pool(servers):
+    pool = OllamaPool([server.chat_url for server in servers], "openchat",
+                      health_interval=0, ewma_alpha=0.5)
+    yield pool
+    pool.close()
+
+def test_estimate_first_token():
+    assert estimate_first_token({}, 2.0) is None
+    assert estimate_first_token({"eval_duration": 1.5e9}, 2.0) == pytest.approx(0.5)
+    # Relojes distintos: nunca negativo
+    assert estimate_first_token({"eval_duration": 3e9}, 2.0) == 0.0
+
+def test_release_updates_ttft_and_total_apart(pool):
+    endpoint = pool.endpoints[0]
+    endpoint.ttft = 1.0
+    endpoint.in_flight = 1
+    pool._release(endpoint, ttft=0.2, total=4.0)
+    assert endpoint.in_flight == 0
+    assert endpoint.ttft == pytest.approx(0.6)
+    assert endpoint.latency == pytest.approx(4.0)
+    
+    # Sin primer token conocido solo cambia la duración media
+    endpoint.in_flight = 1
+    pool._release(endpoint, total=2.0)
+    assert endpoint.ttft == pytest.approx(0.6)
+    assert endpoint.latency == pytest.approx(3.0)
+    
+    # Los fallos no tocan las medias
+    endpoint.in_flight = 1
+    pool._release(endpoint, failed=True)
+    assert endpoint.ttft == pytest.approx(0.6)
+    assert endpoint.failures == 1
+
+def test_load_grows_with_requests_in_flight(pool):
+    quick, terse = pool.endpoints
+    quick.ttft, terse.ttft = 0.1, 0.25
+    assert pool._acquire([]) is quick
+    assert pool._acquire([]) is quick
+    # Con dos en curso, 0.1 × 3 supera a 0.25 × 1
+    assert pool._acquire([]) is terse
+
+def test_routes_by_first_token_not_total_latency(pool, servers):
+    quick_server, terse_server = servers
+    quick, terse = pool.endpoints
+    # Que el primero vaya al lento para tener mediciones de los dos
+    terse.ttft = 0.0
+    for i in range(6):
+        result = pool.send_message(f"Mensaje {i}")
+        assert "error" not in result
+    
+    assert terse_server.stats()["requests"] == 1
+    assert quick_server.stats()["requests"] == 5
+    assert quick.ttft < terse.ttft
+    # El servidor elegido tarda más en total: sus respuestas son más largas
+    assert quick.latency > terse.latency
+    
+    status = {entry["url"]: entry for entry in pool.status()}
+    assert status[quick.api_url]["ttft_ms"] < status[terse.api_url]["ttft_ms"]
+    assert status[quick.api_url]["latency_ms"] > status[terse.api_url]["latency_ms"]
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas del cortocircuito de los servidores de Ollama
+Recorren sus transiciones (cerrado, abierto, semiabierto) y comprueban que
+una prueba del semiabierto nunca lo deja bloqueado
+"""
+
+import time
+
+import pytest
+
+from nova.backend.ai_handler import OllamaHandler
+from nova.backend.resilience import CircuitBreaker
+
+RESET = 0.05
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker(failure_threshold=2, reset_timeout=RESET, name="prueba")
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_opens_after_consecutive_failures(breaker):
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    # Un éxito reinicia la cuenta
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+def test_half_open_lets_one_probe_through(breaker):
+    open_breaker(breaker)
+    time.sleep(RESET * 1.5)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+def test_failed_probe_reopens(breaker):
+    open_breaker(breaker)
+    time.sleep(RESET * 1.5)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+def test_lost_probe_is_replaced_after_reset_timeout(breaker):
+    open_breaker(breaker)
+    time.sleep(RESET * 1.5)
+    # La prueba nunca informa de su resultado
+    assert breaker.allow()
+    assert not breaker.allow()
+    time.sleep(RESET * 1.5)
+    assert breaker.allow()
+    assert not breaker.allow()
+
+def broken_handler(breaker, monkeypatch):
+    handler = OllamaHandler("http://127.0.0.1:9/api/chat", "openchat",
+                            check_connection=False, breaker=breaker)
+    
+    def explode(*args, **kwargs):
+        raise RuntimeError("fallo fuera de requests")
+    
+    monkeypatch.setattr(handler.session, "post", explode)
+    return handler
+
+@pytest.mark.parametrize("call", [
+    lambda handler: list(handler._iter_chat({})),
+    lambda handler: handler._post_chat({}),
+])
+def test_unexpected_error_in_probe_is_recorded(breaker, monkeypatch, call):
+    handler = broken_handler(breaker, monkeypatch)
+    open_breaker(breaker)
+    time.sleep(RESET * 1.5)
+    
+    with pytest.raises(RuntimeError):
+        call(handler)
+    # La prueba fallida vuelve a abrirlo en lugar de dejarlo esperando
+    assert breaker.state == CircuitBreaker.OPEN
+    assert handler.get_metrics()["errors"] == 1
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas de la escritura diferida de la memoria
+Comprueban que una operación que falla no detiene el hilo escritor ni deja
+bloqueados flush() y close()
+"""
+
+import threading
+
+import pytest
+
+from nova.memory.connection_pool import ConnectionPool
+from nova.memory.write_behind import WriteBehindQueue
+
+@pytest.fixture
+def pool(tmp_path):
+    """Pool sobre una base de datos con una tabla de prueba"""
+    pool = ConnectionPool(str(tmp_path / "memory.db"))
+    with pool.writer() as cursor:
+        cursor.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, text TEXT NOT NULL)")
+    yield pool
+    pool.close()
+
+def insert(text):
+    def operation(cursor):
+        cursor.execute("INSERT INTO notes (text) VALUES (?)", (text,))
+        return cursor.lastrowid
+    return operation
+
+def broken(cursor):
+    raise ValueError("fallo fuera de SQLite")
+
+def stored(pool):
+    with pool.reader() as cursor:
+        cursor.execute("SELECT text FROM notes ORDER BY id")
+        return [row[0] for row in cursor.fetchall()]
+
+def run_with_timeout(target, timeout=5.0):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+def test_failing_operation_only_drops_itself(pool):
+    queue = WriteBehindQueue(pool, flush_interval=0.05)
+    results = []
+    queue.submit(insert("antes"), callback=results.append)
+    queue.submit(broken)
+    queue.submit(insert("después"), callback=results.append)
+    assert run_with_timeout(queue.flush)
+    assert stored(pool) == ["antes", "después"]
+    assert len(results) == 2
+    
+    # El hilo escritor sigue vivo para los lotes siguientes
+    queue.submit(broken)
+    queue.submit(insert("más tarde"))
+    assert run_with_timeout(queue.flush)
+    assert run_with_timeout(queue.close)
+    assert stored(pool) == ["antes", "después", "más tarde"]
+
+def test_unexpected_error_in_batch_does_not_hang_flush(pool, monkeypatch):
+    queue = WriteBehindQueue(pool, flush_interval=0.05)
+    
+    def explode(batch):
+        raise RuntimeError("error inesperado")
+    
+    monkeypatch.setattr(queue, "_write_batch", explode)
+    queue.submit(insert("perdida"))
+    assert run_with_timeout(queue.flush)
+    monkeypatch.undo()
+    
+    queue.submit(insert("guardada"))
+    assert run_with_timeout(queue.close)
+    assert stored(pool) == ["guardada"]